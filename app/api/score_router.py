@@ -0,0 +1,194 @@
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from fastapi import APIRouter, Body, HTTPException
+
+from app.pipeline.profitability_scorer import get_profile_registry, score_records
+from app.storage.supply_index import SupplyIndex
+from app.utils.logger import log
+
+router = APIRouter(tags=["scoring"])
+
+BATCH_WINDOW_SECS = 0.005
+MAX_BATCH_SIZE = 512
+_LATENCY_SAMPLES = 2048
+# Fields the scorer treats as text; numeric fields go through to_float.
+TEXT_FIELDS = ("brand", "model", "category", "type", "category_hint", "title", "source", "url", "link")
+
+
+def coerce_listing(record: Any, index: int = 0) -> Dict[str, Any]:
+    """
+    Return a copy of ``record`` safe to put in a shared batch.
+
+    Numbers in text fields are converted to strings (``"model": 3080``);
+    any other non-string value raises ValueError naming the field.
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"listing {index}: must be a JSON object")
+    clean = dict(record)
+    for key in TEXT_FIELDS:
+        value = clean.get(key)
+        if value is None or isinstance(value, str):
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            clean[key] = str(value)
+            continue
+        raise ValueError(f"listing {index}: {key!r} must be a string, got {type(value).__name__}")
+    return clean
+
+
+class MicroBatcher:
+    """
+    Collect concurrent score requests into micro-batches.
+
+    The first request in an empty queue opens a short window; everything that
+    arrives before it closes (or until ``max_batch`` listings are queued) is
+    scored in one vectorized ``score_records`` call off the event loop.
+    Rarity comes from a supply snapshot refreshed in the background. If a
+    batch still fails, its requests are rescored one at a time so only the
+    offending request sees the error.
+    """
+
+    def __init__(self, window: float = BATCH_WINDOW_SECS, max_batch: int = MAX_BATCH_SIZE) -> None:
+        self.window = window
+        self.max_batch = max_batch
+        self._supply: Optional[SupplyIndex] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.listings = 0
+        self.batch_sizes: Deque[int] = deque(maxlen=_LATENCY_SAMPLES)
+        self.batch_latency_ms: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self.request_latency_ms: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+    def supply(self) -> SupplyIndex:
+        if self._supply is None:
+            self._supply = SupplyIndex().start()
+        return self._supply
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        return self._queue
+
+    async def submit(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Queue listings and wait for their scored results."""
+        t0 = time.perf_counter()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._ensure_worker().put((records, future))
+        result = await future
+        self.request_latency_ms.append((time.perf_counter() - t0) * 1000)
+        return result
+
+    async def _collect(self) -> List[Tuple[List[Dict[str, Any]], asyncio.Future]]:
+        pending = [await self._queue.get()]
+        size = len(pending[0][0])
+        deadline = asyncio.get_running_loop().time() + self.window
+        while size < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    async def _score(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        profile = get_profile_registry().current()
+        scored, _ = await asyncio.to_thread(
+            score_records, records, dict(profile.cfg), self.supply().snapshot, version=profile.version
+        )
+        return scored
+
+    async def _score_each(self, pending: List[Tuple[List[Dict[str, Any]], asyncio.Future]]) -> None:
+        for recs, fut in pending:
+            try:
+                result = await self._score(recs)
+            except Exception as e:
+                log.warning(f"[score] Request of {len(recs)} listing(s) failed: {e}")
+                if not fut.done():
+                    fut.set_exception(e)
+                continue
+            if not fut.done():
+                fut.set_result(result)
+
+    async def _run(self) -> None:
+        while True:
+            pending = await self._collect()
+            records = [r for recs, _ in pending for r in recs]
+            t0 = time.perf_counter()
+            try:
+                scored = await self._score(records)
+            except Exception as e:
+                log.exception("[score] Batch of %d failed, rescoring per request: %s", len(records), e)
+                await self._score_each(pending)
+                continue
+
+            self.batches += 1
+            self.listings += len(records)
+            self.batch_sizes.append(len(records))
+            self.batch_latency_ms.append((time.perf_counter() - t0) * 1000)
+
+            offset = 0
+            for recs, fut in pending:
+                if not fut.done():
+                    fut.set_result(scored[offset:offset + len(recs)])
+                offset += len(recs)
+
+    def stats(self) -> Dict[str, Any]:
+        def pct(samples: Deque[float], q: float) -> Optional[float]:
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+        return {
+            "batches": self.batches,
+            "listings": self.listings,
+            "avg_batch_size": round(self.listings / self.batches, 2) if self.batches else None,
+            "max_batch_size": max(self.batch_sizes) if self.batch_sizes else None,
+            "batch_latency_ms_p50": pct(self.batch_latency_ms, 0.50),
+            "batch_latency_ms_p99": pct(self.batch_latency_ms, 0.99),
+            "request_latency_ms_p50": pct(self.request_latency_ms, 0.50),
+            "request_latency_ms_p99": pct(self.request_latency_ms, 0.99),
+        }
+
+
+batcher = MicroBatcher()
+
+
+@router.post("/score")
+async def score_endpoint(
+    payload: Union[List[Dict[str, Any]], Dict[str, Any]] = Body(...),
+):
+    """Score one listing, a list of listings, or {"listings": [...]}."""
+    if isinstance(payload, dict) and isinstance(payload.get("listings"), list):
+        records, single = payload["listings"], False
+    elif isinstance(payload, dict):
+        records, single = [payload], True
+    else:
+        records, single = payload, False
+
+    try:
+        records = [coerce_listing(r, i) for i, r in enumerate(records)]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not records:
+        return {"results": []}
+
+    scored = await batcher.submit(records)
+    return scored[0] if single else {"results": scored}
+
+
+@router.get("/score/stats")
+async def score_stats():
+    """Micro-batch size and latency metrics since startup."""
+    return batcher.stats()
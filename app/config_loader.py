@@ -6,6 +6,7 @@ from typing import Any, Dict
 
 
 _SIMPLE_YAML_LINE = re.compile(r"^\s*([A-Za-z0-9_.\-]+)\s*:\s*(.*?)\s*$")
+_FLOAT = re.compile(r"^[+-]?(\d+\.\d*|\.\d+|\d+(\.\d*)?[eE][+-]?\d+|\.\d+[eE][+-]?\d+)$")
 
 
 def _convert_value(raw_val: str) -> Any:
@@ -22,9 +23,12 @@ def _convert_value(raw_val: str) -> Any:
     ):
         return val[1:-1]
     try:
-        return float(val) if "." in val else int(val)
+        return int(val)
     except ValueError:
-        return val
+        pass
+    if _FLOAT.match(val):
+        return float(val)
+    return val
 
 
 def _parse_simple_yaml(text: str) -> Dict[str, Any]:
@@ -70,3 +74,24 @@ def load_config(path: str) -> Dict[str, Any]:
 def get(path_env: str, default_path: str) -> Dict[str, Any]:
     """Load config using environment override if present."""
     return load_config(os.environ.get(path_env, default_path))
+
+
+def _format_value(value: Any) -> str:
+    """Render a value so _convert_value reads it back unchanged."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        # repr() is the shortest exact form, e.g. "0.25" or "1e-05".
+        return repr(value)
+    if isinstance(value, int):
+        return str(value)
+    return f'"{value}"'
+
+
+def save_config(path: str, cfg: Dict[str, Any], header: str = "") -> None:
+    """Write a flat config as minimal YAML that load_config can parse."""
+    lines = [f"# {line}" for line in header.splitlines()]
+    lines += [f"{key}: {_format_value(val)}" for key, val in cfg.items()]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
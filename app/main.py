@@ -2,6 +2,7 @@
 from fastapi.staticfiles import StaticFiles
 from app.api.watchers_router import router as watchers_router
 from app.api import ebay_webhook
+from app.api.score_router import router as score_router
 from app.obs.structured_log import setup_logging
 from app.metrics.collector import get_daily_metrics
 from app.utils.logger import init_logger
@@ -12,6 +13,7 @@ log = init_logger("snipped_you")
 app = FastAPI()
 app.include_router(watchers_router)
 app.include_router(ebay_webhook.router)
+app.include_router(score_router)
 
 
 @app.get("/health")
@@ -1,6 +1,15 @@
 # app/metrics/collector.py
-from datetime import datetime
+from datetime import datetime, timezone
+
+from app.metrics.latency import LATENCY, latest_report
 
 
 def get_daily_metrics():
-    return {"uptime": "OK", "timestamp": datetime().isoformat(), "status": "healthy"}
+    return {
+        "uptime": "OK",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "status": "healthy",
+        # Stage and time-to-alert histograms: this process, and the last pipeline run on disk.
+        "latency": LATENCY.snapshot(),
+        "last_run_latency": latest_report(),
+    }
@@ -0,0 +1,195 @@
+"""
+Per-listing stage timestamps and time-to-alert latency histograms.
+
+Each listing carries ``stamps``: wall-clock epoch seconds for every stage it
+has passed (``posted`` when the site tells us, then ``scraped``,
+``normalized``, ``scored``, ``stored`` and ``notified`` in the stream and
+scheduler, or ``merged`` in batch runs). Stamping a stage records the time
+since the previous stamp in that stage's histogram; the final stamp
+(``notified`` or ``merged``) also records ``total`` (from posted, else
+scraped) and ``pipeline`` (from scraped) latency, i.e. how long a deal
+waited on us.
+
+The process-wide ``LATENCY`` recorder is exported by ``/metrics``. Each
+pipeline run stamps through its own ``LATENCY.child()``, which also feeds
+the global one, and writes that to ``data/reports/latency/<run>.json``, so
+a report covers exactly one run and runs can be compared.
+"""
+
+from __future__ import annotations
+import bisect
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+REPORT_DIR = Path("data/reports/latency")
+STAGES = ("posted", "scraped", "normalized", "scored", "stored", "merged", "notified")
+# The stage where a listing reaches the user: an alert, or the merged batch output.
+FINAL_STAGES = ("merged", "notified")
+# Histogram bucket upper bounds in seconds (the last bucket is +inf).
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 1800, 3600, 7200, 21600, 86400)
+_POSTED_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%a %d %b %I:%M:%S %p")
+
+
+def parse_posted_at(value: Any) -> Optional[float]:
+    """Epoch seconds for an ISO / Craigslist-style timestamp or epoch number; None if unparseable."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    try:
+        dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        for fmt in _POSTED_FORMATS:
+            try:
+                dt = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.astimezone()  # naive site times are local
+    return dt.timestamp()
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram (Prometheus-style cumulative on export)."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, secs: float) -> None:
+        secs = max(0.0, secs)
+        self.counts[bisect.bisect_left(BUCKETS, secs)] += 1
+        self.count += 1
+        self.sum += secs
+        self.max = max(self.max, secs)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, n in zip(list(BUCKETS) + ["+Inf"], self.counts):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.count, 3) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 3),
+            "buckets": buckets,
+        }
+
+
+class LatencyRecorder:
+    """
+    Thread-safe stage stamping plus per-stage, total and pipeline histograms.
+
+    Observations are also recorded in ``parent`` (if any), so a per-run
+    recorder can report its run alone while the global one keeps the totals.
+    """
+
+    def __init__(self, report_dir: str | Path = REPORT_DIR,
+                 parent: Optional["LatencyRecorder"] = None) -> None:
+        self.report_dir = Path(report_dir)
+        self.parent = parent
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def child(self) -> "LatencyRecorder":
+        """A fresh recorder for one run that also feeds this one."""
+        return LatencyRecorder(self.report_dir, parent=self)
+
+    def _observe(self, observed: List[Tuple[str, float]]) -> None:
+        with self._lock:
+            for name, secs in observed:
+                self.histograms.setdefault(name, LatencyHistogram()).observe(secs)
+        if self.parent is not None:
+            self.parent._observe(observed)
+
+    def stamp(self, record: Dict[str, Any], stage: str, at: Optional[float] = None) -> None:
+        """Stamp ``record`` with ``stage`` and record the time spent reaching it."""
+        at = time.time() if at is None else at
+        stamps = record.setdefault("stamps", {})
+        if stage == "scraped" and "posted" not in stamps:
+            posted = parse_posted_at(record.get("posted_at"))
+            if posted is not None and posted <= at:
+                stamps["posted"] = posted
+        previous = [stamps[s] for s in STAGES if s in stamps and s not in ("posted", stage)]
+        stamps[stage] = at
+        observed: List[Tuple[str, float]] = []
+        if stage != "scraped" and previous:
+            observed.append((stage, at - max(previous)))
+        if stage in FINAL_STAGES:
+            origin = stamps.get("posted", stamps.get("scraped"))
+            if origin is not None:
+                observed.append(("total", at - origin))
+            if "scraped" in stamps:
+                observed.append(("pipeline", at - stamps["scraped"]))
+        if observed:
+            self._observe(observed)
+
+    def stamp_all(self, records: List[Dict[str, Any]], stage: str) -> None:
+        at = time.time()
+        for record in records:
+            self.stamp(record, stage, at)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {name: h.to_dict() for name, h in sorted(self.histograms.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+
+    def write_report(self, run_id: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> Path:
+        """Write the current histograms to ``<report_dir>/<run_id>.json`` (atomically)."""
+        run_id = run_id or f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}"
+        root = self.report_dir
+        root.mkdir(parents=True, exist_ok=True)
+        path = root / f"{run_id}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "run_id": run_id,
+            "written_at": datetime.now(timezone.utc).isoformat(),
+            "latency": self.snapshot(),
+            **(extra or {}),
+        }, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+
+def latest_report(root: str | Path = REPORT_DIR) -> Optional[Dict[str, Any]]:
+    """The most recently written run report, if any."""
+    reports = sorted(Path(root).glob("*.json"), key=lambda p: p.stat().st_mtime)
+    if not reports:
+        return None
+    try:
+        return json.loads(reports[-1].read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+LATENCY = LatencyRecorder()
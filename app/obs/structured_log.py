@@ -1,6 +1,6 @@
 # app/obs/structured_log.py
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 def setup_logging() -> None:
@@ -9,4 +9,4 @@ def setup_logging() -> None:
         format="%(asctime)s | %(levelname)s | %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
-    logging.info(f"Structured logging initialized at {datetime().isoformat()}")
+    logging.info(f"Structured logging initialized at {datetime.now(timezone.utc).isoformat()}")
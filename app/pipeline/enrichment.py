@@ -0,0 +1,114 @@
+"""
+Lazy market-signal enrichment guarded by optimistic score upper bounds.
+
+The local flip score is scaled by demand and liquidity multipliers once the
+eBay / Trends / Reddit adapters have been queried. Both multipliers are
+bounded, so ``local * max_demand * max_liquidity`` is an upper bound on the
+enriched score. Listings whose bound cannot reach the alert threshold are
+never sent to the adapters.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.adapters import CacheLayer, EbayAdapter, GoogleTrendsAdapter, RedditAdapter
+from app.scoring.scoring_utils import clamp
+from app.utils.logger import log
+from app.utils.metrics import Metrics
+
+ENRICH_DEFAULTS: Dict[str, float] = {
+    "alert_threshold": 0.7,
+    "enrich_demand_floor": 0.8,
+    "enrich_demand_span": 0.4,
+    "enrich_liquidity_floor": 0.8,
+    "enrich_liquidity_span": 0.4,
+}
+# eBay counts, Trends series and Reddit mentions per enriched listing.
+CALLS_PER_LISTING = 3
+
+
+def _cfg(cfg: Dict[str, Any], key: str) -> float:
+    return float(cfg.get(key, ENRICH_DEFAULTS[key]))
+
+
+def upper_bounds(items: List[Dict[str, Any]], cfg: Dict[str, Any]) -> np.ndarray:
+    """Best-case enriched score per listing, from local fields only."""
+    local = np.array(
+        [float(it.get("flipScore") or 0.0) if it.get("valid", True) else 0.0 for it in items],
+        dtype=np.float64,
+    )
+    max_demand = _cfg(cfg, "enrich_demand_floor") + _cfg(cfg, "enrich_demand_span")
+    max_liquidity = _cfg(cfg, "enrich_liquidity_floor") + _cfg(cfg, "enrich_liquidity_span")
+    return np.clip(local * max_demand * max_liquidity, 0.0, 1.0)
+
+
+def _keyword(item: Dict[str, Any]) -> str:
+    kw = f"{item.get('brand') or ''} {item.get('model') or ''}".strip()
+    return kw or (item.get("title") or "generic")
+
+
+@dataclass
+class LazyEnricher:
+    """Calls the market adapters only for listings that could still alert."""
+
+    cache: CacheLayer = field(default_factory=CacheLayer)
+    ebay: Optional[EbayAdapter] = None
+    trends: Optional[GoogleTrendsAdapter] = None
+    reddit: Optional[RedditAdapter] = None
+
+    def __post_init__(self) -> None:
+        self.ebay = self.ebay or EbayAdapter(self.cache)
+        self.trends = self.trends or GoogleTrendsAdapter(self.cache)
+        self.reddit = self.reddit or RedditAdapter(self.cache)
+
+    def signals(self, keyword: str) -> Dict[str, float]:
+        ebay = self.ebay.compute_metrics(keyword)
+        demand = (self.trends.trend_score(keyword) + self.reddit.mention_score(keyword)) / 2
+        return {
+            "demand": round(demand, 4),
+            "liquidity": round(ebay["sell_through_rate"], 4),
+            "resale_anchor": round(ebay["resale_anchor"], 4),
+        }
+
+    def enrich(
+        self,
+        items: List[Dict[str, Any]],
+        cfg: Dict[str, Any],
+        metrics: Optional[Metrics] = None,
+    ) -> List[Dict[str, Any]]:
+        """Enrich promising listings in place and return the list."""
+        metrics = metrics or Metrics()
+        threshold = _cfg(cfg, "alert_threshold")
+        bounds = upper_bounds(items, cfg)
+
+        for item, bound in zip(items, bounds):
+            item["scoreUpperBound"] = round(float(bound), 4)
+            if bound < threshold:
+                metrics.inc("enrich_skipped")
+                metrics.inc("api_calls_avoided", CALLS_PER_LISTING)
+                continue
+
+            try:
+                signals = self.signals(_keyword(item))
+            except Exception as e:
+                log.warning(f"[enrich] Adapter lookup failed for {_keyword(item)!r}: {e}")
+                metrics.inc("enrich_failed")
+                continue
+            metrics.inc("enrich_called")
+            metrics.inc("api_calls", CALLS_PER_LISTING)
+
+            demand_mult = _cfg(cfg, "enrich_demand_floor") + _cfg(cfg, "enrich_demand_span") * signals["demand"]
+            liq_mult = _cfg(cfg, "enrich_liquidity_floor") + _cfg(cfg, "enrich_liquidity_span") * signals["liquidity"]
+            item["localScore"] = item.get("flipScore")
+            item["flipScore"] = round(clamp(float(item.get("flipScore") or 0.0) * demand_mult * liq_mult), 4)
+            item["metrics"] = {**(item.get("metrics") or {}), **signals}
+
+        called, skipped = metrics.get_count("enrich_called"), metrics.get_count("enrich_skipped")
+        log.info(
+            f"[enrich] enriched={called} skipped={skipped} "
+            f"api_calls_avoided={metrics.get_count('api_calls_avoided')}"
+        )
+        return items
@@ -38,20 +38,22 @@ def normalize(
 
     for record in raw:
         title = record.get("title")
-        normalized.append(
-            {
-                "brand": None,  # optional LLM-based inference
-                "model": title,
-                "title": title,
-                "price": _coerce_price(record.get("price")),
-                "category": category,
-                "location": record.get("location"),
-                "image": record.get("image"),
-                "url": record.get("url"),
-                "source": record.get("source", site),
-                "timestamp": record.get("posted_at") or now_iso,
-                "confidence": 1.0 if title else 0.6,
-            }
-        )
+        item = {
+            "brand": None,  # optional LLM-based inference
+            "model": title,
+            "title": title,
+            "price": _coerce_price(record.get("price")),
+            "category": category,
+            "location": record.get("location"),
+            "image": record.get("image"),
+            "url": record.get("url"),
+            "source": record.get("source", site),
+            "timestamp": record.get("posted_at") or now_iso,
+            "confidence": 1.0 if title else 0.6,
+        }
+        if record.get("stamps"):
+            # Stage timestamps from app.metrics.latency travel with the listing.
+            item["stamps"] = dict(record["stamps"])
+        normalized.append(item)
 
     return normalized
@@ -3,11 +3,21 @@ import json
 import os
 import sys
 import glob
+import numpy as np
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from pathlib import Path
 from app.utils.metrics import Metrics
-from app.storage.storage import save_listing_batch
+from app.storage.storage import save_listing_batch, touch_listings
+from app.storage.supply_index import SupplySnapshot
+from app.storage.score_memo import ScoreMemo
+from app.storage.feature_store import FEATURE_COLUMNS, FeatureStore
+from app.utils.fileio import atomic_write_json, output_dir as run_output_dir
+from app.utils.hashing import calc_hash, fingerprint
+
+if TYPE_CHECKING:
+    from app.metrics.latency import LatencyRecorder
+    from app.pipeline.enrichment import LazyEnricher
 
 # Config loader
 from app.config_loader import get as load_cfg
@@ -21,8 +31,11 @@ from app.utils.logger import log
 
 from app.scoring.scoring_utils import to_float, clamp, normalize_confidence
 from app.scoring.heuristics import category_weight, brand_signal, price_gap
-from app.scoring.rarity_utils import apply_rarity_flipscore
+from app.scoring.rarity_utils import apply_rarity_flipscore, rarity_boost
 from app.scoring.scoring_model import compute_base_score
+from app.scoring.topk import TopKCollector
+from app.scoring.profile_registry import ProfileRegistry, ScoringProfile, profile_version
+from app.scoring.formula import compile_formulas, scalar_params
 
 # ============================================================
 # Constants
@@ -42,6 +55,24 @@ DEFAULT_SCORING: Dict[str, Any] = {
     "brand_penalty_unknown": -0.05,
 }
 
+# Fields produced by score_listing; only these are memoized.
+SCORE_FIELDS = (
+    "flipScore", "rarityFactor", "profitMargin", "marginPct",
+    "suggested_buy_price", "valid", "profileVersion",
+)
+# Fields LazyEnricher adds; memoized too when present so hits skip the adapters.
+ENRICH_FIELDS = ("localScore", "scoreUpperBound", "metrics")
+
+_registry: Optional[ProfileRegistry] = None
+
+
+def get_profile_registry() -> ProfileRegistry:
+    """Process-wide registry for config/scoring.yaml (hot-reloaded on change)."""
+    global _registry
+    if _registry is None:
+        _registry = ProfileRegistry(defaults=DEFAULT_SCORING)
+    return _registry
+
 # ============================================================
 # Data model
 # ============================================================
@@ -60,8 +91,15 @@ class Listing:
 # Core scoring logic
 # ============================================================
 
-def score_listing(item: Listing, cfg: Dict[str, Any]) -> Dict[str, Any]:
-    """Compute weighted flip score for a listing using shared scoring modules."""
+def score_listing(
+    item: Listing, cfg: Dict[str, Any], supply: Optional[SupplySnapshot] = None
+) -> Dict[str, Any]:
+    """
+    Compute weighted flip score for a listing using shared scoring modules.
+
+    When a supply snapshot is given, the rarity factor comes from the model's
+    active listing count relative to its category average.
+    """
     price = item.price
     valid = price is not None and cfg["min_valid_price"] <= price <= cfg["max_valid_price"]
 
@@ -74,22 +112,84 @@ def score_listing(item: Listing, cfg: Dict[str, Any]) -> Dict[str, Any]:
     # Core score computation via scoring_model
     base_score = compute_base_score(conf, gap, brand_adj, cat_wt, cfg)
 
-    # Optional rarity adjustment (safe default = 1.0)
-    flip_score = apply_rarity_flipscore(base_score, rarity_factor=1.0)
-
-    profit_margin = anchor - price if (anchor and price) else None
-    margin_pct = (profit_margin / anchor * 100) if (profit_margin and anchor) else None
-    suggested_buy = round(price * 0.9, 2) if price else None
+    # Rarity adjustment from supply counts (neutral 1.0 without a snapshot)
+    rarity = rarity_boost(*supply.lookup(item.category, item.model)) if supply else 1.0
+    flip_score = apply_rarity_flipscore(base_score, rarity_factor=rarity)
 
     return {
         **item.raw,
         "flipScore": round(clamp(flip_score), 4),
+        "rarityFactor": rarity,
+        **_margin_fields(price, anchor),
+        "valid": valid,
+    }
+
+
+def _margin_fields(price: Optional[float], anchor: Optional[float]) -> Dict[str, Any]:
+    profit_margin = anchor - price if (anchor and price) else None
+    margin_pct = (profit_margin / anchor * 100) if (profit_margin and anchor) else None
+    return {
         "profitMargin": round(profit_margin, 2) if profit_margin else None,
         "marginPct": round(margin_pct, 2) if margin_pct else None,
-        "suggested_buy_price": suggested_buy,
-        "valid": valid,
+        "suggested_buy_price": round(price * 0.9, 2) if price else None,
     }
 
+
+def extract_features(
+    items: List[Listing], cfg: Dict[str, Any], supply: Optional[SupplySnapshot] = None
+) -> Dict[str, np.ndarray]:
+    """Compute the per-listing scoring inputs as named arrays (see FEATURE_COLUMNS)."""
+    rows = []
+    for item in items:
+        price = item.price
+        anchor = item.market_anchor or (price * cfg["default_anchor_multiplier"] if price else None)
+        rows.append((
+            normalize_confidence(item.confidence),
+            price_gap(price, anchor),
+            brand_signal(item.brand, cfg),
+            category_weight(item.category),
+            rarity_boost(*supply.lookup(item.category, item.model)) if supply else 1.0,
+            price if price is not None else np.nan,
+            anchor if anchor is not None else np.nan,
+        ))
+    cols = np.array(rows, dtype=np.float64).reshape(len(rows), len(FEATURE_COLUMNS)).T
+    return {name: cols[j] for j, name in enumerate(FEATURE_COLUMNS)}
+
+
+def score_batch(
+    items: List[Listing],
+    cfg: Dict[str, Any],
+    supply: Optional[SupplySnapshot] = None,
+    features: Optional[Dict[str, np.ndarray]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Vectorized equivalent of score_listing for many listings at once.
+
+    Per-listing features are extracted once into arrays and the flip score is
+    computed by the compiled formula set (``formula.*`` keys in the scoring
+    config override the defaults), so custom formulas need no code changes.
+    """
+    if not items:
+        return []
+    if features is None:
+        features = extract_features(items, cfg, supply)
+    formulas = compile_formulas(cfg)
+    flip_scores = np.round(np.clip(np.nan_to_num(formulas({**scalar_params(cfg), **features})), 0.0, 1.0), 4)
+    flip_scores = np.broadcast_to(flip_scores, (len(items),))
+
+    results: List[Dict[str, Any]] = []
+    for i, item in enumerate(items):
+        price = item.price
+        anchor = features["anchor"][i]
+        results.append({
+            **item.raw,
+            "flipScore": float(flip_scores[i]),
+            "rarityFactor": float(features["rarity"][i]),
+            **_margin_fields(price, None if np.isnan(anchor) else float(anchor)),
+            "valid": price is not None and cfg["min_valid_price"] <= price <= cfg["max_valid_price"],
+        })
+    return results
+
 def _as_listing(data: Dict[str, Any]) -> Listing:
     """Normalize dict to Listing object."""
     return Listing(
@@ -102,6 +202,139 @@ def _as_listing(data: Dict[str, Any]) -> Listing:
         raw=data,
     )
 
+def score_one(
+    listing: Listing | Dict[str, Any],
+    cfg: Optional[Dict[str, Any]] = None,
+    supply: Optional[SupplySnapshot] = None,
+) -> Dict[str, Any]:
+    """Score a single listing (dict or Listing) under ``cfg`` or the current profile."""
+    version = None
+    if cfg is None:
+        profile = get_profile_registry().current()
+        cfg, version = dict(profile.cfg), profile.version
+    item = listing if isinstance(listing, Listing) else _as_listing(listing)
+    return {**score_listing(item, cfg, supply), "profileVersion": version or profile_version(cfg)}
+
+# ============================================================
+# Batch scoring with memoization
+# ============================================================
+
+def listing_key(data: Dict[str, Any]) -> str:
+    """Stable identity for a listing: its URL, else a hash of source and title."""
+    url = data.get("url") or data.get("link")
+    return url or calc_hash([data.get("source"), data.get("title") or data.get("model")])
+
+
+def scoring_fingerprint(
+    item: Listing,
+    version: str,
+    supply: Optional[SupplySnapshot] = None,
+    enriched: bool = False,
+) -> str:
+    """
+    Fingerprint everything score_listing reads for this listing.
+
+    Supply enters through the derived rarity factor, not the raw counts: the
+    counts move whenever listings are stored, the bucketed factor rarely does.
+    Enriched and local-only results are memoized under different fingerprints.
+    """
+    rarity = rarity_boost(*supply.lookup(item.category, item.model)) if supply else 1.0
+    parts = [
+        item.brand, item.model, item.category, item.price,
+        item.confidence, item.market_anchor, rarity, version,
+    ]
+    return fingerprint(parts + ["enriched"] if enriched else parts)
+
+
+def _score_and_persist(
+    items: List[Listing],
+    keys: List[str],
+    cfg: Dict[str, Any],
+    supply: Optional[SupplySnapshot],
+    store: Optional[FeatureStore],
+) -> List[Dict[str, Any]]:
+    features = extract_features(items, cfg, supply)
+    if store is not None and items:
+        try:
+            store.upsert(keys, features)
+        except OSError as e:
+            log.warning(f"[scorer] Failed to persist features: {e}")
+    return score_batch(items, cfg, supply, features)
+
+
+def score_records(
+    records: List[Dict[str, Any]],
+    cfg: Dict[str, Any],
+    supply: Optional[SupplySnapshot] = None,
+    memo: Optional[ScoreMemo] = None,
+    metrics: Optional[Metrics] = None,
+    version: Optional[str] = None,
+    store: Optional[FeatureStore] = None,
+    enricher: Optional["LazyEnricher"] = None,
+    stage_memo: bool = False,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Score raw listing dicts, reusing memoized results for unchanged inputs.
+
+    Every result is stamped with ``profileVersion``. When a feature store is
+    given, the feature vectors of rescored listings are persisted to it.
+    With an enricher, rescored listings are enriched before they are
+    memoized, so memo hits reuse the enriched score instead of re-querying.
+    With ``stage_memo``, memo entries are only staged; the caller commits
+    them once the listings are stored (see ``store_scored``).
+    Returns (scored, fresh): every scored listing in input order, and the
+    subset that was actually rescored and still needs storing.
+    """
+    version = version or profile_version(cfg)
+    if memo is None:
+        items = [_as_listing(d) for d in records]
+        scored = _score_and_persist(items, [listing_key(d) for d in records], cfg, supply, store)
+        for result in scored:
+            result["profileVersion"] = version
+        if enricher is not None:
+            enricher.enrich(scored, cfg, metrics)
+        return scored, scored
+
+    keys = [listing_key(d) for d in records]
+    known = memo.lookup(keys)
+
+    scored: List[Optional[Dict[str, Any]]] = [None] * len(records)
+    misses: List[Tuple[int, str, str, Listing]] = []
+    for i, (key, data) in enumerate(zip(keys, records)):
+        item = _as_listing(data)
+        fp = scoring_fingerprint(item, version, supply, enriched=enricher is not None)
+        cached = known.get(key)
+        if cached and cached[0] == fp:
+            scored[i] = {**data, **cached[1]}
+        else:
+            misses.append((i, key, fp, item))
+
+    fresh = _score_and_persist([m[3] for m in misses], [m[1] for m in misses], cfg, supply, store)
+    for result in fresh:
+        result["profileVersion"] = version
+    if enricher is not None:
+        enricher.enrich(fresh, cfg, metrics)
+    updates: List[Tuple[str, str, Dict[str, Any]]] = []
+    for (i, key, fp, _), result in zip(misses, fresh):
+        memoized = {f: result.get(f) for f in SCORE_FIELDS}
+        memoized.update({f: result[f] for f in ENRICH_FIELDS if f in result})
+        updates.append((key, fp, memoized))
+        scored[i] = result
+    hits = len(records) - len(fresh)
+
+    if stage_memo:
+        memo.stage(updates)
+    else:
+        memo.update(updates)
+    memo.hits += hits
+    memo.misses += len(fresh)
+    if metrics:
+        metrics.inc("memo_hits", hits)
+        metrics.inc("memo_misses", len(fresh))
+    rate = hits / len(records) if records else 0.0
+    log.info(f"[scorer] memo hit rate {rate:.1%} ({hits} hits / {len(fresh)} misses)")
+    return scored, fresh
+
 # ============================================================
 # File utilities
 # ============================================================
@@ -118,76 +351,270 @@ def _resolve_path(env_var: str, default: str, base_dir: str = OUTPUT_DIR) -> str
     os.makedirs(os.path.dirname(candidate), exist_ok=True)
     return candidate
 
-def merge_scored_outputs(output_dir: str = OUTPUT_DIR) -> Path:
-    """Merge all scored_*.json files into a single sorted file."""
-    files = glob.glob(f"{output_dir}/scored_*.json")
+def merge_scored_outputs(output_dir: str | Path = OUTPUT_DIR, top_k: Optional[int] = None,
+                         paths: Optional[List[str | Path]] = None,
+                         latency: Optional["LatencyRecorder"] = None) -> Path:
+    """
+    Merge scored files into a single sorted ``all_scored_listings.json``.
+
+    ``paths`` lists the files to merge (pipeline runs pass the score outputs
+    recorded in their manifest); without it, every scored_*.json in
+    ``output_dir`` is merged. With ``top_k`` set, only the best k valid
+    listings per category and source are kept (bounded heap), and totals for
+    the rest are logged. With ``latency``, merged listings are stamped
+    ``merged``.
+    """
+    files = list(paths) if paths is not None else glob.glob(f"{output_dir}/scored_*.json")
     merged: List[Dict[str, Any]] = []
+    collector = TopKCollector(top_k) if top_k else None
     for f in files:
         try:
             with open(f, "r", encoding="utf-8") as fh:
                 data = json.load(fh)
-                if isinstance(data, list):
+                if not isinstance(data, list):
+                    continue
+                if collector:
+                    collector.extend(data)
+                else:
                     merged.extend(data)
         except Exception as e:
             print(f"[warn] Skipping {f}: {e}")
 
-    merged.sort(key=lambda x: x.get("flipScore", 0), reverse=True)
-    out_path = Path(output_dir) / "all_scored_listings.json"
-    with open(out_path, "w", encoding="utf-8") as fh:
-        json.dump(merged, fh, indent=2)
+    if collector:
+        merged = collector.results()
+        _log_topk_summary("merge", collector)
+    else:
+        merged.sort(key=lambda x: x.get("flipScore", 0), reverse=True)
+    if latency is not None:
+        latency.stamp_all(merged, "merged")
+    out_path = atomic_write_json(Path(output_dir) / "all_scored_listings.json", merged)
     print(f"[done] Merged scored outputs → {out_path}")
     return out_path
 
+def _log_topk_summary(stage: str, collector: TopKCollector) -> None:
+    for group, totals in sorted(collector.summary().items()):
+        log.info(f"[{stage}] top-{collector.k} {group}: {totals}")
+
 # ============================================================
-# CLI entrypoint
+# Library API
 # ============================================================
 
-from app.storage.storage import save_listing_batch  # add this near other imports
+def load_listings(path: str | Path) -> List[Dict[str, Any]]:
+    """Read a scraper/refiner output file (list or {"listings": [...]})."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    listings = data.get("listings") if isinstance(data, dict) else data
+    if not isinstance(listings, list):
+        raise ValueError("Invalid JSON structure: expected list or { 'listings': [...] }.")
+    return listings
+
+
+def _write_json(path: Path, obj: Any) -> None:
+    atomic_write_json(path, obj)
+
+
+def _score_groups(
+    groups: List[List[Dict[str, Any]]],
+    profile: ScoringProfile,
+    metrics: Metrics,
+    memo: Optional[ScoreMemo] = None,
+    store: Optional[FeatureStore] = None,
+    enrich: bool = False,
+    top_k: Optional[int] = None,
+) -> Tuple[List[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    Score several listing groups in one vectorized pass.
+
+    Returns the scored records split back per group, plus the records that
+    were actually rescored (the ones worth saving to the database). Memo
+    entries are only staged: pass the records to ``store_scored``.
+    """
+    cfg = dict(profile.cfg)
+    records = [r for group in groups for r in group]
+    enricher = None
+    if enrich:
+        from app.pipeline.enrichment import LazyEnricher
+        enricher = LazyEnricher()
+    scored, fresh = score_records(
+        records, cfg, SupplySnapshot.load(), memo, metrics, profile.version, store, enricher,
+        stage_memo=True,
+    )
+
+    out: List[List[Dict[str, Any]]] = []
+    offset = 0
+    for group in groups:
+        part = scored[offset:offset + len(group)]
+        offset += len(group)
+        if top_k:
+            collector = TopKCollector(top_k).extend(part)
+            part = collector.results()
+            _log_topk_summary("scorer", collector)
+        out.append(part)
+
+    fresh_ids = {id(r) for r in fresh}
+    to_store = [r for part in out for r in part if id(r) in fresh_ids]
+    return out, to_store
+
+
+def store_scored(to_store: List[Dict[str, Any]], memo: Optional[ScoreMemo] = None,
+                 seen: List[Dict[str, Any]] = ()) -> None:
+    """
+    Save rescored listings, then commit their staged memo entries.
+
+    A failed save raises and commits nothing, so those listings are memo
+    misses (and stored) next time; listings dropped by top-k are never
+    memoized either. The rest of ``seen`` (memo hits) is not stored again
+    but still refreshes its supply ``last_seen``.
+    """
+    stored = {id(r) for r in to_store}
+    touch_listings([r for r in seen if id(r) not in stored])
+    save_listing_batch(to_store)
+    if memo is not None:
+        memo.commit(listing_key(r) for r in to_store)
+
+
+def scored_path(input_path: str | Path, output_dir: str = OUTPUT_DIR) -> Path:
+    """Per-input scored output path: ``scored_<stem>.json`` in ``output_dir``."""
+    return Path(output_dir) / f"scored_{Path(input_path).stem}.json"
+
+
+def score_to_files(
+    paths: List[str | Path],
+    output_dir: str = OUTPUT_DIR,
+    top_k: Optional[int] = None,
+    use_memo: bool = True,
+    persist_features: bool = True,
+    enrich: bool = False,
+    metrics: Optional[Metrics] = None,
+    latency: Optional["LatencyRecorder"] = None,
+) -> List[Path]:
+    """
+    Score input files in-process under one loaded profile.
+
+    All listings are scored in a single pass, saved to the database once and
+    written to ``scored_<stem>.json`` per input. With ``latency``, listings
+    are stamped ``scored`` and (the rescored ones) ``stored``. Unreadable
+    inputs are skipped with a warning; a failed database save raises before
+    any file is written. Returns the written paths.
+    """
+    metrics = metrics or Metrics()
+    inputs: List[Path] = []
+    groups: List[List[Dict[str, Any]]] = []
+    for path in map(Path, paths):
+        try:
+            groups.append(load_listings(path))
+            inputs.append(path)
+        except (OSError, ValueError) as e:
+            log.warning(f"[scorer] Skipping {path}: {e}")
+
+    profile = get_profile_registry().current()
+    memo = ScoreMemo() if use_memo else None
+    metrics.start_timer("score_files")
+    scored, to_store = _score_groups(
+        groups, profile, metrics, memo=memo,
+        store=FeatureStore() if persist_features else None,
+        enrich=enrich, top_k=top_k,
+    )
+    metrics.stop_timer("score_files")
+    if latency is not None:
+        latency.stamp_all([r for part in scored for r in part], "scored")
+
+    try:
+        store_scored(to_store, memo, [r for part in scored for r in part])
+    except Exception as e:
+        log.warning(f"[db] Failed to save listings to database: {e}")
+        raise
+    if latency is not None:
+        latency.stamp_all(to_store, "stored")
+
+    os.makedirs(output_dir, exist_ok=True)
+    written: List[Path] = []
+    for path, part in zip(inputs, scored):
+        out_path = scored_path(path, output_dir)
+        _write_json(out_path, part)
+        written.append(out_path)
+        log.info(f"[scorer] {path.name}: {len(part)} listings → {out_path}")
+
+    log.info(
+        f"[scorer] Scored {sum(map(len, scored))} listings from {len(inputs)} files "
+        f"({len(to_store)} changed) under profile {profile.version}"
+    )
+    return written
+
+
+def score_files(
+    paths: List[str | Path],
+    output_dir: str = OUTPUT_DIR,
+    top_k: Optional[int] = None,
+    use_memo: bool = True,
+    persist_features: bool = True,
+    enrich: bool = False,
+    metrics: Optional[Metrics] = None,
+) -> Path:
+    """Score input files in one pass (see ``score_to_files``), then merge once."""
+    score_to_files(paths, output_dir, top_k, use_memo, persist_features, enrich, metrics)
+    return merge_scored_outputs(output_dir, top_k=top_k)
+
+# ============================================================
+# CLI entrypoint
+# ============================================================
 
 import argparse
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Compute profitability scores for listings.")
-    parser.add_argument("--input", default=f"{OUTPUT_DIR}/cleaned.json", help="Input JSON path")
-    parser.add_argument("--output", default=f"{OUTPUT_DIR}/scored.json", help="Output JSON path")
+    out_dir = run_output_dir()
+    parser.add_argument("--input", default=f"{out_dir}/cleaned.json", help="Input JSON path")
+    parser.add_argument("--output", default=f"{out_dir}/scored.json", help="Output JSON path")
+    parser.add_argument("--top-k", type=int, default=None,
+                        help="Keep only the best K valid listings per category/source")
+    parser.add_argument("--no-memo", action="store_true",
+                        help="Rescore every listing even if its inputs are unchanged")
+    parser.add_argument("--no-features", action="store_true",
+                        help="Do not persist feature vectors to the feature store")
+    parser.add_argument("--enrich", action="store_true",
+                        help="Query market adapters for listings whose score bound can reach the alert threshold")
     args = parser.parse_args()
 
     input_path = args.input
-    cfg = {**DEFAULT_SCORING, **load_cfg("SNIPER_SCORING_CFG", "config/scoring.yaml")}
-
     if not os.path.exists(input_path):
         print(f"[scorer] Input not found: {input_path}")
         return 2
 
     try:
-        with open(input_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        listings = load_listings(input_path)
     except (OSError, json.JSONDecodeError) as e:
         print(f"[scorer] Error reading {input_path}: {e}")
         return 4
-
-    listings = data.get("listings") if isinstance(data, dict) else data
-    if not isinstance(listings, list):
-        print("[scorer] Invalid JSON structure: expected list or { 'listings': [...] }.")
+    except ValueError as e:
+        print(f"[scorer] {e}")
         return 3
 
-    scored = [score_listing(_as_listing(d), cfg) for d in listings]
+    metrics = Metrics()
+    memo = None if args.no_memo else ScoreMemo()
+    scored, to_store = _score_groups(
+        [listings], get_profile_registry().current(), metrics, memo=memo,
+        store=None if args.no_features else FeatureStore(),
+        enrich=args.enrich, top_k=args.top_k,
+    )
+    scored = scored[0]
 
     out_path = Path(args.output)
     try:
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(scored, f, indent=2)
+        _write_json(out_path, scored)
     except OSError as e:
         print(f"[scorer] Error writing {out_path}: {e}")
         return 5
 
     try:
-        save_listing_batch(scored)
+        store_scored(to_store, memo, scored)
     except Exception as e:
         print(f"[db] Failed to save listings to database: {e}")
+        return 6
 
-    print(f"[scorer] ✅ Scored {len(scored)} listings → {out_path}")
-    merge_scored_outputs()
+    print(f"[scorer] ✅ Scored {len(scored)} listings ({len(to_store)} changed) → {out_path}")
+    metrics.report()
+    merge_scored_outputs(out_dir, top_k=args.top_k)
     return 0
 
 if __name__ == "__main__":
@@ -1,23 +1,62 @@
 from __future__ import annotations
 import subprocess
+import importlib
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 
 from app.utils.logger import log
+from app.utils.fileio import OUTPUT_DIR_ENV, atomic_write_json
+from app.utils.hashing import fingerprint
 from app.utils.metrics import Metrics
-from app.utils.dedupe import dedupe_listings
+from app.utils.dedupe import dedupe_listings, near_dedupe_listings
+from app.metrics.latency import LATENCY, LatencyRecorder
+from app.storage.seen_index import SeenIndex
+from app.storage.segment_store import SegmentStore
+from app.storage.storage import touch_listings
+from app.pipeline.profitability_scorer import (
+    get_profile_registry, load_listings, merge_scored_outputs, score_to_files, scored_path,
+)
+from app.pipeline.run_manifest import RunManifest
+from app.pipeline.stage_cache import STAGES, StageCache, file_digest
+from app.pipeline.streaming import StreamConfig, run_stream
+from app.scrapers.preferences import ListingFilter, load_categories
 
 # --------------------------------------------------------------------
 # Configuration
 # --------------------------------------------------------------------
+# Default for direct calls; pipeline runs write under data/runs/<run_id>/output.
 OUTPUT_DIR = "data/output"
 SCRAPERS = {
     "ebay": "app.scrapers.sites.ebay_scraper",
     "craigslist": "app.scrapers.sites.craigslist_scraper",
     "facebook": "app.scrapers.sites.fb_marketplace_sniper",
 }
+# Scrapers run concurrently, each in its own browser session.
+MAX_PARALLEL_SCRAPERS = 3
+SCRAPER_TIMEOUT_SECS = 300
+# With cache_scrapes, cached scrapes are reused for this long. The live site
+# is the real input, so by default every run scrapes afresh (a resumed run
+# still reuses the scrapes checkpointed in its manifest).
+SCRAPE_CACHE_TTL_SECS = 3600
+DEDUPE_DIR = Path(OUTPUT_DIR) / "deduped"
+PIPELINE_MODULE = "app.pipeline.run_all_markets"
+# Listings per checkpointed score chunk (whole files are never split).
+SCORE_CHUNK_LISTINGS = 5000
+# Completed runs kept in the artifact store (see archive_run).
+ARTIFACT_RETAIN_RUNS = 50
+SCORING_MODULES = (
+    "app.pipeline.profitability_scorer",
+    "app.scoring.formula",
+    "app.scoring.scoring_model",
+    "app.scoring.heuristics",
+    "app.scoring.rarity_utils",
+    "app.scoring.scoring_utils",
+)
 
 metrics = Metrics()
 
@@ -25,14 +64,19 @@ metrics = Metrics()
 # --------------------------------------------------------------------
 # SCRAPER RUNNERS
 # --------------------------------------------------------------------
-def run_scraper(site: str, category: str, limit: int = 30) -> Path:
-    """Run a scraper module for a given marketplace (isolated subprocess)."""
-    category_safe = category.replace(" ", "_")
-    out_path = Path(OUTPUT_DIR) / f"{site}_{category_safe}_results.json"
+def run_scraper(site: str, category: str, limit: int = 30,
+                timeout: Optional[float] = SCRAPER_TIMEOUT_SECS,
+                out_dir: Path = Path(OUTPUT_DIR)) -> Path:
+    """Run a scraper module for a given marketplace (isolated subprocess writing to ``out_dir``)."""
+    out_path = raw_output_path(site, category, out_dir)
     log.info(f"[scrape] Running {site} scraper for '{category}'...")
 
     cmd = ["python", "-m", SCRAPERS[site], "--category", category, "--limit", str(limit)]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    env = {**os.environ, OUTPUT_DIR_ENV: str(out_dir)}
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, env=env)
+    except subprocess.TimeoutExpired as e:
+        raise TimeoutError(f"{site} scraper timed out after {timeout}s") from e
 
     if result.returncode != 0:
         log.warning(f"[warn] {site} scraper exited with code {result.returncode}")
@@ -45,9 +89,177 @@ def run_scraper(site: str, category: str, limit: int = 30) -> Path:
     return out_path
 
 
+def raw_output_path(site: str, category: str, out_dir: Path = Path(OUTPUT_DIR)) -> Path:
+    return Path(out_dir) / f"{site}_{category.replace(' ', '_')}_results.json"
+
+
+def _cached_scrape(cache: StageCache, site: str, category: str, limit: int,
+                   scrape: Callable[[], None], out_dir: Path = Path(OUTPUT_DIR)) -> Path:
+    """Run the scrape (and Facebook refine) stages for one site through the cache."""
+    raw_path = raw_output_path(site, category, out_dir)
+    cache.run(
+        "scrape", scrape, [raw_path],
+        # Preferences are pushed into the search URLs, so they are part of the input.
+        params={"site": site, "category": category, "limit": limit,
+                "preferences": asdict(ListingFilter.load())},
+        modules=[SCRAPERS[site]], ttl=SCRAPE_CACHE_TTL_SECS,
+    )
+    if site != "facebook":
+        return raw_path
+    refined = refined_output_path(raw_path)
+    cache.run("refine_facebook", lambda: refine_facebook(raw_path), [refined],
+              inputs=[raw_path], modules=[PIPELINE_MODULE])
+    return refined
+
+
+def scrape_key(site: str, category: str) -> str:
+    """Manifest and timer key for one site/category scrape."""
+    return f"{site}:{category}"
+
+
+def _run_site(site: str, category: str, scrape: Callable[[], Path],
+              manifest: Optional[RunManifest] = None) -> Optional[Path]:
+    """Time and checkpoint one site/category scrape; failures are logged and return None."""
+    key = scrape_key(site, category)
+    if manifest is not None and (done := manifest.site_output(key)):
+        log.info(f"[resume] {key} already scraped → {done}")
+        metrics.inc("sites_resumed")
+        return done
+    metrics.start_timer(f"scrape_{key}")
+    try:
+        path = scrape()
+        if manifest is not None:
+            manifest.mark_site(key, "done", output=path)
+        return path
+    except Exception as e:
+        log.warning(f"[warn] Skipping {key}: {e}")
+        metrics.inc("scrapers_failed")
+        if manifest is not None:
+            manifest.mark_site(key, "failed", error=str(e))
+        return None
+    finally:
+        metrics.stop_timer(f"scrape_{key}")
+
+
+def scrape_site(site: str, category: str, limit: int = 30,
+                timeout: Optional[float] = SCRAPER_TIMEOUT_SECS,
+                cache: Optional[StageCache] = None,
+                manifest: Optional[RunManifest] = None,
+                out_dir: Path = Path(OUTPUT_DIR)) -> Optional[Path]:
+    """Scrape (and refine) one site into ``out_dir``; failures are logged and return None."""
+    cache = cache or StageCache(enabled=False)
+    return _run_site(site, category, lambda: _cached_scrape(
+        cache, site, category, limit, lambda: run_scraper(site, category, limit, timeout, out_dir), out_dir,
+    ), manifest)
+
+
+def _log_critical_path(jobs: List[tuple], start: float) -> None:
+    wall = time.perf_counter() - start
+    keys = [scrape_key(site, category) for site, category in jobs]
+    slowest = max(keys, key=lambda k: metrics.get_duration(f"scrape_{k}"))
+    total = sum(metrics.get_duration(f"scrape_{k}") for k in keys)
+    log.info(
+        f"[scrape] {len(keys)} scrapes in {wall:.1f}s wall ({total:.1f}s summed); "
+        f"critical path: {slowest} {metrics.get_duration(f'scrape_{slowest}'):.1f}s"
+    )
+
+
+def run_scrapers(categories: str | List[str], limit: int = 30, parallel: int = MAX_PARALLEL_SCRAPERS,
+                 timeout: Optional[float] = SCRAPER_TIMEOUT_SECS,
+                 cache: Optional[StageCache] = None,
+                 manifest: Optional[RunManifest] = None,
+                 out_dir: Path = Path(OUTPUT_DIR)) -> List[Path]:
+    """
+    Run every site scraper for every category with at most ``parallel`` in
+    flight; keeps category-major, SCRAPERS order.
+    """
+    categories = [categories] if isinstance(categories, str) else list(categories)
+    jobs = [(site, category) for category in categories for site in SCRAPERS]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="scrape") as pool:
+        paths = list(pool.map(
+            lambda job: scrape_site(job[0], job[1], limit, timeout, cache, manifest, out_dir), jobs,
+        ))
+    _log_critical_path(jobs, start)
+    return [p for p in paths if p is not None]
+
+
+def _scrape_in_context(site: str, category: str, limit: int, provider,
+                       manifest: Optional[RunManifest] = None,
+                       out_dir: Path = Path(OUTPUT_DIR)) -> List[Dict]:
+    mod = importlib.import_module(SCRAPERS[site])
+    try:
+        if site == "facebook":
+            # Facebook walks many pages; checkpoint each so a resume skips them.
+            key = scrape_key(site, category)
+            pages = manifest.completed_pages(key) if manifest else None
+            on_page = (lambda url, path: manifest.mark_page(key, url, path)) if manifest else None
+            return mod.main(category, limit, headless=provider.headless, provider=provider,
+                            completed_pages=pages, on_page=on_page, out_dir=out_dir)
+        with provider.context(site, **mod.context_options()) as context:
+            return mod.scrape(category=category, limit=limit, headless=provider.headless, context=context)
+    except SystemExit as e:
+        # Scraper modules double as CLIs; in-process, an exit must fail only this site.
+        raise RuntimeError(f"{site} scraper exited: {e}") from e
+
+
+def _scrape_site_categories(site: str, categories: List[str], limit: int, headless: bool,
+                            cache: StageCache, manifest: Optional[RunManifest],
+                            out_dir: Path = Path(OUTPUT_DIR)) -> List[Optional[Path]]:
+    """Every category for one site on one warm browser, launched only if something is not cached."""
+    from app.scrapers.browser import BrowserProvider
+
+    paths: List[Optional[Path]] = []
+    with BrowserProvider(headless=headless, metrics=metrics) as provider:
+        for category in categories:
+            def scrape(category: str = category) -> None:
+                items = _scrape_in_context(site, category, limit, provider, manifest, out_dir)
+                atomic_write_json(raw_output_path(site, category, out_dir), items)
+
+            paths.append(_run_site(
+                site, category,
+                lambda category=category, scrape=scrape: _cached_scrape(
+                    cache, site, category, limit, scrape, out_dir,
+                ),
+                manifest,
+            ))
+    return paths
+
+
+def run_scrapers_shared(categories: str | List[str], limit: int = 30, headless: bool = True,
+                        cache: Optional[StageCache] = None,
+                        manifest: Optional[RunManifest] = None,
+                        parallel: int = MAX_PARALLEL_SCRAPERS,
+                        out_dir: Path = Path(OUTPUT_DIR)) -> List[Path]:
+    """
+    Run scrapers in-process with one Chromium per site, reused for all of the
+    site's categories (one context per category).
+
+    Playwright sync objects are bound to their thread, so each site's browser
+    lives on its own thread: sites run in parallel, a site's categories one
+    after another. Per-site timeouts do not apply in this mode.
+    """
+    categories = [categories] if isinstance(categories, str) else list(categories)
+    cache = cache or StageCache(enabled=False)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="browser") as pool:
+        per_site = dict(zip(SCRAPERS, pool.map(
+            lambda site: _scrape_site_categories(site, categories, limit, headless, cache, manifest, out_dir),
+            SCRAPERS,
+        )))
+    _log_critical_path([(site, c) for c in categories for site in SCRAPERS], start)
+    # Category-major, SCRAPERS order, as in run_scrapers.
+    paths = [per_site[site][i] for i in range(len(categories)) for site in SCRAPERS]
+    return [p for p in paths if p is not None]
+
+
 # --------------------------------------------------------------------
 # FACEBOOK REFINEMENT STAGE
 # --------------------------------------------------------------------
+def refined_output_path(raw_path: Path) -> Path:
+    return raw_path.parent / f"facebook_refined_{raw_path.stem}.json"
+
+
 def refine_facebook(raw_path: Path) -> Path:
     """Normalize and deduplicate Facebook scraped listings."""
     with open(raw_path, "r", encoding="utf-8") as f:
@@ -88,61 +300,338 @@ def refine_facebook(raw_path: Path) -> Path:
             "url": url,
         })
 
-    out_path = Path(OUTPUT_DIR) / f"facebook_refined_{raw_path.stem}.json"
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(refined, f, indent=2)
+    out_path = atomic_write_json(refined_output_path(raw_path), refined)
 
     log.info(f"[refine] Facebook unified refine complete → {out_path}")
     return out_path
 
 
 # --------------------------------------------------------------------
-# PROFITABILITY SCORER WRAPPER
+# DEDUPE STAGE
 # --------------------------------------------------------------------
-def run_scorer(input_path: Path):
-    """Run profitability scorer on the given input file."""
-    log.info(f"[score] Scoring {input_path.name}...")
-    cmd = ["python", "app/pipeline/profitability_scorer.py", "--input", str(input_path)]
-    subprocess.run(cmd, check=False)
+def dedupe_files(paths: List[Path], out_dir: Path = DEDUPE_DIR,
+                 index: Optional[SeenIndex] = None, near: bool = True,
+                 listing_filter: Optional[ListingFilter] = None,
+                 latency: Optional[LatencyRecorder] = None) -> List[Path]:
+    """
+    Drop unwanted and duplicate listings; writes the same file names under ``out_dir``.
+
+    Listings outside the preferences (``listing_filter``) are dropped first;
+    scrapers already apply it per card, this catches outputs that bypass them.
+    With a SeenIndex, listings seen in any earlier file or earlier run (by
+    canonical URL or content fingerprint) are dropped. Nothing is recorded
+    here: the run marks its listings seen once they are committed (see
+    ``mark_seen``), so a crash before then leaves them for the next run.
+    Without an index, only URLs repeated within this run are dropped.
+    With ``near``, cross-posts of the same item across all files are then
+    collapsed to their best listing (see ``near_dedupe_listings``).
+    With ``latency``, listings are stamped ``scraped`` at their input file's
+    mtime (scrapers write the file when they finish) and the survivors
+    ``normalized``.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    seen: set = set()
+    pending: set = set()
+    per_file: List[List[Dict]] = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        listings = data.get("listings", []) if isinstance(data, dict) else data
+        metrics.inc("listings_in", len(listings))
+        if latency is not None:
+            scraped_at = path.stat().st_mtime
+            for it in listings:
+                latency.stamp(it, "scraped", scraped_at)
+        if listing_filter is not None:
+            wanted = []
+            for it in listings:
+                reason = listing_filter.reject_reason(it)
+                if reason is None:
+                    wanted.append(it)
+                else:
+                    metrics.inc(f"prefilter_{reason}")
+                    metrics.inc("prefilter_dropped")
+            listings = wanted
+        if index is not None:
+            unique = index.filter_new(listings, mark=False, pending=pending)
+        else:
+            unique = [it for it in dedupe_listings(listings) if (it.get("url") or it.get("link")) not in seen]
+            seen.update(it.get("url") or it.get("link") for it in unique)
+            # Listings without a URL cannot be deduped here; keep them.
+            unique += [it for it in listings if not (it.get("url") or it.get("link"))]
+        metrics.inc("dedupe_dropped", len(listings) - len(unique))
+        per_file.append(unique)
+
+    if near:
+        # Cluster across files so a Craigslist/Facebook/eBay cross-post keeps one listing.
+        tagged = [{**it, "_file": n} for n, items in enumerate(per_file) for it in items]
+        metrics.start_timer("near_dedupe")
+        kept = near_dedupe_listings(tagged)
+        metrics.stop_timer("near_dedupe")
+        metrics.inc("near_dupes_dropped", len(tagged) - len(kept))
+        log.info(f"[dedupe] Near-duplicates: {len(tagged)} → {len(kept)} listings")
+        per_file = [[] for _ in per_file]
+        for it in kept:
+            per_file[it.pop("_file")].append(it)
+
+    if latency is not None:
+        latency.stamp_all([it for items in per_file for it in items], "normalized")
+    out_paths: List[Path] = []
+    for path, unique in zip(paths, per_file):
+        out_paths.append(atomic_write_json(out_dir / path.name, unique))
+        metrics.inc("listings_out", len(unique))
+    log.info(
+        f"[funnel] {metrics.get_count('listings_in')} in → "
+        f"-{metrics.get_count('prefilter_dropped')} prefilter → "
+        f"-{metrics.get_count('dedupe_dropped')} dedupe/seen → "
+        f"-{metrics.get_count('near_dupes_dropped')} near-dupes → "
+        f"{metrics.get_count('listings_out')} to score"
+    )
+    return out_paths
+
+
+def mark_seen(paths: List[Path], index: Optional[SeenIndex],
+              listing_filter: Optional[ListingFilter] = None) -> None:
+    """
+    Record every wanted listing in the dedupe inputs as seen.
+
+    Called once the run's scores are committed. Listings go into ``index``
+    (if any) and refresh their supply ``last_seen``: ones skipped as seen
+    or scored from the memo are not stored again but are still live.
+    Listings the preferences reject are left unmarked, so widening them
+    later brings them back.
+    """
+    listings = [
+        it for p in paths for it in load_listings(p)
+        if listing_filter is None or listing_filter.reject_reason(it) is None
+    ]
+    touch_listings(listings)
+    if index is not None:
+        index.mark(listings)
+        index.save()
 
 
 # --------------------------------------------------------------------
 # MAIN ORCHESTRATION
 # --------------------------------------------------------------------
-def main(category: str, limit: int = 30):
-    """Run the full unified marketplace pipeline."""
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    results: List[Path] = []
+def _checkpointed_stage(manifest: RunManifest, stage: str, inputs: List[Path],
+                        run: Callable[[], List[Path]]) -> List[Path]:
+    """Reuse a stage's committed outputs when its inputs are unchanged; else run and commit."""
+    done = manifest.stage_outputs(stage, inputs)
+    if done is not None:
+        log.info(f"[resume] {stage} already committed; skipping")
+        return done
+    outputs = run()
+    manifest.mark_stage(stage, outputs, inputs)
+    return outputs
 
-    metrics.start_timer("pipeline_run")
 
-    # 1. Run scrapers (each in its own browser session)
-    for site in SCRAPERS:
+def score_chunks(paths: List[Path], max_listings: int = SCORE_CHUNK_LISTINGS) -> List[List[Path]]:
+    """Group input files into chunks of roughly ``max_listings`` listings."""
+    chunks: List[List[Path]] = []
+    current: List[Path] = []
+    size = 0
+    for path in paths:
         try:
-            raw_path = run_scraper(site, category, limit)
-            if site == "facebook":
-                refined = refine_facebook(raw_path)
-                results.append(refined)
+            n = len(load_listings(path))
+        except (OSError, ValueError):
+            n = 0
+        if current and size + n > max_listings:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(path)
+        size += n
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def run_scoring(paths: List[Path], cache: StageCache, manifest: RunManifest,
+                latency: Optional[LatencyRecorder] = None) -> List[Path]:
+    """Score ``paths`` chunk by chunk into the run's output directory, committing each chunk."""
+    profile = get_profile_registry().current()
+    out_dir = str(manifest.output_dir)
+    outputs: List[Path] = []
+    for chunk in score_chunks(paths):
+        scored = [scored_path(p, out_dir) for p in chunk]
+        chunk_id = fingerprint({"profile": profile.version, "inputs": {str(p): file_digest(p) for p in chunk}})
+        if manifest.chunk_done("score", chunk_id):
+            log.info(f"[resume] score chunk {chunk_id[:12]} already committed; skipping")
+            metrics.inc("score_chunks_resumed")
+        else:
+            cache.run("score", lambda: score_to_files(chunk, out_dir, metrics=metrics, latency=latency), scored,
+                      params={"profile": profile.version}, inputs=chunk, modules=SCORING_MODULES)
+            manifest.mark_chunk("score", chunk_id, scored)
+        outputs.extend(scored)
+    return outputs
+
+
+def _read_json_records(path: Path) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return data.get("listings") or [data]
+    return data
+
+
+def archive_run(manifest: RunManifest, store: SegmentStore) -> int:
+    """
+    Move a finished run's intermediate JSON files into the artifact store.
+
+    Raw and refined scrapes, deduped and scored files are appended as
+    batches tagged with the run id, stage and site key (e.g. ``ebay:bikes``)
+    and then deleted; only the manifest and ``all_scored_listings.json`` stay
+    on disk. Returns the records archived.
+    """
+    stems: Dict[str, str] = {}
+    files: List[tuple] = []
+    for key, entry in manifest.data["sites"].items():
+        if entry.get("output"):
+            output = Path(entry["output"])
+            stems[output.stem] = key
+            if output.name.startswith("facebook_refined_"):
+                files.append(("scrape", key, output.with_name(output.name[len("facebook_refined_"):])))
+                files.append(("refine_facebook", key, output))
             else:
-                results.append(raw_path)
-        except Exception as e:
-            log.warning(f"[warn] Skipping {site}: {e}")
+                files.append(("scrape", key, output))
+    for path in map(Path, (manifest.data["stages"].get("dedupe") or {}).get("outputs", [])):
+        files.append(("dedupe", stems.get(path.stem, path.stem), path))
+    for outputs in manifest.data["chunks"].get("score", {}).values():
+        for path in map(Path, outputs):
+            stem = path.stem[len("scored_"):]
+            files.append(("score", stems.get(stem, stem), path))
 
-    # 2. Deduplicate merged listings (optional)
+    archived = 0
+    for stage, source, path in files:
+        if not path.exists():
+            continue
+        try:
+            records = _read_json_records(path)
+        except (OSError, ValueError) as e:
+            log.warning(f"[artifacts] Not archiving {path}: {e}")
+            continue
+        store.append(manifest.run_id, stage, source, records)
+        archived += len(records)
+    store.seal()
+    for _, _, path in files:
+        path.unlink(missing_ok=True)
+    log.info(f"[artifacts] Archived {archived} records from {len(files)} files of run {manifest.run_id}")
+    return archived
+
+
+def main(category: str | List[str] | None = None, limit: int = 30, parallel: int = MAX_PARALLEL_SCRAPERS,
+         timeout: Optional[float] = SCRAPER_TIMEOUT_SECS, shared_browser: bool = False,
+         force: Optional[List[str]] = None, use_cache: bool = True,
+         stream: Optional[StreamConfig] = None, resume: Optional[str] = None,
+         include_seen: bool = False, archive: bool = True, cache_scrapes: bool = False) -> str:
+    """
+    Run the full unified marketplace pipeline (or its streaming mode when ``stream`` is set).
+
+    ``category`` may be one category or a list; with none, the ``categories``
+    in config/preferences.json are used. All categories are scraped in one
+    run (one browser per site in shared-browser mode) and scored together.
+    Every file the run writes lives under ``data/runs/<run_id>/output``, so
+    several runs can execute side by side; ``data/runs/LATEST`` names the
+    last completed run. Progress is checkpointed to
+    ``data/runs/<run_id>/manifest.json``; pass ``resume=<run_id>`` to continue
+    an interrupted run with its original parameters. Listings already
+    processed by earlier runs are skipped unless ``include_seen`` is set.
+    Scrapes go through the stage cache only with ``cache_scrapes``; the
+    later stages are cached whenever ``use_cache`` is set. With ``archive``,
+    the run's intermediate files are moved into the artifact store
+    afterwards (see ``archive_run``). Listings carry latency stamps through
+    every stage; the histograms are written to
+    ``data/reports/latency/batch-<run_id>.json``. Returns the run id.
+    """
+    if resume:
+        manifest = RunManifest.load(resume)
+        params = manifest.params
+        categories = params.get("categories") or [params["category"]]
+        limit = params["limit"]
+        shared_browser = params.get("shared_browser", shared_browser)
+        include_seen = params.get("include_seen", include_seen)
+    else:
+        categories = [category] if isinstance(category, str) else list(category or load_categories())
+
+    if stream is not None:
+        for cat in categories:
+            run_stream(cat, limit, list(SCRAPERS), stream, metrics)
+        metrics.report()
+        return ""
+
+    if not resume:
+        manifest = RunManifest.create({
+            "categories": categories, "limit": limit,
+            "shared_browser": shared_browser, "include_seen": include_seen,
+        })
+    out_dir = manifest.output_dir
+    out_dir.mkdir(parents=True, exist_ok=True)
+    log.info(f"[run] {len(categories)} categories × {len(SCRAPERS)} sites: {', '.join(categories)} → {out_dir}")
+    cache = StageCache(force=force or (), metrics=metrics, enabled=use_cache,
+                       skip=() if cache_scrapes else ("scrape",))
+    latency = LATENCY.child()
+
+    metrics.start_timer("pipeline_run")
     try:
-        dedupe_listings(OUTPUT_DIR)
-    except Exception:
-        pass
+        # 1. Run scrapers: concurrent subprocesses, or one warm in-process browser per site
+        if shared_browser:
+            results: List[Path] = run_scrapers_shared(categories, limit, cache=cache, manifest=manifest,
+                                                      parallel=parallel, out_dir=out_dir)
+        else:
+            results = run_scrapers(categories, limit, parallel, timeout, cache, manifest, out_dir)
+
+        # 2. Drop duplicates across sites and listings already processed by earlier runs
+        index = None if include_seen else SeenIndex()
+        listing_filter = ListingFilter.load()
+        dedupe_dir = out_dir / "deduped"
+        deduped = _checkpointed_stage(manifest, "dedupe", results, lambda: cache.run(
+            "dedupe", lambda: dedupe_files(results, dedupe_dir, index=index, listing_filter=listing_filter,
+                                           latency=latency),
+            [dedupe_dir / p.name for p in results],
+            # Marking listings seen changes what dedupe drops, so the index size is an input too.
+            params={"include_seen": include_seen, "preferences": asdict(listing_filter),
+                    "seen_keys": len(index) if index is not None else None},
+            inputs=results,
+            modules=["app.utils.dedupe", "app.storage.seen_index", "app.scrapers.preferences", PIPELINE_MODULE],
+        ))
+
+        # 3. Score every category's deduped files together under one profile, one checkpoint per chunk
+        scored = run_scoring(deduped, cache, manifest, latency)
+
+        # 4. Merge exactly the score outputs committed to this run's manifest
+        merged_path = out_dir / "all_scored_listings.json"
+        _checkpointed_stage(manifest, "merge", scored, lambda: cache.run(
+            "merge", lambda: merge_scored_outputs(out_dir, paths=scored, latency=latency), [merged_path],
+            inputs=scored, modules=["app.pipeline.profitability_scorer"],
+        ))
 
-    # 3. Run profitability scoring
-    for path in results:
-        run_scorer(path)
+        # 5. Only now are this run's listings safely processed (a failed store raises
+        #    out of the score stage above, failing the run); later runs may skip them
+        mark_seen(results, index, listing_filter)
+    except BaseException:
+        manifest.finish("failed")
+        log.error(f"[run] Run {manifest.run_id} failed; resume with --resume {manifest.run_id}")
+        raise
 
+    manifest.finish("done")
+    report = latency.write_report(f"batch-{manifest.run_id}", extra={"stats": {
+        "categories": categories,
+        "listings_in": metrics.get_count("listings_in"),
+        "listings_out": metrics.get_count("listings_out"),
+    }})
+    log.info(f"[run] Latency report → {report}")
+    if use_cache:
+        cache.prune()
+    if archive:
+        store = SegmentStore()
+        archive_run(manifest, store)
+        store.retain(keep_runs=ARTIFACT_RETAIN_RUNS)
+        store.compact()
     metrics.stop_timer("pipeline_run")
     metrics.report()
 
-    merged_path = Path(OUTPUT_DIR) / "all_scored_listings.json"
-    log.info(f"[done] Unified scoring complete → {merged_path}")
+    log.info(f"[done] Unified scoring complete → {merged_path} (run {manifest.run_id})")
+    return manifest.run_id
 
 
 # --------------------------------------------------------------------
@@ -151,7 +640,42 @@ def main(category: str, limit: int = 30):
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument("--category", required=True, help="Product category (e.g. bikes, electronics)")
+    parser.add_argument("--category", action="append",
+                        help="Product category (e.g. bikes); repeatable. Defaults to the "
+                             "categories in config/preferences.json")
     parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--parallel", type=int, default=MAX_PARALLEL_SCRAPERS,
+                        help="Max scrapers running at once (1 = sequential)")
+    parser.add_argument("--timeout", type=float, default=SCRAPER_TIMEOUT_SECS,
+                        help="Per-scraper timeout in seconds")
+    parser.add_argument("--shared-browser", action="store_true",
+                        help="Launch Chromium once per site and reuse it for every category (in-process)")
+    parser.add_argument("--force", action="append", choices=STAGES + ("all",), default=[],
+                        help="Rerun a stage even if its inputs are unchanged (repeatable)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the stage cache")
+    parser.add_argument("--cache-scrapes", action="store_true",
+                        help=f"Reuse scrapes cached in the last {SCRAPE_CACHE_TTL_SECS}s instead of scraping again")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream listings through bounded queues from scrape to notify")
+    parser.add_argument("--queue-size", type=int, default=StreamConfig.queue_size)
+    parser.add_argument("--score-batch", type=int, default=StreamConfig.score_batch)
+    parser.add_argument("--notify-workers", type=int, default=StreamConfig.notify_workers)
+    parser.add_argument("--fifo", action="store_true",
+                        help="Stream mode: score and alert in scrape order instead of by estimated value")
+    parser.add_argument("--include-seen", action="store_true",
+                        help="Also process listings already seen by earlier runs")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue an interrupted run after its last checkpoint")
+    parser.add_argument("--keep-files", action="store_true",
+                        help="Leave intermediate JSON files on disk instead of archiving them")
     args = parser.parse_args()
-    main(args.category, args.limit)
+    stream_cfg = None
+    if args.stream:
+        stream_cfg = StreamConfig(
+            queue_size=args.queue_size, scrape_workers=args.parallel,
+            score_batch=args.score_batch, notify_workers=args.notify_workers,
+            prioritize=not args.fifo,
+        )
+    main(args.category, args.limit, args.parallel, args.timeout, args.shared_browser,
+         args.force, not args.no_cache, stream_cfg, args.resume, args.include_seen, not args.keep_files,
+         args.cache_scrapes)
@@ -0,0 +1,176 @@
+"""
+Run manifest for checkpointing multi-site pipeline runs.
+
+Each run gets ``data/runs/<run_id>/manifest.json``. It records the run
+parameters plus per-site, per-page, per-stage and per-score-chunk progress.
+Every checkpoint is written atomically (temp file + rename), so a crash
+leaves the last committed state on disk and ``--resume <run_id>`` can pick
+up after it.
+
+The run's files live under ``data/runs/<run_id>/output``, so concurrent runs
+never share a path. When a run finishes, ``data/runs/LATEST`` is atomically
+repointed at it; readers resolve the newest outputs through ``latest_run``.
+"""
+
+from __future__ import annotations
+import json
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.pipeline.stage_cache import file_digest
+from app.utils.fileio import atomic_write_json, atomic_write_text
+from app.utils.logger import log
+
+RUNS_DIR = Path("data/runs")
+LATEST_POINTER = "LATEST"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def new_run_id() -> str:
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:6]}"
+
+
+class RunManifest:
+    """Thread-safe, atomically persisted progress record for one pipeline run."""
+
+    def __init__(self, run_id: str, data: Dict[str, Any], root: str | Path = RUNS_DIR) -> None:
+        self.run_id = run_id
+        self.dir = Path(root) / run_id
+        self.path = self.dir / "manifest.json"
+        self.output_dir = self.dir / "output"
+        self.data = data
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------
+    @classmethod
+    def create(cls, params: Dict[str, Any], root: str | Path = RUNS_DIR,
+               run_id: Optional[str] = None) -> "RunManifest":
+        run_id = run_id or new_run_id()
+        data = {
+            "run_id": run_id,
+            "params": params,
+            "status": "running",
+            "created_at": _now(),
+            "updated_at": _now(),
+            "sites": {},
+            "stages": {},
+            "chunks": {},
+        }
+        manifest = cls(run_id, data, root)
+        manifest.commit()
+        log.info(f"[run] Started run {run_id} → {manifest.path}")
+        return manifest
+
+    @classmethod
+    def load(cls, run_id: str, root: str | Path = RUNS_DIR) -> "RunManifest":
+        path = Path(root) / run_id / "manifest.json"
+        if not path.exists():
+            raise FileNotFoundError(f"No manifest for run {run_id!r} at {path}")
+        data = json.loads(path.read_text(encoding="utf-8"))
+        manifest = cls(run_id, data, root)
+        log.info(f"[run] Resuming run {run_id} (status {data.get('status')})")
+        return manifest
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self.data["params"]
+
+    def commit(self) -> None:
+        """Persist the manifest atomically."""
+        with self._lock:
+            self.data["updated_at"] = _now()
+            atomic_write_json(self.path, self.data, default=str)
+
+    # ------------------------------------------------------------
+    # Sites and pages
+    # ------------------------------------------------------------
+    def site_output(self, site: str) -> Optional[Path]:
+        """Output of a completed site, if it is still on disk."""
+        entry = self.data["sites"].get(site) or {}
+        out = entry.get("output")
+        if entry.get("status") == "done" and out and Path(out).exists():
+            return Path(out)
+        return None
+
+    def mark_site(self, site: str, status: str, output: Optional[Path] = None,
+                  error: Optional[str] = None) -> None:
+        with self._lock:
+            entry = self.data["sites"].setdefault(site, {})
+            entry.update({"status": status, "updated_at": _now()})
+            if output is not None:
+                entry["output"] = str(output)
+            if error is not None:
+                entry["error"] = error
+            self.commit()
+
+    def completed_pages(self, site: str) -> Dict[str, str]:
+        """``{page_url: output_path}`` for pages of ``site`` already committed."""
+        pages = (self.data["sites"].get(site) or {}).get("pages") or {}
+        return {url: out for url, out in pages.items() if Path(out).exists()}
+
+    def mark_page(self, site: str, page: str, output: Path) -> None:
+        with self._lock:
+            entry = self.data["sites"].setdefault(site, {"status": "running"})
+            entry.setdefault("pages", {})[page] = str(output)
+            self.commit()
+
+    # ------------------------------------------------------------
+    # Stages and chunks
+    # ------------------------------------------------------------
+    def stage_outputs(self, stage: str, inputs: Iterable[Path] = ()) -> Optional[List[Path]]:
+        """
+        Outputs of a completed stage, if they are still on disk and the stage's
+        inputs have not changed since (e.g. a failed site was re-scraped).
+        """
+        entry = self.data["stages"].get(stage) or {}
+        outputs = [Path(p) for p in entry.get("outputs", [])]
+        if entry.get("status") != "done" or not all(p.exists() for p in outputs):
+            return None
+        if entry.get("inputs", {}) != {str(p): file_digest(p) for p in inputs}:
+            return None
+        return outputs
+
+    def mark_stage(self, stage: str, outputs: Iterable[Path], inputs: Iterable[Path] = (),
+                   status: str = "done") -> None:
+        with self._lock:
+            self.data["stages"][stage] = {
+                "status": status,
+                "inputs": {str(p): file_digest(p) for p in inputs},
+                "outputs": [str(p) for p in outputs],
+                "completed_at": _now(),
+            }
+            self.commit()
+
+    def chunk_done(self, stage: str, chunk: str) -> bool:
+        outputs = self.data["chunks"].get(stage, {}).get(chunk)
+        return outputs is not None and all(Path(p).exists() for p in outputs)
+
+    def mark_chunk(self, stage: str, chunk: str, outputs: Iterable[Path]) -> None:
+        with self._lock:
+            self.data["chunks"].setdefault(stage, {})[chunk] = [str(p) for p in outputs]
+            self.commit()
+
+    def finish(self, status: str = "done") -> None:
+        with self._lock:
+            self.data["status"] = status
+            self.commit()
+        if status == "done":
+            atomic_write_text(self.dir.parent / LATEST_POINTER, self.run_id)
+
+
+def latest_run(root: str | Path = RUNS_DIR) -> Optional[RunManifest]:
+    """The most recently finished run, or None before the first one completes."""
+    pointer = Path(root) / LATEST_POINTER
+    if not pointer.exists():
+        return None
+    run_id = pointer.read_text(encoding="utf-8").strip()
+    path = Path(root) / run_id / "manifest.json"
+    return RunManifest(run_id, json.loads(path.read_text(encoding="utf-8")), root)
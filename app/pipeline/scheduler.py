@@ -0,0 +1,441 @@
+"""
+Long-running scrape scheduler for many (site, category, region) jobs.
+
+Replaces one ``run_all_markets --category X`` process per cron entry. Each
+job has a priority and a refresh interval; the interval shrinks while a job
+keeps yielding listings above the alert threshold and grows while it comes
+back empty, so busy searches are polled often and dead ones rarely. Due jobs
+run on a fixed pool of worker threads, never more per site than that site's
+concurrency limit. Each worker keeps its own warm Chromium (Playwright sync
+objects are thread-bound) and all workers share the seen index, score memo
+and supply snapshot, so a job run only scores listings it has not seen.
+"""
+
+from __future__ import annotations
+import argparse
+import importlib
+import json
+import queue
+import signal
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.metrics.latency import LATENCY, LatencyRecorder
+from app.pipeline.listing_parser import normalize
+from app.pipeline.profitability_scorer import get_profile_registry, score_records
+from app.storage.score_memo import ScoreMemo
+from app.storage.seen_index import SeenIndex, listing_keys
+from app.storage.storage import save_listing_batch, touch_listings
+from app.storage.supply_index import SupplyIndex, SupplySnapshot
+from app.utils.logger import log
+from app.utils.metrics import Metrics
+
+CONFIG_PATH = Path("config/scheduler.json")
+SITE_MODULES = {
+    "ebay": "app.scrapers.sites.ebay_scraper",
+    "craigslist": "app.scrapers.sites.craigslist_scraper",
+    "facebook": "app.scrapers.sites.fb_marketplace_sniper",
+    "nextdoor": "app.scrapers.sites.nextdoor_scraper",
+}
+# Sites whose scraper takes a region; a region on any other site's job is a config error.
+REGION_SITES = {"craigslist"}
+DEFAULT_WORKERS = 4
+# Facebook rate-limits aggressively; the others tolerate a little parallelism.
+DEFAULT_SITE_LIMITS = {"facebook": 1, "ebay": 2, "craigslist": 2, "nextdoor": 1}
+DEFAULT_INTERVAL_SECS = 900.0
+MIN_INTERVAL_SECS = 120.0
+MAX_INTERVAL_SECS = 6 * 3600.0
+# Interval multipliers after a run with / without high-scoring listings, and after a failure.
+HIT_SPEEDUP = 0.5
+MISS_BACKOFF = 1.5
+FAILURE_BACKOFF = 2.0
+SUPPLY_REFRESH_SECS = 900.0
+
+
+# ============================================================
+# Jobs
+# ============================================================
+
+@dataclass
+class ScrapeJob:
+    """One recurring search plus its adaptive schedule."""
+
+    site: str
+    category: str
+    region: Optional[str] = None
+    priority: int = 0
+    interval: float = DEFAULT_INTERVAL_SECS
+    min_interval: float = MIN_INTERVAL_SECS
+    max_interval: float = MAX_INTERVAL_SECS
+    limit: int = 30
+    next_run: float = 0.0
+    runs: int = 0
+    failures: int = 0
+    hits: int = 0
+    # Exponential moving average of high-scoring listings per run.
+    yield_rate: float = 0.0
+    last_error: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def key(self) -> str:
+        return ":".join(p for p in (self.site, self.category, self.region) if p)
+
+    def reschedule(self, now: float, hits: int = 0, failed: bool = False) -> None:
+        """Adapt the interval to the last run's outcome and set ``next_run``."""
+        self.runs += 1
+        if failed:
+            self.failures += 1
+            factor = FAILURE_BACKOFF
+        else:
+            self.hits += hits
+            self.yield_rate = 0.7 * self.yield_rate + 0.3 * hits
+            factor = HIT_SPEEDUP if hits else MISS_BACKOFF
+        self.interval = min(self.max_interval, max(self.min_interval, self.interval * factor))
+        self.next_run = now + self.interval
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "ScrapeJob":
+        if raw.get("site") not in SITE_MODULES:
+            raise ValueError(f"Unknown site {raw.get('site')!r}; expected one of {sorted(SITE_MODULES)}")
+        if not raw.get("category"):
+            raise ValueError(f"Job for {raw['site']} has no category")
+        if raw.get("region") and raw["site"] not in REGION_SITES:
+            raise ValueError(
+                f"Job for {raw['site']} sets region {raw['region']!r}, but only "
+                f"{sorted(REGION_SITES)} support regions"
+            )
+        names = {f for f in cls.__dataclass_fields__ if f not in ("next_run", "runs", "failures", "hits",
+                                                                     "yield_rate", "last_error")}
+        return cls(**{k: v for k, v in raw.items() if k in names})
+
+
+@dataclass
+class JobResult:
+    scraped: int = 0
+    new: int = 0
+    hits: int = 0
+    secs: float = 0.0
+
+
+def load_jobs(path: str | Path = CONFIG_PATH) -> Dict[str, Any]:
+    """
+    Read scheduler config: ``{"workers": 4, "site_limits": {...}, "jobs": [...]}``.
+
+    ``sites`` / ``categories`` / ``regions`` lists in a job entry expand to
+    every combination, so one entry can describe a whole search grid.
+    ``region`` / ``regions`` are only accepted for ``REGION_SITES``; other
+    sites search their default (national) listings.
+    """
+    with open(path, "r", encoding="utf-8-sig") as f:
+        cfg = json.load(f)
+    jobs: List[ScrapeJob] = []
+    for entry in cfg.get("jobs", []):
+        base = {k: v for k, v in entry.items() if k not in ("sites", "categories", "regions")}
+        for site in entry.get("sites") or [entry.get("site")]:
+            for category in entry.get("categories") or [entry.get("category")]:
+                for region in entry.get("regions") or [entry.get("region")]:
+                    jobs.append(ScrapeJob.from_dict({**base, "site": site, "category": category, "region": region}))
+    return {
+        "workers": int(cfg.get("workers", DEFAULT_WORKERS)),
+        "site_limits": {**DEFAULT_SITE_LIMITS, **cfg.get("site_limits", {})},
+        "jobs": jobs,
+    }
+
+
+# ============================================================
+# Job execution
+# ============================================================
+
+class ListingJobRunner:
+    """
+    Scrape → normalize → seen-filter → score → store → alert for one job.
+
+    State that is expensive to rebuild lives here and is reused across runs:
+    a Chromium per worker thread, the seen index, the score memo and the
+    supply snapshot. Listings are marked seen only once stored; until then
+    their keys are held in a shared pending set so concurrent jobs skip them.
+    """
+
+    def __init__(self, headless: bool = True, notify: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 metrics: Optional[Metrics] = None, seen: Optional[SeenIndex] = None,
+                 latency: Optional[LatencyRecorder] = None) -> None:
+        self.headless = headless
+        self.metrics = metrics or Metrics()
+        self.latency = latency if latency is not None else LATENCY.child()
+        if notify is None:
+            from app.notifiers.webhook_dispatcher import send_webhook
+            notify = lambda record: send_webhook("listing.alert", record)
+        self.notify = notify
+        self.seen = seen if seen is not None else SeenIndex()
+        self._pending: set = set()
+        self.memo = ScoreMemo()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._supply: Optional[SupplyIndex] = None
+
+    def provider(self):
+        """This worker thread's browser, launched on first use and kept warm."""
+        provider = getattr(self._local, "provider", None)
+        if provider is None:
+            from app.scrapers.browser import BrowserProvider
+            provider = self._local.provider = BrowserProvider(self.headless, self.metrics)
+        return provider
+
+    def close_thread(self) -> None:
+        """Close this thread's browser (must run on the thread that used it)."""
+        provider = getattr(self._local, "provider", None)
+        if provider is not None:
+            provider.close()
+            self._local.provider = None
+
+    def supply(self) -> Optional[SupplySnapshot]:
+        """The shared supply snapshot, refreshed by a background SupplyIndex timer."""
+        with self._lock:
+            if self._supply is None:
+                self._supply = SupplyIndex(interval=SUPPLY_REFRESH_SECS).start()
+        return self._supply.snapshot
+
+    def scrape(self, job: ScrapeJob) -> List[Dict[str, Any]]:
+        mod = importlib.import_module(SITE_MODULES[job.site])
+        provider = self.provider()
+        if job.site == "facebook":
+            # Page files are scratch for a scheduled job; results go to the database.
+            with tempfile.TemporaryDirectory(prefix="fb-job-") as tmp:
+                return mod.main(job.category, job.limit, headless=self.headless, provider=provider,
+                                out_dir=Path(tmp)) or []
+        kwargs: Dict[str, Any] = {"region": job.region} if job.region else {}
+        with provider.context(job.site, **mod.context_options()) as context:
+            return mod.scrape(category=job.category, limit=job.limit, headless=self.headless,
+                              context=context, **kwargs)
+
+    def __call__(self, job: ScrapeJob) -> JobResult:
+        t0 = time.perf_counter()
+        raw = self.scrape(job)
+        self.latency.stamp_all(raw, "scraped")
+        listings = normalize(job.site, raw, job.category)
+        self.latency.stamp_all(listings, "normalized")
+        with self._lock:
+            # SeenIndex mutates its Bloom filter in place; serialize access.
+            fresh = self.seen.filter_new(listings, mark=False, pending=self._pending)
+        claimed = [k for it in fresh for k in listing_keys(it)]
+        # Skipped listings are not stored again but are still live supply.
+        fresh_ids = {id(it) for it in fresh}
+        touch_listings([it for it in listings if id(it) not in fresh_ids])
+        result = JobResult(scraped=len(raw), new=len(fresh))
+        if fresh:
+            profile = get_profile_registry().current()
+            cfg = dict(profile.cfg)
+            threshold = float(cfg.get("alert_threshold", 0.7))
+            try:
+                scored, _ = score_records(fresh, cfg, self.supply(), self.memo, None, profile.version)
+                self.latency.stamp_all(scored, "scored")
+                save_listing_batch(scored)
+                with self._lock:
+                    self.seen.mark(fresh)
+                    self.seen.save()
+            finally:
+                # Stored listings are in the index now; failed ones are retried next run.
+                with self._lock:
+                    self._pending.difference_update(claimed)
+            self.latency.stamp_all(scored, "stored")
+            # Best deals alert first.
+            for record in sorted(scored, key=lambda r: r.get("flipScore") or 0.0, reverse=True):
+                if record.get("valid") and (record.get("flipScore") or 0) >= threshold:
+                    self.notify(record)
+                    self.latency.stamp(record, "notified")
+                    result.hits += 1
+        result.secs = time.perf_counter() - t0
+        return result
+
+
+# ============================================================
+# Scheduler
+# ============================================================
+
+class JobScheduler:
+    """Run due jobs on a worker pool within per-site concurrency limits."""
+
+    def __init__(
+        self,
+        jobs: Sequence[ScrapeJob],
+        runner: Optional[Callable[[ScrapeJob], JobResult]] = None,
+        workers: int = DEFAULT_WORKERS,
+        site_limits: Optional[Dict[str, int]] = None,
+        metrics: Optional[Metrics] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.metrics = metrics or Metrics()
+        self.runner = runner or ListingJobRunner(metrics=self.metrics)
+        self.workers = max(1, workers)
+        self.site_limits = {**DEFAULT_SITE_LIMITS, **(site_limits or {})}
+        self.clock = clock
+        self.jobs: Dict[str, ScrapeJob] = {}
+        self.running: Dict[str, int] = {}
+        self._active: set = set()
+        self._cond = threading.Condition()
+        self._inbox: queue.Queue = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        for job in jobs:
+            self.add(job)
+
+    def add(self, job: ScrapeJob) -> None:
+        with self._cond:
+            self.jobs[job.key] = job
+            self._cond.notify_all()
+
+    def remove(self, key: str) -> None:
+        with self._cond:
+            self.jobs.pop(key, None)
+
+    # ------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------
+    def _idle(self) -> int:
+        return self.workers - len(self._active)
+
+    def due(self, now: float) -> List[ScrapeJob]:
+        """Due jobs that fit the free workers and site limits, highest priority first."""
+        ready = sorted(
+            (j for j in self.jobs.values() if j.next_run <= now and j.key not in self._active),
+            key=lambda j: (-j.priority, j.next_run),
+        )
+        picked: List[ScrapeJob] = []
+        running = dict(self.running)
+        for job in ready:
+            if len(picked) >= self._idle():
+                break
+            if running.get(job.site, 0) >= self.site_limits.get(job.site, 1):
+                continue
+            running[job.site] = running.get(job.site, 0) + 1
+            picked.append(job)
+        return picked
+
+    def _dispatch_due(self) -> float:
+        now = self.clock()
+        for job in self.due(now):
+            self._active.add(job.key)
+            self.running[job.site] = self.running.get(job.site, 0) + 1
+            self.metrics.inc("scheduler_dispatched")
+            self._inbox.put(job)
+        return now
+
+    def _next_wakeup(self, now: float) -> float:
+        pending = [j.next_run for j in self.jobs.values() if j.key not in self._active]
+        return max(0.0, min(pending) - now) if pending else 1.0
+
+    # ------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------
+    def _worker(self) -> None:
+        close = getattr(self.runner, "close_thread", None)
+        try:
+            while True:
+                job = self._inbox.get()
+                if job is None:
+                    return
+                self._run_job(job)
+        finally:
+            if close:
+                close()
+
+    def _run_job(self, job: ScrapeJob) -> None:
+        failed, result = True, JobResult()
+        try:
+            result = self.runner(job)
+            failed = False
+        except (Exception, SystemExit) as e:
+            # A scraper exiting (e.g. Facebook without its login state) fails the job, not the worker.
+            job.last_error = str(e) or type(e).__name__
+            log.warning(f"[scheduler] {job.key} failed: {job.last_error}")
+            self.metrics.inc("scheduler_failures")
+        finally:
+            # Always release the job and its site slot, or it never runs again.
+            with self._cond:
+                job.reschedule(self.clock(), result.hits, failed)
+                self._active.discard(job.key)
+                self.running[job.site] -= 1
+                self.metrics.inc("scheduler_runs")
+                self.metrics.inc("scheduler_hits", result.hits)
+                self._cond.notify_all()
+        if not failed:
+            log.info(
+                f"[scheduler] {job.key}: {result.scraped} scraped, {result.new} new, {result.hits} hits "
+                f"in {result.secs:.1f}s; next in {job.interval:.0f}s"
+            )
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"scheduler-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self) -> None:
+        """Let running jobs finish, then stop the workers and close their browsers."""
+        for _ in self._threads:
+            self._inbox.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads.clear()
+
+    # ------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------
+    def run(self, stop: Optional[threading.Event] = None, max_runs: Optional[int] = None) -> None:
+        """
+        Dispatch jobs as they fall due until ``stop`` is set (or ``max_runs``
+        job runs have completed, for one-shot use and tests).
+        """
+        stop = stop or threading.Event()
+        self.start()
+        try:
+            with self._cond:
+                while not stop.is_set():
+                    if max_runs is not None and self.metrics.get_count("scheduler_runs") >= max_runs:
+                        break
+                    now = self._dispatch_due()
+                    # Wake for the next due job, a finished job or a stop request; jobs
+                    # still due after dispatch are waiting on capacity, i.e. a finish.
+                    wait = self._next_wakeup(now)
+                    self._cond.wait(timeout=min(1.0, wait) if wait > 0 else 1.0)
+        finally:
+            self.stop()
+            log.info(f"[scheduler] Stopped after {self.metrics.get_count('scheduler_runs')} job runs")
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [
+                {**asdict(j), "key": j.key, "running": j.key in self._active}
+                for j in sorted(self.jobs.values(), key=lambda j: j.next_run)
+            ]
+
+
+# --------------------------------------------------------------------
+# CLI
+# --------------------------------------------------------------------
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Continuously scrape and score scheduled searches.")
+    parser.add_argument("--config", default=str(CONFIG_PATH), help="Scheduler job config (JSON)")
+    parser.add_argument("--workers", type=int, help="Override the configured worker count")
+    parser.add_argument("--visible", action="store_true", help="Run browsers non-headless for debugging")
+    args = parser.parse_args(argv)
+
+    cfg = load_jobs(args.config)
+    metrics = Metrics()
+    runner = ListingJobRunner(headless=not args.visible, metrics=metrics)
+    scheduler = JobScheduler(cfg["jobs"], runner, args.workers or cfg["workers"], cfg["site_limits"], metrics)
+    log.info(f"[scheduler] {len(cfg['jobs'])} jobs on {scheduler.workers} workers; limits {scheduler.site_limits}")
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    scheduler.run(stop)
+    runner.latency.write_report(f"scheduler-{time.strftime('%Y%m%dT%H%M%S')}")
+    metrics.report()
+
+
+if __name__ == "__main__":
+    main()
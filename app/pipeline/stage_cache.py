@@ -0,0 +1,194 @@
+"""
+Content-addressed cache for marketplace pipeline stages.
+
+Each stage declares its parameters, input files, output files and the code
+modules it runs. The cache key is a fingerprint of all of these (input files
+by name and content, modules by source). When a key was already produced,
+the cached outputs are copied back into place and the stage is skipped, so
+rerunning after a failure only repeats the stages whose inputs or code
+changed. Input directories are not part of the key, so a new run (with its
+own output directory) still reuses an earlier run's work. ``prune`` drops
+entries unused for ``CACHE_MAX_AGE_SECS`` and, oldest first, whatever
+exceeds ``CACHE_MAX_BYTES``.
+"""
+
+from __future__ import annotations
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from app.utils.fileio import atomic_copy, atomic_write_json
+from app.utils.hashing import fingerprint
+from app.utils.logger import log
+from app.utils.metrics import Metrics
+
+CACHE_DIR = Path("data/cache/stages")
+STAGES = ("scrape", "refine_facebook", "dedupe", "score", "merge")
+# Entries not reused for this long are pruned.
+CACHE_MAX_AGE_SECS = 7 * 86400
+# Least recently used entries are pruned beyond this total size.
+CACHE_MAX_BYTES = 2 << 30
+
+
+def file_digest(path: str | Path) -> str:
+    """BLAKE2b digest of a file's bytes (``"missing"`` when absent)."""
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def code_version(*modules: str) -> str:
+    """Fingerprint of the source files behind ``modules`` (not imported)."""
+    digests = {}
+    for name in modules:
+        spec = importlib.util.find_spec(name)
+        origin = spec.origin if spec else None
+        digests[name] = file_digest(origin) if origin else "unknown"
+    return fingerprint(digests)
+
+
+class StageCache:
+    """Skip pipeline stages whose inputs, config and code are unchanged."""
+
+    def __init__(self, root: str | Path = CACHE_DIR, force: Iterable[str] = (),
+                 metrics: Optional[Metrics] = None, enabled: bool = True,
+                 skip: Iterable[str] = ()) -> None:
+        self.root = Path(root)
+        self.force = set(force)
+        self.skip = set(skip)
+        self.metrics = metrics or Metrics()
+        self.enabled = enabled
+
+    def forced(self, stage: str) -> bool:
+        return "all" in self.force or stage in self.force
+
+    def key(self, stage: str, params: Dict[str, Any], inputs: Sequence[Path], code: str) -> str:
+        return fingerprint({
+            "stage": stage,
+            "params": params,
+            "inputs": {p.name: file_digest(p) for p in inputs},
+            "code": code,
+        })
+
+    def run(
+        self,
+        stage: str,
+        fn: Callable[[], Any],
+        outputs: Sequence[str | Path],
+        params: Optional[Dict[str, Any]] = None,
+        inputs: Sequence[str | Path] = (),
+        modules: Sequence[str] = (),
+        ttl: Optional[float] = None,
+    ) -> List[Path]:
+        """
+        Run ``fn`` unless a cached result for the same key exists.
+
+        ``fn`` must write every path in ``outputs``. ``ttl`` bounds the age of
+        a reusable entry (for stages like scraping whose real input is the
+        live site). Stages in ``skip`` always run and are never stored.
+        """
+        outputs = [Path(p) for p in outputs]
+        cached = self.enabled and stage not in self.skip
+        if cached:
+            key = self.key(stage, params or {}, [Path(p) for p in inputs], code_version(*modules))
+            entry = self.root / stage / key
+            manifest = entry / "manifest.json"
+            if not self.forced(stage) and self._restore(manifest, outputs, ttl):
+                self.metrics.inc(f"stage_{stage}_cached")
+                log.info(f"[cache] {stage} {key[:12]} unchanged; reused {len(outputs)} outputs")
+                return outputs
+
+        self.metrics.start_timer(f"stage_{stage}")
+        fn()
+        self.metrics.stop_timer(f"stage_{stage}")
+        self.metrics.inc(f"stage_{stage}_run")
+        if cached:
+            self._store(entry, manifest, stage, params or {}, outputs)
+        return outputs
+
+    # ------------------------------------------------------------
+    # Entries
+    # ------------------------------------------------------------
+    def _restore(self, manifest: Path, outputs: List[Path], ttl: Optional[float]) -> bool:
+        if not manifest.exists():
+            return False
+        try:
+            meta = json.loads(manifest.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return False
+        if ttl is not None and time.time() - meta.get("created_at", 0) > ttl:
+            return False
+        cached = [manifest.parent / f"{i}_{p.name}" for i, p in enumerate(outputs)]
+        if len(meta.get("outputs", [])) != len(outputs) or not all(c.exists() for c in cached):
+            return False
+        try:
+            for src, dst in zip(cached, outputs):
+                if file_digest(dst) != file_digest(src):
+                    # A fresh mtime: dedupe stamps ``scraped`` from it, and the
+                    # cached file's would report its age as pipeline latency.
+                    atomic_copy(src, dst, metadata=False)
+            # The manifest's mtime records the last use, for prune().
+            os.utime(manifest)
+        except OSError as e:
+            # Pruned by another process mid-restore; just rerun the stage.
+            log.warning(f"[cache] Failed to restore {manifest.parent.name[:12]}: {e}")
+            return False
+        return True
+
+    def _store(self, entry: Path, manifest: Path, stage: str,
+               params: Dict[str, Any], outputs: List[Path]) -> None:
+        missing = [str(p) for p in outputs if not p.exists()]
+        if missing:
+            log.warning(f"[cache] {stage} did not write {missing}; not cached")
+            return
+        entry.mkdir(parents=True, exist_ok=True)
+        for i, p in enumerate(outputs):
+            atomic_copy(p, entry / f"{i}_{p.name}")
+        atomic_write_json(manifest, {
+            "stage": stage,
+            "params": params,
+            "outputs": [str(p) for p in outputs],
+            "created_at": time.time(),
+        }, default=str)
+
+    # ------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------
+    def prune(self, max_age: float = CACHE_MAX_AGE_SECS, max_bytes: int = CACHE_MAX_BYTES,
+              now: Optional[float] = None) -> int:
+        """Delete stale and least recently used entries; returns how many were removed."""
+        now = time.time() if now is None else now
+        entries = []
+        for entry in self.root.glob("*/*"):
+            if not entry.is_dir():
+                continue
+            manifest = entry / "manifest.json"
+            try:
+                used = manifest.stat().st_mtime if manifest.exists() else entry.stat().st_mtime
+                size = sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+            except OSError:
+                continue
+            entries.append((used, size, entry))
+
+        entries.sort(key=lambda e: e[0], reverse=True)
+        removed, total = 0, 0
+        for used, size, entry in entries:
+            total += size
+            if now - used > max_age or total > max_bytes:
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                removed += 1
+        if removed:
+            self.metrics.inc("stage_cache_pruned", removed)
+            log.info(f"[cache] Pruned {removed} of {len(entries)} stage cache entries")
+        return removed
@@ -0,0 +1,382 @@
+"""
+Streaming marketplace pipeline: scrape → normalize → dedupe → score → store → notify.
+
+Stages run on worker threads connected by bounded queues, so a listing moves
+on as soon as a scraper extracts it instead of waiting for every site to
+finish and for JSON files to be written. A full queue blocks its producer
+(backpressure), which keeps memory flat when a downstream stage such as
+notification is slow. The score and store stages pull micro-batches so the
+vectorized scorer and the SQLite insert still work on many rows at once.
+
+The score and notify inboxes are priority queues: a cheap alert estimate
+(``app.scoring.triage``) orders listings waiting to be scored, and the real
+flip score orders alerts, so a great deal scraped behind hundreds of junk
+cards is not processed last. ``StreamConfig(prioritize=False)`` restores
+FIFO order for comparing time-to-alert.
+"""
+
+from __future__ import annotations
+import importlib
+import itertools
+import math
+import queue
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.metrics.latency import LATENCY, LatencyRecorder
+from app.pipeline.listing_parser import normalize
+from app.pipeline.profitability_scorer import get_profile_registry, score_records
+from app.storage.score_memo import ScoreMemo
+from app.storage.seen_index import SeenIndex
+from app.scoring.triage import PriceAnchors, estimate_alert
+from app.storage.storage import save_listing_batch, touch_listings
+from app.utils.dedupe import NearDuplicateIndex
+from app.storage.supply_index import SupplyIndex
+from app.utils.logger import log
+from app.utils.metrics import Metrics
+
+_DONE = object()
+
+
+@dataclass
+class StreamConfig:
+    """Queue bounds and per-stage concurrency for a streaming run."""
+
+    queue_size: int = 256
+    scrape_workers: int = 3
+    normalize_workers: int = 1
+    dedupe_wait: float = 0.02
+    score_batch: int = 64
+    score_wait: float = 0.25
+    store_batch: int = 128
+    notify_workers: int = 4
+    alert_threshold: Optional[float] = None  # defaults to the profile's alert_threshold
+    prioritize: bool = True  # False: score and notify in arrival (FIFO) order
+
+
+@dataclass
+class Envelope:
+    """A listing in flight plus the time its scraper emitted it."""
+
+    record: Dict[str, Any]
+    site: str
+    emitted_at: float = field(default_factory=time.perf_counter)
+    estimate: float = 0.0  # cheap pre-score alert estimate, set after dedupe
+
+
+Emit = Callable[[Any], None]
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline step: ``handler(batch, emit)`` run by ``workers`` threads.
+
+    With ``priority``, the stage's inbox is a priority queue and items with
+    the highest ``priority(item)`` are taken first.
+    """
+
+    name: str
+    handler: Callable[[List[Any], Emit], None]
+    workers: int = 1
+    batch_size: int = 1
+    max_wait: float = 0.0
+    priority: Optional[Callable[[Any], float]] = None
+
+
+class StreamingPipeline:
+    """Run stages as threads connected by bounded queues."""
+
+    def __init__(self, stages: Sequence[Stage], queue_size: int = 256,
+                 metrics: Optional[Metrics] = None) -> None:
+        self.stages = list(stages)
+        self.metrics = metrics or Metrics()
+        # queues[i] feeds stages[i]; the last stage is a sink.
+        self.queues: List[queue.Queue] = [
+            (queue.PriorityQueue if s.priority else queue.Queue)(maxsize=queue_size) for s in self.stages
+        ]
+        self._seq = itertools.count()  # FIFO tie-break among equal priorities
+        self._lock = threading.Lock()
+        self.processed: Dict[str, int] = {s.name: 0 for s in self.stages}
+        self.blocked_secs: Dict[str, float] = {s.name: 0.0 for s in self.stages}
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        """Thread-safe Metrics.inc for stage handlers."""
+        with self._lock:
+            self.metrics.inc(name, amount)
+
+    def _put(self, index: int, item: Any) -> None:
+        priority = self.stages[index].priority
+        if priority is None:
+            self.queues[index].put(item)
+        elif item is _DONE:
+            # Sorts after every real item, so queued work drains before shutdown.
+            self.queues[index].put((math.inf, next(self._seq), _DONE))
+        else:
+            self.queues[index].put((-priority(item), next(self._seq), item))
+
+    def _get(self, stage: Stage, inbox: queue.Queue, timeout: Optional[float] = None) -> Any:
+        item = inbox.get(timeout=timeout) if timeout is None or timeout > 0 else inbox.get_nowait()
+        return item[2] if stage.priority else item
+
+    def _take(self, stage: Stage, inbox: queue.Queue) -> Tuple[List[Any], bool]:
+        """Block for one item, then gather up to ``batch_size`` within ``max_wait``."""
+        first = self._get(stage, inbox)
+        if first is _DONE:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + stage.max_wait
+        while len(batch) < stage.batch_size:
+            try:
+                item = self._get(stage, inbox, deadline - time.perf_counter())
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _emitter(self, index: int) -> Emit:
+        if index + 1 >= len(self.stages):
+            return lambda item: None
+        name = self.stages[index].name
+
+        def emit(item: Any) -> None:
+            t0 = time.perf_counter()
+            self._put(index + 1, item)  # blocks while the next stage is saturated
+            waited = time.perf_counter() - t0
+            if waited > 0.001:
+                with self._lock:
+                    self.blocked_secs[name] += waited
+        return emit
+
+    def _work(self, index: int) -> None:
+        stage, inbox, emit = self.stages[index], self.queues[index], self._emitter(index)
+        done = False
+        while not done:
+            batch, done = self._take(stage, inbox)
+            if not batch:
+                continue
+            try:
+                stage.handler(batch, emit)
+            except Exception as e:
+                log.exception(f"[stream] {stage.name} failed on {len(batch)} items: {e}")
+                self.inc(f"stream_{stage.name}_errors")
+            with self._lock:
+                self.processed[stage.name] += len(batch)
+
+    def run(self, items: Iterable[Any]) -> Dict[str, Any]:
+        """Feed ``items`` into the first stage and run until every stage drains."""
+        threads: List[List[threading.Thread]] = []
+        for i, stage in enumerate(self.stages):
+            group = [
+                threading.Thread(target=self._work, args=(i,), name=f"stream-{stage.name}-{w}", daemon=True)
+                for w in range(max(1, stage.workers))
+            ]
+            for t in group:
+                t.start()
+            threads.append(group)
+
+        start = time.perf_counter()
+        for item in items:
+            self._put(0, item)
+        # Shut down in order: once a stage's workers exit, nothing more reaches the next one.
+        for i, group in enumerate(threads):
+            for _ in group:
+                self._put(i, _DONE)
+            for t in group:
+                t.join()
+
+        wall = time.perf_counter() - start
+        self.metrics.durations["stream_run"] = wall
+        for name, count in self.processed.items():
+            self.metrics.inc(f"stream_{name}", count)
+        return {"wall_secs": round(wall, 3), "processed": dict(self.processed),
+                "blocked_secs": {k: round(v, 3) for k, v in self.blocked_secs.items()}}
+
+
+# ============================================================
+# Marketplace stages
+# ============================================================
+
+SITE_MODULES = {
+    "ebay": "app.scrapers.sites.ebay_scraper",
+    "craigslist": "app.scrapers.sites.craigslist_scraper",
+    "facebook": "app.scrapers.sites.fb_marketplace_sniper",
+}
+
+
+def scrape_site(site: str, category: str, limit: int, emit: Callable[[Dict[str, Any]], None]) -> None:
+    """Run one site's scraper in this thread, emitting listings as they are parsed."""
+    mod = importlib.import_module(SITE_MODULES[site])
+    if site == "facebook":
+        # The OCR sniper only returns once every page is processed; its page
+        # files are scratch here, so keep them out of the shared output dir.
+        with tempfile.TemporaryDirectory(prefix="fb-stream-") as tmp:
+            items = mod.main(category, limit, headless=True, out_dir=Path(tmp)) or []
+        for item in items:
+            emit({**item, "source": "facebook"})
+        return
+    mod.scrape(category=category, limit=limit, headless=True, on_item=emit)
+
+
+class MarketplaceStream:
+    """Scrape → normalize → dedupe → score → store → notify for one category."""
+
+    def __init__(
+        self,
+        category: str,
+        limit: int = 30,
+        cfg: Optional[StreamConfig] = None,
+        metrics: Optional[Metrics] = None,
+        scraper: Callable[[str, str, int, Callable[[Dict[str, Any]], None]], None] = scrape_site,
+        notify: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        seen: Optional[SeenIndex] = None,
+        latency: Optional[LatencyRecorder] = None,
+    ) -> None:
+        self.category = category
+        self.limit = limit
+        self.cfg = cfg or StreamConfig()
+        self.metrics = metrics or Metrics()
+        self.scraper = scraper
+        if notify is None:
+            from app.notifiers.webhook_dispatcher import send_webhook
+            notify = lambda record: send_webhook("listing.alert", record)
+        self.notify = notify
+
+        self.profile = get_profile_registry().current()
+        self.score_cfg = dict(self.profile.cfg)
+        threshold = self.cfg.alert_threshold
+        self.threshold = float(self.score_cfg.get("alert_threshold", 0.7)) if threshold is None else threshold
+        self.supply = SupplyIndex()
+        self.memo = ScoreMemo()
+        self.seen = seen if seen is not None else SeenIndex()
+        # Keys passed by dedupe but not yet stored (and so not yet marked seen).
+        self._pending: set = set()
+        self._seen_lock = threading.Lock()
+        self.near = NearDuplicateIndex()
+        self.anchors = PriceAnchors.load() if self.cfg.prioritize else None
+        self.alert_latency: List[float] = []
+        # Per stream, so its report covers this category's run only.
+        self.latency = latency if latency is not None else LATENCY.child()
+        self._lock = threading.Lock()
+        self.pipeline = StreamingPipeline(self.stages(), self.cfg.queue_size, self.metrics)
+
+    def stages(self) -> List[Stage]:
+        cfg = self.cfg
+        by_estimate = (lambda e: e.estimate) if cfg.prioritize else None
+        by_score = (lambda e: e.record.get("flipScore") or 0.0) if cfg.prioritize else None
+        return [
+            Stage("scrape", self._scrape, workers=cfg.scrape_workers),
+            Stage("normalize", self._normalize, workers=cfg.normalize_workers),
+            Stage("dedupe", self._dedupe, batch_size=cfg.score_batch, max_wait=cfg.dedupe_wait),
+            Stage("score", self._score, batch_size=cfg.score_batch, max_wait=cfg.score_wait,
+                  priority=by_estimate),
+            Stage("store", self._store, batch_size=cfg.store_batch, max_wait=cfg.score_wait),
+            Stage("notify", self._notify, workers=cfg.notify_workers, priority=by_score),
+        ]
+
+    # ------------------------------------------------------------
+    # Stage handlers
+    # ------------------------------------------------------------
+    def _scraped(self, site: str, emit: Emit) -> Callable[[Dict[str, Any]], None]:
+        def on_item(item: Dict[str, Any]) -> None:
+            self.latency.stamp(item, "scraped")
+            emit(Envelope(item, site))
+        return on_item
+
+    def _scrape(self, sites: List[str], emit: Emit) -> None:
+        for site in sites:
+            try:
+                self.scraper(site, self.category, self.limit, self._scraped(site, emit))
+            except (Exception, SystemExit) as e:
+                # A scraper exiting (e.g. Facebook without its login state) fails only that site.
+                log.warning(f"[warn] {site} scraper failed: {e or type(e).__name__}")
+                self.pipeline.inc("scrapers_failed")
+
+    def _normalize(self, batch: List[Envelope], emit: Emit) -> None:
+        for e in batch:
+            record = normalize(e.site, [e.record], self.category)[0]
+            self.latency.stamp(record, "normalized")
+            emit(Envelope(record, e.site, e.emitted_at))
+
+    def _dedupe(self, batch: List[Envelope], emit: Emit) -> None:
+        # Single worker, so the near-dupe index needs no lock. Listings are only
+        # marked seen once stored, so one lost to a crash is retried next run.
+        with self._seen_lock:
+            fresh = {id(r) for r in self.seen.filter_new([e.record for e in batch], False, self._pending)}
+        # Skipped listings are not stored again but are still live supply.
+        touch_listings([e.record for e in batch if id(e.record) not in fresh])
+        for e in batch:
+            if id(e.record) not in fresh:
+                self.pipeline.inc("dedupe_dropped")
+                continue
+            # A cross-post of an earlier listing: that one may already have alerted, so it wins.
+            _, earlier = self.near.add(e.record)
+            if earlier:
+                self.pipeline.inc("near_dupes_dropped")
+                with self._seen_lock:
+                    self.seen.mark([e.record])
+                continue
+            if self.cfg.prioritize:
+                e.estimate = estimate_alert(e.record, self.score_cfg, self.anchors)
+            emit(e)
+
+    def _score(self, batch: List[Envelope], emit: Emit) -> None:
+        scored, _ = score_records(
+            [e.record for e in batch], self.score_cfg, self.supply.snapshot, self.memo, None, self.profile.version
+        )
+        self.latency.stamp_all(scored, "scored")
+        for record, e in zip(scored, batch):
+            emit(Envelope(record, e.site, e.emitted_at))
+
+    def _store(self, batch: List[Envelope], emit: Emit) -> None:
+        save_listing_batch([e.record for e in batch])
+        with self._seen_lock:
+            self.seen.mark([e.record for e in batch])
+        self.latency.stamp_all([e.record for e in batch], "stored")
+        for e in batch:
+            if e.record.get("valid") and (e.record.get("flipScore") or 0) >= self.threshold:
+                emit(e)
+
+    def _notify(self, batch: List[Envelope], emit: Emit) -> None:
+        for e in batch:
+            self.notify(e.record)
+            self.latency.stamp(e.record, "notified")
+            with self._lock:
+                self.alert_latency.append(time.perf_counter() - e.emitted_at)
+            self.pipeline.inc("alerts_sent")
+
+    # ------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------
+    def run(self, sites: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Run every site through the stream and return run stats."""
+        self.supply.start()
+        try:
+            stats = self.pipeline.run(list(sites or SITE_MODULES))
+        finally:
+            self.supply.stop()
+        self.seen.save()
+        latency = sorted(self.alert_latency)
+        if latency:
+            stats["first_alert_secs"] = round(latency[0], 3)
+            stats["median_alert_secs"] = round(latency[len(latency) // 2], 3)
+        stats["alerts"] = self.metrics.get_count("alerts_sent")
+        stats["scrapers_failed"] = self.metrics.get_count("scrapers_failed")
+        stats["order"] = "priority" if self.cfg.prioritize else "fifo"
+        report = self.latency.write_report(
+            f"stream-{self.category.replace(' ', '_')}-{time.strftime('%Y%m%dT%H%M%S')}", extra={"stats": stats},
+        )
+        log.info(f"[stream] {self.category}: {stats}; latency report → {report}")
+        return stats
+
+
+def run_stream(category: str, limit: int = 30, sites: Optional[Sequence[str]] = None,
+               cfg: Optional[StreamConfig] = None, metrics: Optional[Metrics] = None) -> Dict[str, Any]:
+    """Convenience wrapper: build a MarketplaceStream and run it."""
+    return MarketplaceStream(category, limit, cfg, metrics).run(sites)
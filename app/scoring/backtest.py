@@ -0,0 +1,253 @@
+"""
+Vectorized backtester for scoring configs.
+
+Loads ``scoring_history`` once into columnar NumPy arrays, then scores every
+candidate config in a single matrix product and reports ranking metrics per
+config. ``scoring_history`` only records the ``profitMargin`` the scorer
+predicted at scoring time (and no listing URL to join sale results on), so
+the metrics measure agreement with the logged scorer, not real outcomes:
+``agreement@k`` is the share of a config's top k that the logged scorer
+predicted profitable. Use the tuner with real outcomes to judge profit.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.scoring.formula import FormulaSet, scalar_params
+from app.storage.scoring_logger import DB_PATH
+from app.utils.logger import log
+
+# ============================================================
+# Constants
+# ============================================================
+
+# Signal columns a config can weight via ``w_<signal>``.
+SIGNALS = ("flipScore", "demand", "liquidity", "resale_anchor", "retail_anchor")
+# Neutral value used where a signal was not recorded.
+NEUTRAL_SIGNAL = 0.5
+DEFAULT_THRESHOLD = 0.7
+
+# ============================================================
+# Data loading
+# ============================================================
+
+@dataclass
+class History:
+    """Columnar view of scoring_history."""
+
+    signals: np.ndarray           # (n, len(SIGNALS)) float64
+    price: np.ndarray             # (n,)
+    predicted_margin: np.ndarray  # (n,) profitMargin as scored, NaN when unknown
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+
+def load_history(db_path: str | Path = DB_PATH, limit: Optional[int] = None) -> History:
+    """Read scoring_history into NumPy arrays in one query."""
+    cols = ", ".join(("price", "profitMargin") + SIGNALS)
+    sql = f"SELECT {cols} FROM scoring_history ORDER BY id"
+    params: tuple = ()
+    if limit:
+        sql += " LIMIT ?"
+        params = (limit,)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    # None -> NaN via float dtype conversion
+    data = np.array(rows, dtype=np.float64).reshape(len(rows), 2 + len(SIGNALS))
+    signals = data[:, 2:]
+    signals = np.where(np.isnan(signals), NEUTRAL_SIGNAL, signals)
+    return History(signals=signals, price=data[:, 0], predicted_margin=data[:, 1])
+
+
+# ============================================================
+# Vectorized evaluation
+# ============================================================
+
+def weight_matrix(configs: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Stack per-config signal weights into a (configs, signals) matrix."""
+    return np.array(
+        [[float(cfg.get(f"w_{name}", 0.0)) for name in SIGNALS] for cfg in configs],
+        dtype=np.float64,
+    )
+
+
+def score_matrix(history: History, configs: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    Score every row under every config, shape (rows, configs).
+
+    Linear configs share one matrix product; a config with a ``formula``
+    string is compiled once and evaluated over the history columns.
+    """
+    scores = history.signals @ weight_matrix(configs).T
+    columns = {name: history.signals[:, j] for j, name in enumerate(SIGNALS)}
+    columns["price"] = history.price
+    for i, cfg in enumerate(configs):
+        expr = cfg.get("formula")
+        if expr:
+            formula = FormulaSet({"score": expr}, output="score")
+            inputs = {**scalar_params(cfg), **columns}
+            scores[:, i] = np.nan_to_num(np.broadcast_to(formula(inputs), (len(history),)))
+    return scores
+
+
+def evaluate(
+    history: History,
+    configs: Sequence[Dict[str, Any]],
+    top_k: int = 20,
+    min_margin: float = 0.0,
+) -> List[Dict[str, Any]]:
+    """Score all configs in one pass and return their agreement with the logged predictions."""
+    n = len(history)
+    if n == 0 or not configs:
+        return [{"config": dict(cfg), "n": n} for cfg in configs]
+
+    scores = score_matrix(history, configs)
+    thresholds = np.array([float(cfg.get("alert_threshold", DEFAULT_THRESHOLD)) for cfg in configs])
+    metrics = ranking_metrics(scores, history.predicted_margin, thresholds, top_k, min_margin)
+    k = metrics["k"]
+
+    return [
+        {
+            "config": dict(cfg),
+            "n": n,
+            f"agreement@{k}": round(float(metrics["precision_at_k"][i]), 4),
+            f"predicted_margin@{k}": round(float(metrics["margin_at_k"][i]), 2),
+            "alerts": int(metrics["alerts"][i]),
+            "alert_agreement": round(float(metrics["alert_precision"][i]), 4),
+        }
+        for i, cfg in enumerate(configs)
+    ]
+
+
+def ranking_metrics(
+    scores: np.ndarray,
+    margin: np.ndarray,
+    thresholds: np.ndarray,
+    top_k: int = 20,
+    min_margin: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    Ranking metrics for a (rows, configs) score matrix.
+
+    A row counts as a hit when its ``margin`` exceeds ``min_margin``; rows
+    without a known margin never count as hits. The tuner passes real
+    outcomes, the backtest the margins predicted at scoring time.
+    """
+    n, c = scores.shape
+    positive = np.nan_to_num(margin, nan=-np.inf) > min_margin
+    margins = np.nan_to_num(margin, nan=0.0)
+
+    k = max(1, min(top_k, n))
+    # Unordered top-k rows per column: O(n) per config instead of a full sort.
+    top_idx = np.argpartition(-scores, k - 1, axis=0)[:k]
+
+    alerted = scores >= thresholds
+    alert_counts = alerted.sum(axis=0)
+    alert_hits = (alerted & positive[:, None]).sum(axis=0)
+    return {
+        "k": k,
+        "precision_at_k": positive[top_idx].mean(axis=0),
+        "margin_at_k": margins[top_idx].mean(axis=0),
+        "alerts": alert_counts,
+        "alert_precision": np.divide(
+            alert_hits, alert_counts, out=np.zeros(c), where=alert_counts > 0
+        ),
+    }
+
+
+def _evaluate_chunk(args) -> List[Dict[str, Any]]:
+    return evaluate(*args)
+
+
+def run_backtest(
+    history: History,
+    configs: Sequence[Dict[str, Any]],
+    top_k: int = 20,
+    min_margin: float = 0.0,
+    workers: int = 1,
+    chunk_size: int = 256,
+) -> List[Dict[str, Any]]:
+    """Evaluate configs, optionally fanning chunks out across processes."""
+    configs = list(configs)
+    if workers <= 1 or len(configs) <= chunk_size:
+        return evaluate(history, configs, top_k, min_margin)
+
+    chunks = [configs[i:i + chunk_size] for i in range(0, len(configs), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(_evaluate_chunk, [(history, c, top_k, min_margin) for c in chunks])
+        return [row for part in parts for row in part]
+
+
+def random_configs(n: int, seed: int = 0, threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Sample n configs with Dirichlet-distributed signal weights."""
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.ones(len(SIGNALS)), size=n)
+    return [
+        {**{f"w_{name}": round(float(w), 4) for name, w in zip(SIGNALS, row)}, "alert_threshold": threshold}
+        for row in weights
+    ]
+
+
+# ============================================================
+# CLI entrypoint
+# ============================================================
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Backtest scoring configs for agreement with the margins logged in scoring_history."
+    )
+    parser.add_argument("--db", default=str(DB_PATH), help="scoring_history SQLite path")
+    parser.add_argument("--configs", help="JSON file with a list of configs")
+    parser.add_argument("--random", type=int, default=0, help="Sample N random configs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--min-margin", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", help="Write the full report to this JSON path")
+    args = parser.parse_args()
+
+    configs: List[Dict[str, Any]] = []
+    if args.configs:
+        configs.extend(json.loads(Path(args.configs).read_text(encoding="utf-8")))
+    if args.random:
+        configs.extend(random_configs(args.random, args.seed))
+    if not configs:
+        print("[backtest] No configs given; use --configs and/or --random.")
+        return 2
+
+    if not Path(args.db).exists():
+        print(f"[backtest] History not found: {args.db}")
+        return 3
+
+    history = load_history(args.db)
+    log.info(f"[backtest] Loaded {len(history)} rows; evaluating {len(configs)} configs")
+    print("[backtest] Margins are the scorer's predictions at scoring time, not sale outcomes: "
+          "agreement@k measures agreement with the logged scorer.")
+    report = run_backtest(history, configs, args.top_k, args.min_margin, args.workers)
+
+    key = f"agreement@{min(args.top_k, len(history))}"
+    report.sort(key=lambda r: r.get(key, 0.0), reverse=True)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[backtest] Wrote {len(report)} results → {args.output}")
+    print(json.dumps(report[:5], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
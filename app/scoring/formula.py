@@ -0,0 +1,251 @@
+"""
+Safe scoring-formula language compiled to NumPy expressions.
+
+Formulas are plain arithmetic over named inputs, e.g.::
+
+    formula.margin_ratio: (resale_anchor - price) / resale_anchor
+    formula.flip_score: sigmoid(margin_ratio * liquidity * (0.8 + 0.4 * demand))
+
+Each expression is parsed once with ``ast``, checked against a whitelist of
+node types and functions, and turned into a tree of closures that evaluate
+whole arrays at a time. Nothing is ever passed to ``eval``.
+"""
+
+from __future__ import annotations
+import ast
+import operator
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set
+
+import numpy as np
+
+# ============================================================
+# Vocabulary
+# ============================================================
+
+FORMULA_PREFIX = "formula."
+DEFAULT_OUTPUT = "flip_score"
+
+
+def _sigmoid(x):
+    # Clip so exp() never overflows on extreme inputs.
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -500, 500)))
+
+
+def _clamp(x, lo=0.0, hi=1.0):
+    return np.clip(x, lo, hi)
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "sigmoid": _sigmoid,
+    "clamp": _clamp,
+    "min": np.minimum,
+    "max": np.maximum,
+    "abs": np.abs,
+    "log": np.log,
+    "exp": np.exp,
+    "sqrt": np.sqrt,
+    "round": np.round,
+    "where": np.where,
+}
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+}
+_UNARY_OPS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+_COMPARE_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+# Reproduces scoring_model.compute_base_score + apply_rarity_flipscore.
+DEFAULT_FORMULAS: Dict[str, str] = {
+    "score_raw": (
+        "w_confidence * confidence + w_price_gap * price_gap"
+        " + w_brand_signal * (0.5 + brand_adj) + w_category * category_weight"
+    ),
+    "base_score": "round(clamp(sigmoid(score_raw ** 0.9)), 4)",
+    "flip_score": "round(clamp(base_score * rarity), 4)",
+}
+
+
+class FormulaError(ValueError):
+    """Raised for formulas that fail to parse or use disallowed syntax."""
+
+
+Evaluator = Callable[[Mapping[str, Any]], Any]
+
+# ============================================================
+# Compilation
+# ============================================================
+
+def _compile_node(node: ast.AST, names: Set[str]) -> Evaluator:
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body, names)
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        value = float(node.value)
+        return lambda env: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        names.add(name)
+        return lambda env: env[name]
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        op = _BIN_OPS[type(node.op)]
+        left, right = _compile_node(node.left, names), _compile_node(node.right, names)
+        return lambda env: op(left(env), right(env))
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        op = _UNARY_OPS[type(node.op)]
+        operand = _compile_node(node.operand, names)
+        return lambda env: op(operand(env))
+
+    if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in _COMPARE_OPS:
+        op = _COMPARE_OPS[type(node.ops[0])]
+        left, right = _compile_node(node.left, names), _compile_node(node.comparators[0], names)
+        return lambda env: op(left(env), right(env))
+
+    if isinstance(node, ast.IfExp):
+        test = _compile_node(node.test, names)
+        body, orelse = _compile_node(node.body, names), _compile_node(node.orelse, names)
+        return lambda env: np.where(test(env), body(env), orelse(env))
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        fn = FUNCTIONS.get(node.func.id)
+        if fn is None:
+            raise FormulaError(f"Unknown function: {node.func.id}")
+        args = [_compile_node(a, names) for a in node.args]
+        if node.func.id == "round" and len(args) == 2:
+            # np.round needs an int for decimals
+            value, decimals = args
+            return lambda env: np.round(value(env), int(decimals(env)))
+        return lambda env: fn(*(a(env) for a in args))
+
+    raise FormulaError(f"Unsupported syntax: {ast.dump(node)[:80]}")
+
+
+class Formula:
+    """A single compiled expression plus the input names it reads."""
+
+    def __init__(self, expr: str) -> None:
+        self.expr = expr
+        try:
+            tree = ast.parse(expr.strip(), mode="eval")
+        except SyntaxError as e:
+            raise FormulaError(f"Invalid formula {expr!r}: {e.msg}") from e
+        self.names: Set[str] = set()
+        self._fn = _compile_node(tree, self.names)
+
+    def evaluate(self, env: Mapping[str, Any]) -> Any:
+        missing = self.names - env.keys()
+        if missing:
+            raise FormulaError(f"Formula {self.expr!r} references unknown names: {sorted(missing)}")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._fn(env)
+
+
+class FormulaSet:
+    """Named formulas evaluated in dependency order over shared inputs."""
+
+    def __init__(self, formulas: Mapping[str, str], output: str = DEFAULT_OUTPUT) -> None:
+        self.compiled = {name: Formula(expr) for name, expr in formulas.items()}
+        if output not in self.compiled:
+            raise FormulaError(f"Output formula {output!r} is not defined")
+        self.output = output
+        self.order = self._resolve_order()
+
+    def _resolve_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(name: str) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise FormulaError(f"Formula cycle through {name!r}")
+            state[name] = 1
+            for dep in self.compiled[name].names & self.compiled.keys():
+                visit(dep)
+            state[name] = 2
+            order.append(name)
+
+        for name in self.compiled:
+            visit(name)
+        return order
+
+    @property
+    def inputs(self) -> Set[str]:
+        """Names that must be supplied by the caller."""
+        needed: Set[str] = set()
+        for f in self.compiled.values():
+            needed |= f.names
+        return needed - self.compiled.keys()
+
+    @property
+    def output_inputs(self) -> Set[str]:
+        """Caller-supplied names the output actually depends on (directly or via other formulas)."""
+        needed: Set[str] = set()
+        visited: Set[str] = set()
+        stack = [self.output]
+        while stack:
+            name = stack.pop()
+            if name in visited:
+                continue
+            visited.add(name)
+            for dep in self.compiled[name].names:
+                if dep in self.compiled:
+                    stack.append(dep)
+                else:
+                    needed.add(dep)
+        return needed
+
+    def evaluate(self, inputs: Mapping[str, Any]) -> Dict[str, Any]:
+        """Return inputs plus every formula result."""
+        env: Dict[str, Any] = dict(inputs)
+        for name in self.order:
+            env[name] = self.compiled[name].evaluate(env)
+        return env
+
+    def __call__(self, inputs: Mapping[str, Any]) -> np.ndarray:
+        return np.asarray(self.evaluate(inputs)[self.output], dtype=np.float64)
+
+
+def formulas_from_cfg(cfg: Mapping[str, Any], base: Optional[Mapping[str, str]] = None) -> Dict[str, str]:
+    """Merge ``formula.<name>`` keys from a flat config over ``base``."""
+    merged = dict(DEFAULT_FORMULAS if base is None else base)
+    for key, value in cfg.items():
+        if key.startswith(FORMULA_PREFIX) and isinstance(value, str):
+            merged[key[len(FORMULA_PREFIX):]] = value
+    return merged
+
+
+_cache: Dict[tuple, FormulaSet] = {}
+
+
+def compile_formulas(cfg: Mapping[str, Any], base: Optional[Mapping[str, str]] = None) -> FormulaSet:
+    """Compile (and cache) the formula set described by a config."""
+    formulas = formulas_from_cfg(cfg, base)
+    output = str(cfg.get("formula_output", DEFAULT_OUTPUT))
+    key = (tuple(sorted(formulas.items())), output)
+    if key not in _cache:
+        _cache[key] = FormulaSet(formulas, output)
+    return _cache[key]
+
+
+def scalar_params(cfg: Mapping[str, Any], exclude: Iterable[str] = ()) -> Dict[str, float]:
+    """Numeric config values usable as formula constants (e.g. the w_* weights)."""
+    skip = set(exclude)
+    return {
+        k: float(v) for k, v in cfg.items()
+        if k not in skip and isinstance(v, (int, float)) and not isinstance(v, bool)
+    }
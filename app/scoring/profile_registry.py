@@ -0,0 +1,105 @@
+"""
+Hot-reloadable scoring profile registry.
+
+Long-running services hold one ProfileRegistry and call ``current()`` per
+scoring pass. The config file's mtime is checked at most once per poll
+interval; the profile is re-parsed only when the file actually changed and
+is swapped in as a new immutable ScoringProfile, so in-flight scorers keep
+the snapshot they started with.
+"""
+
+from __future__ import annotations
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from app.config_loader import load_config
+from app.utils.hashing import fingerprint
+from app.utils.logger import log
+
+DEFAULT_PATH_ENV = "SNIPER_SCORING_CFG"
+DEFAULT_PATH = "config/scoring.yaml"
+POLL_INTERVAL_SECS = 2.0
+
+
+def profile_version(cfg: Mapping[str, Any]) -> str:
+    """Short content hash identifying a scoring profile."""
+    return fingerprint(dict(cfg))[:12]
+
+
+@dataclass(frozen=True)
+class ScoringProfile:
+    """An immutable, versioned scoring config."""
+
+    version: str
+    generation: int
+    cfg: Mapping[str, Any] = field(repr=False)
+    path: str = ""
+    loaded_at: float = 0.0
+
+
+class ProfileRegistry:
+    """Serve the current ScoringProfile and reload it when the file changes."""
+
+    def __init__(
+        self,
+        defaults: Optional[Dict[str, Any]] = None,
+        path_env: str = DEFAULT_PATH_ENV,
+        default_path: str = DEFAULT_PATH,
+        poll_interval: float = POLL_INTERVAL_SECS,
+    ) -> None:
+        self.defaults = dict(defaults or {})
+        self.path = os.environ.get(path_env, default_path)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._profile = self._load(generation=1)
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self, generation: int) -> ScoringProfile:
+        self._stamp = self._file_stamp()
+        cfg = {**self.defaults, **load_config(self.path)}
+        return ScoringProfile(
+            version=profile_version(cfg),
+            generation=generation,
+            cfg=MappingProxyType(cfg),
+            path=self.path,
+            loaded_at=time.time(),
+        )
+
+    def current(self) -> ScoringProfile:
+        """Return the active profile, reloading first if the file changed."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.poll_interval:
+            self._checked_at = now
+            if self._file_stamp() != self._stamp:
+                self.reload()
+        return self._profile
+
+    def reload(self, force: bool = False) -> ScoringProfile:
+        """Re-parse the config file and atomically swap in the new profile."""
+        with self._lock:
+            if not force and self._file_stamp() == self._stamp:
+                return self._profile
+            try:
+                profile = self._load(self._profile.generation + 1)
+            except Exception as e:
+                log.warning(f"[profile] Reload of {self.path} failed, keeping {self._profile.version}: {e}")
+                return self._profile
+            if profile.version != self._profile.version:
+                log.info(
+                    f"[profile] Loaded scoring profile {profile.version} "
+                    f"(generation {profile.generation}) from {self.path}"
+                )
+            self._profile = profile
+            return profile
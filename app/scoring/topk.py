@@ -0,0 +1,89 @@
+from __future__ import annotations
+import heapq
+import itertools
+from typing import Any, Dict, Iterable, List, Tuple
+
+# ============================================================
+# Bounded top-K selection for alert-oriented scoring runs
+# ============================================================
+
+GroupKey = Tuple[str, str]
+
+
+def _group_key(item: Dict[str, Any]) -> GroupKey:
+    category = item.get("category") or item.get("type") or item.get("category_hint") or "unknown"
+    return str(category).lower(), str(item.get("source") or "unknown").lower()
+
+
+class TopKCollector:
+    """
+    Keep the k highest-scoring valid listings per (category, source).
+
+    Each group holds a min-heap of at most k entries, so pushing n listings
+    costs O(n log k) time and O(k) memory per group. Everything that does not
+    make the cut is still counted in per-group running totals.
+    """
+
+    def __init__(self, k: int) -> None:
+        if k <= 0:
+            raise ValueError("k must be a positive integer")
+        self.k = k
+        self._heaps: Dict[GroupKey, List[Tuple[float, int, Dict[str, Any]]]] = {}
+        self._totals: Dict[GroupKey, Dict[str, float]] = {}
+        self._seq = itertools.count()
+
+    def _group_totals(self, key: GroupKey) -> Dict[str, float]:
+        if key not in self._totals:
+            self._totals[key] = {"seen": 0, "valid": 0, "invalid": 0, "dropped": 0, "score_sum": 0.0}
+        return self._totals[key]
+
+    def push(self, item: Dict[str, Any]) -> None:
+        """Offer one scored listing to its group heap."""
+        key = _group_key(item)
+        totals = self._group_totals(key)
+        totals["seen"] += 1
+
+        if item.get("valid") is False:
+            totals["invalid"] += 1
+            return
+
+        score = float(item.get("flipScore") or 0.0)
+        totals["valid"] += 1
+        totals["score_sum"] += score
+
+        heap = self._heaps.setdefault(key, [])
+        # The sequence number breaks ties so dicts are never compared.
+        entry = (score, next(self._seq), item)
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+            totals["dropped"] += 1
+        else:
+            totals["dropped"] += 1
+
+    def extend(self, items: Iterable[Dict[str, Any]]) -> "TopKCollector":
+        for item in items:
+            self.push(item)
+        return self
+
+    def results(self) -> List[Dict[str, Any]]:
+        """Return the kept listings of every group, best first."""
+        kept = [entry for heap in self._heaps.values() for entry in heap]
+        kept.sort(key=lambda e: (e[0], -e[1]), reverse=True)
+        return [item for _, _, item in kept]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Return running totals per group, keyed as 'category/source'."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for key, totals in self._totals.items():
+            valid = int(totals["valid"])
+            out["/".join(key)] = {
+                "seen": int(totals["seen"]),
+                "valid": valid,
+                "invalid": int(totals["invalid"]),
+                "kept": len(self._heaps.get(key, [])),
+                "dropped": int(totals["dropped"]),
+                "mean_score": round(totals["score_sum"] / valid, 4) if valid else None,
+            }
+        return out
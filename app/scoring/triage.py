@@ -0,0 +1,90 @@
+"""
+Cheap first-pass alert estimate used to order work before full scoring.
+
+The estimate uses only what a scraped card already carries (price, brand or
+title, category) plus a cached per-model price anchor, so it costs a dict
+lookup per listing. It mirrors the scorer's price-gap / brand / category
+terms without confidence, rarity, formulas or enrichment; it is a ranking
+key for priority queues, never a replacement for the real flip score.
+"""
+
+from __future__ import annotations
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.scoring.heuristics import KNOWN_BRANDS, brand_signal, category_weight, price_gap
+from app.scoring.scoring_utils import clamp, to_float
+from app.utils.logger import log
+
+DB_PATH = Path("data/listings.db")
+# Models with fewer stored prices than this fall back to the category anchor.
+MIN_ANCHOR_SAMPLES = 3
+
+
+def _key(value: Optional[str]) -> str:
+    return (value or "unknown").strip().lower() or "unknown"
+
+
+@dataclass
+class PriceAnchors:
+    """Average stored price per (category, model) and per category, loaded once."""
+
+    by_model: Dict[Tuple[str, str], float] = field(default_factory=dict)
+    by_category: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, db_path: str | Path = DB_PATH, min_samples: int = MIN_ANCHOR_SAMPLES) -> "PriceAnchors":
+        anchors = cls()
+        if not Path(db_path).exists():
+            return anchors
+        try:
+            conn = sqlite3.connect(db_path)
+            try:
+                rows = conn.execute("""
+                    SELECT LOWER(COALESCE(category, 'unknown')), LOWER(COALESCE(model, 'unknown')),
+                           AVG(price), COUNT(*)
+                    FROM listings WHERE price > 0
+                    GROUP BY 1, 2
+                """).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log.warning(f"[triage] No price anchors ({e}); ranking by brand and category only")
+            return anchors
+        totals: Dict[str, Tuple[float, int]] = {}
+        for category, model, avg, n in rows:
+            if n >= min_samples:
+                anchors.by_model[(category, model)] = avg
+            total, count = totals.get(category, (0.0, 0))
+            totals[category] = (total + avg * n, count + n)
+        anchors.by_category = {c: t / n for c, (t, n) in totals.items() if n >= min_samples}
+        return anchors
+
+    def anchor(self, category: Optional[str], model: Optional[str]) -> Optional[float]:
+        cat = _key(category)
+        return self.by_model.get((cat, _key(model))) or self.by_category.get(cat)
+
+
+def _brand(listing: Dict[str, Any]) -> Optional[str]:
+    if listing.get("brand"):
+        return listing["brand"]
+    words = str(listing.get("title") or listing.get("model") or "").lower().split()
+    return next((w for w in words if w in KNOWN_BRANDS), None)
+
+
+def estimate_alert(listing: Dict[str, Any], cfg: Dict[str, Any],
+                   anchors: Optional[PriceAnchors] = None) -> float:
+    """0..1 likelihood-of-alert proxy from card fields and a cached anchor."""
+    price = to_float(listing.get("price"))
+    if price is None or not cfg.get("min_valid_price", 0) <= price <= cfg.get("max_valid_price", float("inf")):
+        return 0.0
+    anchor = to_float(listing.get("market_avg") or listing.get("anchor_price"))
+    if anchor is None and anchors is not None:
+        anchor = anchors.anchor(listing.get("category"), listing.get("model"))
+    return clamp(
+        cfg.get("w_price_gap", 0.55) * price_gap(price, anchor)
+        + cfg.get("w_brand_signal", 0.15) * (0.5 + brand_signal(_brand(listing), cfg))
+        + cfg.get("w_category", 0.10) * category_weight(listing.get("category"))
+    )
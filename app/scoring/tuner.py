@@ -0,0 +1,234 @@
+"""
+Parallel weight search for config/scoring.yaml over cached features.
+
+Loads the feature matrix from the FeatureStore plus realized outcomes (real
+sale results; the scorer's own margin estimate would only teach it to agree
+with itself), samples candidate ``w_*`` weight vectors (random search,
+optionally refined with a cross-entropy step around the best candidates),
+scores every candidate with the profile's own formulas in one vectorized
+pass per chunk across a process pool, and writes the best profile out as a
+candidate YAML for review.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config_loader import save_config
+from app.scoring.backtest import DEFAULT_THRESHOLD, ranking_metrics
+from app.scoring.formula import FormulaSet, compile_formulas, scalar_params
+from app.storage.feature_store import FEATURE_COLUMNS, LINEAR_WEIGHTS, STORE_DIR, FeatureStore
+from app.utils.logger import log
+
+CANDIDATE_PATH = "config/scoring.candidate.yaml"
+
+# ============================================================
+# Inputs
+# ============================================================
+
+def load_outcomes(ids: Sequence[str], outcomes_path: str | Path) -> np.ndarray:
+    """
+    Realized margin per stored listing id (NaN when unknown).
+
+    Reads ``{id: margin}`` (or a list of ``{"id"|"url", "margin"}`` rows)
+    from a JSON file of real sale results. There is deliberately no fallback
+    to the stored ``profit_margin``: that is the scorer's own prediction.
+    """
+    data = json.loads(Path(outcomes_path).read_text(encoding="utf-8"))
+    if isinstance(data, list):
+        data = {row.get("id") or row.get("url"): row.get("margin") for row in data}
+    known = {k: float(v) for k, v in data.items() if k and v is not None}
+    return np.array([known.get(i, np.nan) for i in ids], dtype=np.float64)
+
+
+# ============================================================
+# Vectorized candidate evaluation
+# ============================================================
+
+def tunable_formulas(cfg: Dict[str, Any]) -> FormulaSet:
+    """The profile's compiled formulas; raises ValueError if they read none of the ``w_*`` weights."""
+    formulas = compile_formulas(cfg)
+    if not set(LINEAR_WEIGHTS) & formulas.output_inputs:
+        raise ValueError(
+            f"The profile's formulas use none of {', '.join(LINEAR_WEIGHTS)}; there are no weights to tune"
+        )
+    return formulas
+
+
+def candidate_scores(features: Dict[str, np.ndarray], cfg: Dict[str, Any], weights: np.ndarray) -> np.ndarray:
+    """
+    The profile's flip score for every candidate, shape (rows, candidates).
+
+    Features broadcast as columns and each ``w_*`` weight as a row, so the
+    compiled formula set (``formula.*`` overrides included) scores every
+    candidate in one pass, rounded and clipped as in score_batch.
+    """
+    rows = len(next(iter(features.values())))
+    inputs = {**scalar_params(cfg), **{name: col[:, None] for name, col in features.items()}}
+    inputs.update({key: weights[None, :, j] for j, key in enumerate(LINEAR_WEIGHTS)})
+    scores = np.broadcast_to(tunable_formulas(cfg)(inputs), (rows, len(weights)))
+    return np.round(np.clip(np.nan_to_num(scores), 0.0, 1.0), 4)
+
+
+def _evaluate_chunk(args) -> np.ndarray:
+    features, cfg, realized, weights, threshold, top_k, min_margin = args
+    scores = candidate_scores(features, cfg, weights)
+    thresholds = np.full(len(weights), threshold)
+    m = ranking_metrics(scores, realized, thresholds, top_k, min_margin)
+    return np.column_stack([m["precision_at_k"], m["margin_at_k"], m["alerts"], m["alert_precision"]])
+
+
+def evaluate_candidates(
+    features: Dict[str, np.ndarray],
+    cfg: Dict[str, Any],
+    realized: np.ndarray,
+    weights: np.ndarray,
+    threshold: float = DEFAULT_THRESHOLD,
+    top_k: int = 20,
+    min_margin: float = 0.0,
+    workers: int = 1,
+    chunk_size: int = 512,
+) -> np.ndarray:
+    """Return (candidates, 4): precision@k, mean margin@k, alerts, alert precision."""
+    chunks = [weights[i:i + chunk_size] for i in range(0, len(weights), chunk_size)]
+    jobs = [(features, cfg, realized, c, threshold, top_k, min_margin) for c in chunks]
+    if workers <= 1 or len(chunks) == 1:
+        return np.vstack([_evaluate_chunk(j) for j in jobs])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.vstack(list(pool.map(_evaluate_chunk, jobs)))
+
+
+def sample_weights(rng: np.random.Generator, n: int, total: float) -> np.ndarray:
+    """Random weight vectors on the simplex scaled to ``total``."""
+    return rng.dirichlet(np.ones(len(LINEAR_WEIGHTS)), size=n) * total
+
+
+def refine_weights(rng: np.random.Generator, elite: np.ndarray, n: int, total: float) -> np.ndarray:
+    """Cross-entropy step: resample around the mean/std of the elite set."""
+    mean, std = elite.mean(axis=0), elite.std(axis=0) + 1e-3
+    samples = np.clip(rng.normal(mean, std, size=(n, elite.shape[1])), 0.0, None)
+    sums = samples.sum(axis=1, keepdims=True)
+    sums[sums == 0] = 1.0
+    return samples / sums * total
+
+
+def _rank(results: np.ndarray) -> np.ndarray:
+    """Order candidates by precision@k, then mean margin@k, then alert precision."""
+    return np.lexsort((-results[:, 3], -results[:, 1], -results[:, 0]))
+
+
+def tune(
+    store: FeatureStore,
+    base_cfg: Dict[str, Any],
+    realized: np.ndarray,
+    candidates: int = 2000,
+    rounds: int = 1,
+    top_k: int = 20,
+    min_margin: float = 0.0,
+    workers: int = 1,
+    seed: int = 0,
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Search weights and return (best_cfg, best_metrics).
+
+    ``realized`` holds the real margin per stored row (see load_outcomes).
+    Raises ValueError when nothing is stored or the profile's formulas have
+    no ``w_*`` weights to tune.
+    """
+    ids, matrix = store.load()
+    if not len(ids):
+        raise ValueError(f"No features stored in {store.root}")
+    tunable_formulas(base_cfg)
+
+    features = {name: np.asarray(matrix[:, j], dtype=np.float64) for j, name in enumerate(FEATURE_COLUMNS)}
+    threshold = float(base_cfg.get("alert_threshold", DEFAULT_THRESHOLD))
+    total = sum(float(base_cfg.get(k, 0.0)) for k in LINEAR_WEIGHTS) or 1.0
+
+    rng = np.random.default_rng(seed)
+    current = np.array([[float(base_cfg.get(k, 0.0)) for k in LINEAR_WEIGHTS]])
+    weights = np.vstack([current, sample_weights(rng, candidates, total)])
+    all_weights, all_results = [], []
+    for r in range(max(1, rounds)):
+        results = evaluate_candidates(features, base_cfg, realized, weights, threshold, top_k, min_margin, workers)
+        all_weights.append(weights)
+        all_results.append(results)
+        log.info(f"[tune] round {r + 1}: best precision@{top_k} {results[:, 0].max():.4f}")
+        if r + 1 < rounds:
+            elite = weights[_rank(results)[: max(10, candidates // 20)]]
+            weights = refine_weights(rng, elite, candidates, total)
+
+    weights = np.vstack(all_weights)
+    results = np.vstack(all_results)
+    best = int(_rank(results)[0])
+    best_cfg = {**base_cfg, **{k: round(float(w), 4) for k, w in zip(LINEAR_WEIGHTS, weights[best])}}
+    baseline = results[0]
+    metrics = {
+        "precision_at_k": float(results[best, 0]),
+        "mean_margin_at_k": float(results[best, 1]),
+        "alerts": int(results[best, 2]),
+        "alert_precision": float(results[best, 3]),
+        "baseline_precision_at_k": float(baseline[0]),
+        "evaluated": int(len(weights)),
+    }
+    return best_cfg, metrics
+
+
+# ============================================================
+# CLI entrypoint
+# ============================================================
+
+def main() -> int:
+    from app.pipeline.profitability_scorer import get_profile_registry
+
+    parser = argparse.ArgumentParser(description="Search scoring weights over cached feature vectors.")
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--outcomes", required=True,
+                        help="JSON {listing_id: realized_margin} of real sale results")
+    parser.add_argument("--candidates", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3, help="1 = pure random search")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--min-margin", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=CANDIDATE_PATH)
+    args = parser.parse_args()
+
+    store = FeatureStore(args.store)
+    profile = get_profile_registry().current()
+    ids, _ = store.load()
+    if not len(ids):
+        print(f"[tune] No features stored in {args.store}; run the scorer first.")
+        return 2
+    realized = load_outcomes(ids.tolist(), args.outcomes)
+    if np.isnan(realized).all():
+        print("[tune] No realized outcomes match the stored features.")
+        return 3
+
+    try:
+        best_cfg, metrics = tune(
+            store, dict(profile.cfg), realized, args.candidates, args.rounds,
+            args.top_k, args.min_margin, args.workers, args.seed,
+        )
+    except ValueError as e:
+        print(f"[tune] {e}")
+        return 4
+    header = (
+        f"Candidate scoring profile tuned from {profile.version} against {Path(args.outcomes).name}\n"
+        f"precision@{args.top_k}: {metrics['precision_at_k']:.4f} "
+        f"(baseline {metrics['baseline_precision_at_k']:.4f}), "
+        f"{metrics['evaluated']} candidates evaluated"
+    )
+    save_config(args.output, best_cfg, header)
+    print(f"[tune] Wrote candidate profile → {args.output}")
+    print(json.dumps(metrics, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
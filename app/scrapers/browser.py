@@ -0,0 +1,114 @@
+"""
+Shared Chromium instance for one scraping thread.
+
+``BrowserProvider`` launches Chromium once and hands out a fresh
+``BrowserContext`` (separate cookies, storage and proxy) per scrape, so the
+scrapes on one thread pay a single browser cold start instead of one each.
+Playwright's sync objects are bound to the thread that created them, so a
+provider and the contexts it hands out must be used from one thread: shared
+pipeline runs keep one provider per site thread, the scheduler one per
+worker. Providers sharing a ``Metrics`` add up their launch times and
+estimated savings.
+"""
+
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.utils.logger import log
+from app.utils.metrics import Metrics
+
+LAUNCH_ARGS: List[str] = ["--disable-blink-features=AutomationControlled"]
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122 Safari/537.36"
+)
+
+
+def desktop_context_options(**overrides: Any) -> Dict[str, Any]:
+    """Default new_context() options shared by the desktop site scrapers."""
+    return {
+        "user_agent": DEFAULT_USER_AGENT,
+        "locale": "en-US",
+        "viewport": {"width": 1280, "height": 900},
+        **overrides,
+    }
+
+
+class BrowserProvider:
+    """Launch Chromium once per run and hand out isolated contexts."""
+
+    def __init__(self, headless: bool = True, metrics: Optional[Metrics] = None) -> None:
+        self.headless = headless
+        self.metrics = metrics or Metrics()
+        self.launch_secs = 0.0
+        self.contexts_opened = 0
+        self._playwright = None
+        self._browser = None
+
+    # ------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------
+    def start(self) -> "BrowserProvider":
+        if self._browser is not None:
+            return self
+        from playwright.sync_api import sync_playwright
+
+        t0 = time.perf_counter()
+        self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        self.launch_secs = time.perf_counter() - t0
+        self.metrics.add_duration("browser_launch", self.launch_secs)
+        self.metrics.inc("browser_launches")
+        log.info(f"[browser] Chromium launched in {self.launch_secs:.2f}s (shared)")
+        return self
+
+    def close(self) -> None:
+        try:
+            if self._browser is not None:
+                self._browser.close()
+        finally:
+            if self._playwright is not None:
+                self._playwright.stop()
+            self._browser = self._playwright = None
+        saved = self.estimated_launch_time_saved()
+        self.metrics.add_duration("browser_launch_saved_estimate", saved)
+        log.info(
+            f"[browser] {self.contexts_opened} contexts on one browser; "
+            f"~{saved:.2f}s of launch time saved (estimate: {self.launch_secs:.2f}s launch "
+            f"x {max(0, self.contexts_opened - 1)} extra contexts)"
+        )
+
+    def __enter__(self) -> "BrowserProvider":
+        # Launch lazily on the first context so fully cached runs never start Chromium.
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------
+    # Contexts
+    # ------------------------------------------------------------
+    @contextmanager
+    def context(self, site: str = "", **options: Any) -> Iterator[Any]:
+        """Yield a fresh BrowserContext; it is closed when the block exits."""
+        self.start()
+        ctx = self._browser.new_context(**options)
+        self.contexts_opened += 1
+        self.metrics.inc("browser_contexts")
+        log.info(f"[browser] New context for {site or 'scraper'}")
+        try:
+            yield ctx
+        finally:
+            try:
+                ctx.close()
+            except Exception as e:
+                log.warning(f"[browser] Failed to close context for {site or 'scraper'}: {e}")
+
+    def estimated_launch_time_saved(self) -> float:
+        """
+        Estimated launch cost avoided, not a measurement: assumes every context
+        past the first would have paid the same cold start as the shared one.
+        """
+        return self.launch_secs * max(0, self.contexts_opened - 1)
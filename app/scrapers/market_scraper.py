@@ -1,9 +1,7 @@
 ﻿from __future__ import annotations
-import os
 from pathlib import Path
 import argparse
 import importlib
-import json
 import sys
 from datetime import datetime, timezone
 from typing import Any, Dict, List
@@ -12,16 +10,15 @@ ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-OUT_DIR = "data/output"
-RAW_PATH = os.path.join(OUT_DIR, "scraped_raw.json")
-PARSED_PATH = os.path.join(OUT_DIR, "parsed_listings.json")
+from app.utils.fileio import atomic_write_json, output_dir
 
+RAW_NAME = "scraped_raw.json"
+PARSED_NAME = "parsed_listings.json"
 
-def save_json(path: str, obj: Any) -> None:
-    """Write JSON to disk with UTF-8 encoding."""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+
+def save_json(path: str | Path, obj: Any) -> None:
+    """Write JSON to disk with UTF-8 encoding (temp file + rename)."""
+    atomic_write_json(path, obj, ensure_ascii=False)
 
 
 def parse_listings(
@@ -112,13 +109,15 @@ def main() -> int:
         "timestamp": datetime.now(timezone.utc).isoformat(),
     }
 
-    save_json(RAW_PATH, {"meta": meta, "items": raw})
+    # $MARKET_OUTPUT_DIR scopes the files to one run; concurrent runs don't collide.
+    raw_path, parsed_path = output_dir() / RAW_NAME, output_dir() / PARSED_NAME
+    save_json(raw_path, {"meta": meta, "items": raw})
 
     parsed = parse_listings(args.site, raw, args.category)
-    save_json(PARSED_PATH, {"meta": meta, "items": parsed})
+    save_json(parsed_path, {"meta": meta, "items": parsed})
 
     print(f"[scrape] {args.site}/{args.category}: raw={len(raw)} parsed={len(parsed)}")
-    print(f"[scrape] wrote {RAW_PATH} and {PARSED_PATH}")
+    print(f"[scrape] wrote {raw_path} and {parsed_path}")
     return 0
 
 
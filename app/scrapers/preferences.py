@@ -0,0 +1,156 @@
+"""
+User preferences (config/preferences.json) applied as early as possible.
+
+Price bounds are pushed into each site's search URL where the site supports
+it (eBay ``_udlo``/``_udhi``, Craigslist ``min_price``/``max_price``,
+Facebook ``minPrice``/``maxPrice``), so irrelevant listings are never
+rendered. Everything else, plus sites without URL filters, goes through
+``Prefilter`` right after a card is parsed and before any OCR, scoring or
+storage, and every drop is counted by reason.
+
+``brands`` may be a list (applies to every category) or a mapping of
+category → brands; categories without an entry are not brand-filtered.
+"""
+
+from __future__ import annotations
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.utils.logger import log
+
+PREFERENCES_PATH = Path("config/preferences.json")
+
+# Query parameters each site's search page accepts for a price range.
+PRICE_URL_PARAMS: Dict[str, Tuple[str, str]] = {
+    "ebay": ("_udlo", "_udhi"),
+    "craigslist": ("min_price", "max_price"),
+    "facebook": ("minPrice", "maxPrice"),
+}
+
+
+def load_preferences(path: str | Path = PREFERENCES_PATH) -> Dict[str, Any]:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return json.load(f)
+
+
+def load_categories(path: str | Path = PREFERENCES_PATH) -> List[str]:
+    """The ``categories`` list from the user preferences file."""
+    categories = load_preferences(path).get("categories") or []
+    if not categories:
+        raise ValueError(f"No categories configured in {path}")
+    return list(categories)
+
+
+def to_price(value: Any) -> Optional[float]:
+    """Parse ``120``, ``"120.5"`` or ``"$1,200"``; None when there is no number."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r"\d+(?:\.\d+)?", str(value or "").replace(",", ""))
+    return float(match.group(0)) if match else None
+
+
+# ============================================================
+# Filter
+# ============================================================
+
+@dataclass(frozen=True)
+class ListingFilter:
+    """Price range and brand preferences for scraped listings."""
+
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    brands: Tuple[str, ...] = ()
+    category_brands: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+    @classmethod
+    def from_preferences(cls, prefs: Dict[str, Any]) -> "ListingFilter":
+        brands = prefs.get("brands") or ()
+        by_category = {}
+        if isinstance(brands, dict):
+            by_category = {c.lower(): tuple(b.lower() for b in bs) for c, bs in brands.items()}
+            brands = ()
+        return cls(
+            price_min=to_price(prefs.get("price_min")),
+            price_max=to_price(prefs.get("price_max")),
+            brands=tuple(b.lower() for b in brands),
+            category_brands=by_category,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path = PREFERENCES_PATH) -> "ListingFilter":
+        return cls.from_preferences(load_preferences(path))
+
+    def brands_for(self, category: Optional[str]) -> Tuple[str, ...]:
+        return self.category_brands.get((category or "").lower(), self.brands)
+
+    def url_params(self, site: str) -> Dict[str, str]:
+        """Price-range query parameters ``site`` understands (empty if none)."""
+        names = PRICE_URL_PARAMS.get(site)
+        if not names:
+            return {}
+        params = {}
+        for name, value in zip(names, (self.price_min, self.price_max)):
+            if value is not None:
+                params[name] = f"{value:g}"
+        return params
+
+    def apply_to_url(self, site: str, url: str) -> str:
+        """``url`` with this filter's price parameters merged into its query."""
+        params = self.url_params(site)
+        if not params:
+            return url
+        parts = urlsplit(url)
+        query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        query.update(params)
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    def reject_reason(self, listing: Dict[str, Any], category: Optional[str] = None) -> Optional[str]:
+        """Why ``listing`` fails the preferences, or None. Unknown prices pass."""
+        price = to_price(listing.get("price"))
+        if price is not None:
+            if self.price_min is not None and price < self.price_min:
+                return "price_below_min"
+            if self.price_max is not None and price > self.price_max:
+                return "price_above_max"
+        brands = self.brands_for(category or listing.get("category"))
+        if brands:
+            text = " ".join(str(listing.get(k) or "") for k in ("brand", "title", "model")).lower()
+            if not any(re.search(rf"\b{re.escape(b)}\b", text) for b in brands):
+                return "brand_mismatch"
+        return None
+
+
+class Prefilter:
+    """Apply a ListingFilter to cards as they are parsed and count drops by reason."""
+
+    def __init__(self, site: str, category: Optional[str] = None,
+                 listing_filter: Optional[ListingFilter] = None) -> None:
+        self.site = site
+        self.category = category
+        self.filter = listing_filter if listing_filter is not None else ListingFilter.load()
+        self.seen = 0
+        self.dropped: Dict[str, int] = {}
+
+    def __call__(self, listing: Dict[str, Any]) -> bool:
+        """True if ``listing`` should be kept."""
+        self.seen += 1
+        reason = self.filter.reject_reason(listing, self.category)
+        if reason is None:
+            return True
+        self.dropped[reason] = self.dropped.get(reason, 0) + 1
+        return False
+
+    @property
+    def kept(self) -> int:
+        return self.seen - sum(self.dropped.values())
+
+    def report(self) -> None:
+        if self.seen:
+            log.info(f"[prefilter] {self.site}: kept {self.kept}/{self.seen} cards; dropped {self.dropped or 0}")
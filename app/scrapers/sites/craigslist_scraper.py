@@ -1,13 +1,19 @@
 ﻿from __future__ import annotations
 import json
+from contextlib import ExitStack
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from playwright.sync_api import sync_playwright
+from app.scrapers.browser import LAUNCH_ARGS, desktop_context_options
+from app.scrapers.preferences import ListingFilter, Prefilter
+from app.utils.fileio import atomic_write_json, output_dir
 from app.utils.logger import log
 from app.utils.proxies import get_proxies, rotate
 
 KEYWORDS_FILE = Path("config/keywords.json")
+# Used by the CLI and by in-process callers (pipeline, stream, scheduler) alike.
+DEFAULT_REGION = "houston"
 
 # --------------------------------------------------------------------
 # Keyword utilities
@@ -55,26 +61,26 @@ def query_first(page, selectors: List[str]):
 # --------------------------------------------------------------------
 # Craigslist scraping logic
 # --------------------------------------------------------------------
-def _build_url(region: Optional[str], category: str) -> str:
-    """Craigslist title-only search URL."""
+def _build_url(region: Optional[str], category: str, listing_filter: Optional[ListingFilter] = None) -> str:
+    """Craigslist title-only search URL, narrowed to the preferred price range."""
     base = f"https://{region}.craigslist.org" if region else "https://www.craigslist.org"
     query = get_search_query(category)
-    return f"{base}/search/sss?query={query.replace(' ', '+')}&srchType=T&sort=date"
+    url = f"{base}/search/sss?query={query.replace(' ', '+')}&srchType=T&sort=date"
+    return listing_filter.apply_to_url("craigslist", url) if listing_filter is not None else url
 
 def _setup_browser(playwright, headless: bool, proxy: str | None = None):
     browser = playwright.chromium.launch(
         headless=headless,
-        args=["--disable-blink-features=AutomationControlled"],
+        args=LAUNCH_ARGS,
         proxy={"server": proxy} if proxy else None,
     )
-    context = browser.new_context(
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                   "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122 Safari/537.36",
-        locale="en-US",
-        viewport={"width": 1280, "height": 900},
-    )
+    context = browser.new_context(**context_options())
     return browser, context, context.new_page()
 
+def context_options() -> Dict[str, Any]:
+    """new_context() options for Craigslist, also used by a shared BrowserProvider."""
+    return desktop_context_options()
+
 def _extract_field(card, selectors, attr: str | None = None):
     el = query_first(card, selectors)
     if not el:
@@ -110,41 +116,55 @@ def _build_result(card, selectors, category: str) -> Dict[str, Any]:
     }
 
 
-def _extract_listings(page, selectors, url: str, limit: int, category: str) -> List[Dict[str, Any]]:
+def _extract_listings(page, selectors, url: str, limit: int, category: str,
+                      on_item: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      prefilter: Optional[Prefilter] = None) -> List[Dict[str, Any]]:
     log.info(f"[scrape] Navigating to {url}")
     page.goto(url, wait_until="domcontentloaded", timeout=60_000)
     page.wait_for_selector("div.cl-search-result", timeout=15000)
     page.wait_for_timeout(2000)
     items: List[Dict[str, Any]] = []
+    keyword = category.lower()
     for container_sel in selectors.get("listing_container", []):
         for el in page.query_selector_all(container_sel)[:limit]:
             data = _build_result(el, selectors, category)
-            if data:
+            # Filter by keyword relevance, then preferences
+            if data and keyword in (data["title"] or "").lower() and (prefilter is None or prefilter(data)):
                 items.append(data)
-    # Filter by keyword relevance
-    keyword = category.lower()
-    items = [r for r in items if keyword in (r["title"] or "").lower()]
+                if on_item:
+                    on_item(data)
     return items
 
-def scrape(*, category: str, region: str | None = None, limit: int = 30, headless: bool = True) -> List[Dict[str, Any]]:
+def scrape(*, category: str, region: str | None = DEFAULT_REGION, limit: int = 30, headless: bool = True,
+           context=None, on_item: Optional[Callable[[Dict[str, Any]], None]] = None,
+           listing_filter: Optional[ListingFilter] = None) -> List[Dict[str, Any]]:
+    """
+    Scrape Craigslist in ``region`` (``None`` searches craigslist.org); a provided ``context`` (owned by the caller) skips the
+    browser launch, and ``on_item`` receives each relevant listing as it is parsed.
+    Preferences (``listing_filter``, default config/preferences.json) narrow
+    the search URL by price and drop non-matching cards. Nothing is written;
+    callers that want a file (the CLI, the pipeline) write the results.
+    """
     selectors = load_selectors("craigslist")
-    url = _build_url(region, category)
+    listing_filter = listing_filter if listing_filter is not None else ListingFilter.load()
+    prefilter = Prefilter("craigslist", category, listing_filter)
+    url = _build_url(region, category, listing_filter)
     results: List[Dict[str, Any]] = []
-    with sync_playwright() as p:
-        browser, context, page = _setup_browser(p, headless, proxy=None)
-        try:
+    with ExitStack() as stack:
+        if context is None:
             log.info(f"[scrape] Launching browser for '{category}' in {region}")
-            results = _extract_listings(page, selectors, url, limit, category)
+            p = stack.enter_context(sync_playwright())
+            browser, context, page = _setup_browser(p, headless, proxy=None)
+            stack.callback(browser.close)
+            stack.callback(context.close)
+        else:
+            page = context.new_page()
+            stack.callback(page.close)
+        try:
+            results = _extract_listings(page, selectors, url, limit, category, on_item, prefilter)
         except Exception as e:
             log.warning(f"[scrape] Craigslist scrape failed: {e}")
-        finally:
-            context.close()
-            browser.close()
-    category_safe = category.replace(" ", "_")
-    out_path = Path("data/output") / f"craigslist_{category_safe}_results.json"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
-    log.info(f"[done] wrote {out_path} ({len(results)} items)")
+    prefilter.report()
     return results
 
 # --------------------------------------------------------------------
@@ -154,9 +174,12 @@ if __name__ == "__main__":
     from argparse import ArgumentParser
     parser = ArgumentParser()
     parser.add_argument("--category", default="pokemon cards")
-    parser.add_argument("--region", default="houston")
+    parser.add_argument("--region", default=DEFAULT_REGION)
     parser.add_argument("--limit", type=int, default=10)
     parser.add_argument("--headless", action="store_true", default=True)
     args = parser.parse_args()
     data = scrape(category=args.category, region=args.region, limit=args.limit, headless=args.headless)
+    category_safe = args.category.replace(" ", "_")
+    out_path = atomic_write_json(output_dir() / f"craigslist_{category_safe}_results.json", data)
+    log.info(f"[done] wrote {out_path} ({len(data)} items)")
     print(f"[output] Scraped {len(data)} relevant items")
@@ -3,17 +3,20 @@ import json
 import re
 import urllib.parse
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
+from contextlib import ExitStack
 from functools import lru_cache
 from playwright.sync_api import sync_playwright
 
+from app.scrapers.browser import LAUNCH_ARGS, desktop_context_options
+from app.scrapers.preferences import ListingFilter, Prefilter
+from app.utils.fileio import atomic_write_json, output_dir
 from app.utils.logger import log
 from app.utils.proxies import get_proxies, rotate
 
 # --------------------------------------------------------------------
 # Config
 # --------------------------------------------------------------------
-OUTPUT_DIR = Path("data/output")
 KEYWORDS_FILE = Path("config/keywords.json")
 DEFAULT_CATEGORY = "pokemon cards"
 
@@ -46,13 +49,15 @@ def _save_keywords(keywords: dict[str, str]) -> None:
     with KEYWORDS_FILE.open("w", encoding="utf-8") as f:
         json.dump(keywords, f, indent=2)
 
-def _build_url(category: str) -> str:
+def _build_url(category: str, listing_filter: Optional[ListingFilter] = None) -> str:
     keywords = _load_keywords()
     query = keywords.get(category.lower(), category)
     if category.lower() not in keywords:
         keywords[category.lower()] = category
         _save_keywords(keywords)
     params = {"_nkw": query, "_sop": "10", "_ipg": "60"}
+    if listing_filter is not None:
+        params.update(listing_filter.url_params("ebay"))
     return "https://www.ebay.com/sch/i.html?" + urllib.parse.urlencode(params)
 
 # --------------------------------------------------------------------
@@ -62,17 +67,17 @@ def _setup_browser(playwright, headless: bool, proxy: Optional[str] = None):
     log.info(f"[proxy] Launching browser {'with proxy' if proxy else 'without proxy'}: {proxy or 'none'}")
     browser = playwright.chromium.launch(
         headless=headless,
-        args=["--disable-blink-features=AutomationControlled"],
+        args=LAUNCH_ARGS,
         proxy={"server": proxy} if proxy else None,
     )
-    context = browser.new_context(
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                   "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122 Safari/537.36",
-        locale="en-US",
-        viewport={"width": 1280, "height": 900},
-    )
+    context = browser.new_context(**context_options())
     return browser, context, context.new_page()
 
+
+def context_options() -> Dict[str, Any]:
+    """new_context() options for eBay, also used by a shared BrowserProvider."""
+    return desktop_context_options()
+
 # --------------------------------------------------------------------
 # Parsing Helpers
 # --------------------------------------------------------------------
@@ -142,15 +147,34 @@ def _log_selector_counts(page, selectors: Dict[str, str]) -> None:
 # --------------------------------------------------------------------
 # Scraper
 # --------------------------------------------------------------------
-def scrape(*, category: str, limit: int = 30, headless: bool = True) -> List[Dict[str, Any]]:
-    """Scrape eBay listings by category (supports .s-item and .s-card layouts)."""
-    url = _build_url(category)
-    log.info(f"[scrape] Launching browser to scrape: {url}")
+def scrape(*, category: str, limit: int = 30, headless: bool = True,
+           context=None, on_item: Optional[Callable[[Dict[str, Any]], None]] = None,
+           listing_filter: Optional[ListingFilter] = None) -> List[Dict[str, Any]]:
+    """
+    Scrape eBay listings by category (supports .s-item and .s-card layouts).
+
+    Pass a ``context`` from a shared BrowserProvider to skip launching a
+    browser; the caller owns (and closes) it. ``on_item`` is called with each
+    listing as soon as its card is parsed. Preferences (``listing_filter``,
+    default config/preferences.json) narrow the search URL by price and drop
+    non-matching cards before they are returned.
+    """
+    listing_filter = listing_filter if listing_filter is not None else ListingFilter.load()
+    prefilter = Prefilter("ebay", category, listing_filter)
+    url = _build_url(category, listing_filter)
     items: List[Dict[str, Any]] = []
 
     selectors = _get_selectors()
-    with sync_playwright() as p:
-        browser, context, page = _setup_browser(p, headless, proxy=None)
+    with ExitStack() as stack:
+        if context is None:
+            log.info(f"[scrape] Launching browser to scrape: {url}")
+            p = stack.enter_context(sync_playwright())
+            browser, context, page = _setup_browser(p, headless, proxy=None)
+            stack.callback(browser.close)
+            stack.callback(context.close)
+        else:
+            page = context.new_page()
+            stack.callback(page.close)
         try:
             _navigate_to_results(page, url)
             _log_selector_counts(page, selectors)
@@ -158,15 +182,15 @@ def scrape(*, category: str, limit: int = 30, headless: bool = True) -> List[Dic
             cards = _get_cards(page, limit)
             for card in cards:
                 item = _extract_card_data(card, selectors, category)
-                if item:
+                if item and prefilter(item):
                     items.append(item)
+                    if on_item:
+                        on_item(item)
 
         except Exception as e:
             log.warning(f"[scrape] eBay scrape failed: {e}")
-        finally:
-            context.close()
-            browser.close()
 
+    prefilter.report()
     _report_scrape_summary(items)
     return items
 
@@ -247,7 +271,5 @@ if __name__ == "__main__":
 
     results = scrape(category=args.category, limit=args.limit, headless=args.headless)
     safe_name = args.category.replace(" ", "_")
-    output_path = OUTPUT_DIR / f"ebay_{safe_name}_results.json"
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    output_path = atomic_write_json(output_dir() / f"ebay_{safe_name}_results.json", results)
     log.info(f"[done] wrote {output_path} ({len(results)} items)")
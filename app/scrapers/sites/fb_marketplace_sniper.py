@@ -4,12 +4,15 @@ import re
 import time
 import os
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import Callable, List, Dict, Any, Tuple, Optional
 from urllib.parse import urlparse, quote_plus
 from PIL import Image, ImageOps, ImageFilter, ImageEnhance
 from app.utils.logger import log
 from app.utils.proxies import get_proxies, rotate
 from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
+from app.scrapers.browser import BrowserProvider
+from app.scrapers.preferences import ListingFilter, Prefilter
+from app.utils.fileio import atomic_write_json, output_dir
 import pytesseract
 
 # ------------------------------------------------------------
@@ -18,11 +21,9 @@ import pytesseract
 ROOT = Path(".")
 URLS_FILE = ROOT / "urls.txt"
 STORAGE_PATH = ROOT / "data/browser_storage/fb_storage_state.json"
-OUTPUT_DIR = ROOT / "data/output"
 SCREENSHOT_DIR = ROOT / "data/screenshots"
 
-for d in (OUTPUT_DIR, SCREENSHOT_DIR):
-    d.mkdir(parents=True, exist_ok=True)
+SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
 
 PRICE_REGEX = re.compile(r"\$[\d,]+(?:\.\d{2})?")
 
@@ -84,7 +85,7 @@ def slug_from_url(url: str) -> str:
     slug = parsed.path.strip("/").replace("/", "_") or quote_plus(url)
     return re.sub(r"[^A-Za-z0-9_.-]", "_", slug)[:140]
 
-def extract_single_listing(page, url: str) -> Path:
+def extract_single_listing(page, url: str, out_dir: Optional[Path] = None) -> Path:
     ts = int(time.time())
     slug = slug_from_url(url) or f"fb_listing_{ts}"
     screenshot_path = SCREENSHOT_DIR / f"{slug}_{ts}.png"
@@ -100,18 +101,22 @@ def extract_single_listing(page, url: str) -> Path:
         "screenshot_path": str(screenshot_path.resolve()),
         "scrape_time": ts,
     }
-    out_file = OUTPUT_DIR / f"{slug}_{ts}.json"
-    out_file.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    out_file = atomic_write_json((out_dir or output_dir()) / f"{slug}_{ts}.json", data, ensure_ascii=False)
     log.info(f"[saved] {out_file.name}")
     return out_file
-def extract_multiple_cards(page, url: str) -> Path:
+CardFilter = Callable[[Dict[str, Any]], bool]
+
+
+def extract_multiple_cards(page, url: str, keep: Optional[CardFilter] = None,
+                           out_dir: Optional[Path] = None) -> Path:
     """
     Extract multiple marketplace card listings (title, price, link) from a search results page.
-    Returns path to JSON array file.
+    Cards rejected by ``keep`` are skipped. Returns path to JSON array file in
+    ``out_dir`` (default: ``output_dir()``).
     """
     ts = int(time.time())
     slug = slug_from_url(url) or f"fb_cards_{ts}"
-    out_path = OUTPUT_DIR / f"{slug}_{ts}.json"
+    out_path = (out_dir or output_dir()) / f"{slug}_{ts}.json"
     listings = []
 
     try:
@@ -123,21 +128,22 @@ def extract_multiple_cards(page, url: str) -> Path:
             price_match = PRICE_REGEX.search(title)
             price = price_match.group(0) if price_match else ""
             clean_title = PRICE_REGEX.sub("", title).strip()
-            listings.append(
-                {
-                    "url": f"https://www.facebook.com{href}" if href else url,
-                    "title": clean_title or None,
-                    "price": price or None,
-                    "scrape_time": ts,
-                }
-            )
-        out_path.write_text(json.dumps(listings, indent=2, ensure_ascii=False), encoding="utf-8")
+            card = {
+                "url": f"https://www.facebook.com{href}" if href else url,
+                "title": clean_title or None,
+                "price": price or None,
+                "scrape_time": ts,
+            }
+            if keep is None or keep(card):
+                listings.append(card)
+        atomic_write_json(out_path, listings, ensure_ascii=False)
         log.info(f"[saved] {len(listings)} card screenshots → {out_path.name}")
     except Exception as e:
         log.error(f"[extract_multiple_cards] {e}")
     return out_path
 
-def process_url(context, url: str) -> Optional[Path]:
+def process_url(context, url: str, keep: Optional[CardFilter] = None,
+                out_dir: Optional[Path] = None) -> Optional[Path]:
     """Open URL and return the path to an output JSON with listings."""
     page = context.new_page()
     page.set_default_timeout(30000)
@@ -152,9 +158,9 @@ def process_url(context, url: str) -> Optional[Path]:
         time.sleep(1.5)
 
         if "/marketplace/item/" in url:
-            return extract_single_listing(page, url)          # → JSON object
+            return extract_single_listing(page, url, out_dir)          # → JSON object
         else:
-            return extract_multiple_cards(page, url)          # → JSON array
+            return extract_multiple_cards(page, url, keep, out_dir)    # → JSON array
     except PWTimeout:
         log.warning(f"[timeout] Loading: {url}")
         return None
@@ -186,66 +192,127 @@ def _merge_outputs(paths: List[Path]) -> List[Dict[str, Any]]:
 
 
 def _validate_env() -> List[str]:
-    """Validate prerequisites and return non-empty URL list."""
+    """Validate prerequisites and return non-empty URL list (raises, never exits: main() runs in-process)."""
     if not URLS_FILE.exists():
-        raise SystemExit("Create urls.txt with one Facebook URL per line.")
+        raise FileNotFoundError("Create urls.txt with one Facebook URL per line.")
     if not STORAGE_PATH.exists():
-        raise SystemExit(f"Missing {STORAGE_PATH}. Run save_fb_storage_state.py first.")
+        raise FileNotFoundError(f"Missing {STORAGE_PATH}. Run save_fb_storage_state.py first.")
     urls = [u.strip() for u in URLS_FILE.read_text(encoding="utf-8").splitlines() if u.strip()]
     if not urls:
-        raise SystemExit("urls.txt is empty.")
+        raise RuntimeError("urls.txt is empty.")
     return urls
 
 
-def _scrape_with_proxy(proxy: Optional[str], urls: List[str], limit: int, headless: bool) -> List[Path]:
-    """Launch browser with proxy and process given URLs."""
+def context_options(proxy: Optional[str] = None) -> Dict[str, Any]:
+    """new_context() options (logged-in storage state), also used by a shared BrowserProvider."""
+    opts: Dict[str, Any] = {
+        "viewport": {"width": 1920, "height": 1080},
+        "storage_state": str(STORAGE_PATH),
+    }
+    if proxy:
+        opts["proxy"] = {"server": proxy}
+    return opts
+
+
+PageCallback = Callable[[str, Path], None]
+
+
+def _process_urls(context, urls: List[str], limit: int,
+                  on_page: Optional[PageCallback] = None,
+                  keep: Optional[CardFilter] = None,
+                  out_dir: Optional[Path] = None) -> List[Path]:
     out_paths: List[Path] = []
+    for url in urls[:limit]:
+        if path := process_url(context, url, keep, out_dir):
+            out_paths.append(path)
+            if on_page:
+                on_page(url, path)
+        time.sleep(1.5)
+    return out_paths
+
+
+def _scrape_with_proxy(proxy: Optional[str], urls: List[str], limit: int, headless: bool,
+                       provider: Optional[BrowserProvider] = None,
+                       on_page: Optional[PageCallback] = None,
+                       keep: Optional[CardFilter] = None,
+                       out_dir: Optional[Path] = None) -> List[Path]:
+    """Process URLs in a context using ``proxy``; reuses ``provider``'s browser when given."""
     log.info(f"[proxy] Using proxy: {proxy or 'none'}")
+    if provider is not None:
+        with provider.context("facebook", **context_options(proxy)) as context:
+            return _process_urls(context, urls, limit, on_page, keep, out_dir)
+
     with sync_playwright() as p:
         browser = p.chromium.launch(
             headless=headless,
             proxy={"server": proxy} if proxy else None,
             args=["--start-maximized"],
         )
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            storage_state=str(STORAGE_PATH),
-        )
+        context = browser.new_context(**context_options())
         try:
-            for url in urls[:limit]:
-                if path := process_url(context, url):
-                    out_paths.append(path)
-                time.sleep(1.5)
+            return _process_urls(context, urls, limit, on_page, keep, out_dir)
         finally:
             context.close()
             browser.close()
-    return out_paths
 
 
-def _finalize_output(category: str, out_paths: List[Path]) -> None:
-    """Merge all per-URL outputs into one refined file."""
+def _finalize_output(category: str, out_paths: List[Path],
+                     out_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Merge all per-URL outputs into one refined file, then remove the per-URL files."""
     refined = _merge_outputs(out_paths)
     category_safe = category.replace(" ", "_")
-    final_path = OUTPUT_DIR / f"facebook_refined_{category_safe}_results.json"
-    final_path.write_text(json.dumps(refined, indent=2, ensure_ascii=False), encoding="utf-8")
+    final_path = atomic_write_json(
+        (out_dir or output_dir()) / f"facebook_refined_{category_safe}_results.json", refined, ensure_ascii=False,
+    )
+    for p in out_paths:
+        p.unlink(missing_ok=True)
     log.info(f"[refine] wrote {final_path} ({len(refined)} items)")
     log.info("✅ Full OCR extraction complete.")
+    return refined
 
 
-def main(category: str = "facebook pokemon cards", limit: int = 10, headless: bool = False) -> None:
-    """Scrape FB pages, OCR cards, and write a unified refined file."""
-    urls = _validate_env()
+def main(category: str = "facebook pokemon cards", limit: int = 10, headless: bool = False,
+         provider: Optional[BrowserProvider] = None,
+         completed_pages: Optional[Dict[str, str]] = None,
+         on_page: Optional[PageCallback] = None,
+         listing_filter: Optional[ListingFilter] = None,
+         out_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    Scrape FB pages, OCR cards, and write a unified refined file.
+
+    ``completed_pages`` maps URLs already processed by an interrupted run to
+    their outputs; those pages are reused instead of reopened. ``on_page`` is
+    called after each newly processed page (for checkpointing). Search URLs
+    get the preferred price range as ``minPrice``/``maxPrice`` and result
+    cards outside the preferences are dropped before anything is saved.
+    Files go to ``out_dir`` (default ``output_dir()``, which pipeline
+    subprocesses point at their run); in-process callers pass their own.
+    """
+    out_dir = Path(out_dir) if out_dir is not None else output_dir()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    listing_filter = listing_filter if listing_filter is not None else ListingFilter.load()
+    prefilter = Prefilter("facebook", category, listing_filter)
+    urls = [
+        u if "/marketplace/item/" in u else listing_filter.apply_to_url("facebook", u)
+        for u in _validate_env()[:limit]
+    ]
+    done = {u: Path(p) for u, p in (completed_pages or {}).items() if Path(p).exists()}
+    pending = [u for u in urls if u not in done]
+    if done:
+        log.info(f"[resume] Reusing {len(done)} completed pages; {len(pending)} remaining")
     proxies = rotate(get_proxies()) or [None]
     out_paths: List[Path] = []
 
-    for proxy in proxies:
+    for proxy in proxies if pending else []:
         try:
-            out_paths = _scrape_with_proxy(proxy, urls, limit, headless)
+            out_paths = _scrape_with_proxy(proxy, pending, limit, headless, provider, on_page, prefilter,
+                                           out_dir)
             if out_paths:
                 break
         except Exception as e:
             log.warning(f"[proxy] Proxy {proxy or 'none'} failed: {e}")
             continue
 
-    _finalize_output(category, out_paths)
+    prefilter.report()
+    return _finalize_output(category, [done[u] for u in urls if u in done] + out_paths, out_dir)
 
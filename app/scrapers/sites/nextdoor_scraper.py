@@ -3,6 +3,9 @@ import os
 from typing import Any, Dict, List
 from playwright.sync_api import sync_playwright
 
+from app.scrapers.browser import DEFAULT_USER_AGENT, LAUNCH_ARGS
+from app.scrapers.preferences import Prefilter
+
 
 # NOTE:
 # Nextdoorâ€™s marketplace generally requires login.
@@ -10,7 +13,12 @@ from playwright.sync_api import sync_playwright
 # to enable scraping. Without it, the scraper returns an empty list.
 
 
-def scrape(*, category: str, limit: int, headless: bool) -> List[Dict[str, Any]]:
+def context_options() -> Dict[str, Any]:
+    """new_context() options for Nextdoor, also used by a shared BrowserProvider."""
+    return {"user_agent": DEFAULT_USER_AGENT, "locale": "en-US"}
+
+
+def scrape(*, category: str, limit: int, headless: bool, context=None) -> List[Dict[str, Any]]:
     """
     Scrape Nextdoor marketplace listings (requires authentication).
 
@@ -18,6 +26,8 @@ def scrape(*, category: str, limit: int, headless: bool) -> List[Dict[str, Any]]
         category: Listing category name (used only for tagging results).
         limit: Maximum number of items to retrieve.
         headless: Whether to run the browser in headless mode.
+        context: Optional BrowserContext from a shared BrowserProvider.
+            The caller owns it; no browser is launched.
 
     Returns:
         A list of listing dictionaries.
@@ -27,41 +37,43 @@ def scrape(*, category: str, limit: int, headless: bool) -> List[Dict[str, Any]]
         print("[nextdoor] NEXTDOOR_COOKIE not set; skipping scrape.")
         return []
 
+    if context is not None:
+        return _scrape_context(context, cookie, category, limit)
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless, args=LAUNCH_ARGS)
+        context = browser.new_context(**context_options())
+        try:
+            return _scrape_context(context, cookie, category, limit)
+        finally:
+            context.close()
+            browser.close()
+
+
+def _scrape_context(context, cookie: str, category: str, limit: int) -> List[Dict[str, Any]]:
     base_url = "https://nextdoor.com/for_sale_and_free/"
     items: List[Dict[str, Any]] = []
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=headless,
-            args=["--disable-blink-features=AutomationControlled"],
-        )
-        context = browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/122 Safari/537.36"
-            ),
-            locale="en-US",
+    # Apply login cookie
+    try:
+        context.add_cookies(
+            [
+                {
+                    "name": "nd_session",
+                    "value": cookie,
+                    "domain": "nextdoor.com",
+                    "path": "/",
+                    "httpOnly": True,
+                    "secure": True,
+                }
+            ]
         )
+    except Exception as e:
+        print(f"[nextdoor] Failed to add cookie: {e}")
 
-        # Apply login cookie
-        try:
-            context.add_cookies(
-                [
-                    {
-                        "name": "nd_session",
-                        "value": cookie,
-                        "domain": "nextdoor.com",
-                        "path": "/",
-                        "httpOnly": True,
-                        "secure": True,
-                    }
-                ]
-            )
-        except Exception as e:
-            print(f"[nextdoor] Failed to add cookie: {e}")
-
-        page = context.new_page()
+    prefilter = Prefilter("nextdoor", category)
+    page = context.new_page()
+    try:
         page.goto(base_url, wait_until="domcontentloaded", timeout=60_000)
 
         # Selectors may need updates after inspecting logged-in DOM
@@ -86,20 +98,21 @@ def scrape(*, category: str, limit: int, headless: bool) -> List[Dict[str, Any]]
             except ValueError:
                 price = None
 
-            items.append(
-                {
-                    "source": "nextdoor",
-                    "title": title,
-                    "price": price,
-                    "url": href,
-                    "location": None,
-                    "image": img_el.get_attribute("src") if img_el else None,
-                    "posted_at": None,
-                    "category": category,
-                }
-            )
-
-        context.close()
-        browser.close()
-
+            item = {
+                "source": "nextdoor",
+                "title": title,
+                "price": price,
+                "url": href,
+                "location": None,
+                "image": img_el.get_attribute("src") if img_el else None,
+                "posted_at": None,
+                "category": category,
+            }
+            # Nextdoor has no URL price filter; apply preferences per card.
+            if prefilter(item):
+                items.append(item)
+    finally:
+        page.close()
+
+    prefilter.report()
     return items
@@ -0,0 +1,203 @@
+"""
+Columnar per-listing feature store backed by NumPy ``.npz`` part files.
+
+The scorer persists the feature vectors it feeds into the scoring formula
+(normalized confidence, price gap, brand adjustment, category weight, rarity,
+price and anchor), keyed by listing id. Rescoring under new weights is then a
+matrix-vector product over the stored matrix, with no title or price parsing.
+
+Each ``upsert`` appends one part file holding both ids and rows, written to a
+temp file and renamed, so a reader sees a batch entirely or not at all and
+concurrent writers (threads or processes) never overwrite each other. Later
+parts win for repeated ids. ``compact`` folds the parts into one.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from app.scoring.formula import DEFAULT_FORMULAS, compile_formulas, scalar_params
+from app.utils.logger import log
+
+STORE_DIR = Path("data/features")
+FEATURE_COLUMNS = (
+    "confidence", "price_gap", "brand_adj", "category_weight", "rarity", "price", "anchor",
+)
+# Weight keys for the linear part of the default formula, in matrix order.
+LINEAR_WEIGHTS = ("w_confidence", "w_price_gap", "w_brand_signal", "w_category")
+# upsert() compacts once this many parts have accumulated.
+COMPACT_PARTS = 64
+# A compaction lock older than this was left by a crashed process.
+STALE_LOCK_SECS = 600
+
+
+class FeatureStore:
+    """Feature matrix (float32, rows x FEATURE_COLUMNS) plus a parallel id array."""
+
+    def __init__(self, root: str | Path = STORE_DIR, compact_parts: int = COMPACT_PARTS) -> None:
+        self.root = Path(root)
+        self.compact_parts = compact_parts
+        self._lock_path = self.root / "compact.lock"
+
+    def _parts(self) -> List[Path]:
+        # Names start with a nanosecond timestamp, so name order is write order.
+        return sorted(self.root.glob("part-*.npz"))
+
+    # ------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------
+    def _read_parts(self, parts: Sequence[Path]) -> tuple[np.ndarray, np.ndarray]:
+        ids: List[np.ndarray] = []
+        rows: List[np.ndarray] = []
+        for part in parts:
+            with np.load(part) as data:
+                ids.append(data["ids"])
+                rows.append(data["matrix"])
+        if not ids:
+            return np.array([], dtype=str), np.zeros((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+        all_ids = np.concatenate(ids)
+        matrix = np.vstack(rows).astype(np.float32, copy=False)
+        # Keep the last row written for each id, in first-seen order.
+        _, last_from_end = np.unique(all_ids[::-1], return_index=True)
+        last = len(all_ids) - 1 - last_from_end
+        _, first = np.unique(all_ids, return_index=True)
+        keep = last[np.argsort(first)]
+        return all_ids[keep], matrix[keep]
+
+    def load(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return (ids, matrix); empty arrays when nothing is stored yet."""
+        for _ in range(3):
+            try:
+                return self._read_parts(self._parts())
+            except FileNotFoundError:
+                continue  # a compaction replaced the parts mid-read; list again
+        return self._read_parts(self._parts())
+
+    def columns(self, matrix: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Return stored features as named float64 columns."""
+        if matrix is None:
+            _, matrix = self.load()
+        return {name: np.asarray(matrix[:, j], dtype=np.float64) for j, name in enumerate(FEATURE_COLUMNS)}
+
+    def __len__(self) -> int:
+        return len(self.load()[0])
+
+    # ------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------
+    def _write_part(self, ids: np.ndarray, matrix: np.ndarray, stamp: Optional[str] = None) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        stamp = stamp or f"{time.time_ns():020d}"
+        path = self.root / f"part-{stamp}-{os.getpid()}-{uuid.uuid4().hex[:6]}.npz"
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, ids=ids, matrix=matrix)
+        os.replace(tmp, path)
+        return path
+
+    def upsert(self, ids: Sequence[str], features: Mapping[str, np.ndarray]) -> None:
+        """Append rows for ``ids`` (overriding earlier rows for the same ids)."""
+        if not ids:
+            return
+        rows = np.column_stack([np.asarray(features[c], dtype=np.float32) for c in FEATURE_COLUMNS])
+        self._write_part(np.array(list(ids), dtype=str), rows)
+        if len(self._parts()) >= self.compact_parts:
+            self.compact()
+
+    def _acquire(self) -> bool:
+        try:
+            fd = os.open(self._lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - self._lock_path.stat().st_mtime < STALE_LOCK_SECS:
+                    return False
+                self._lock_path.unlink()
+            except FileNotFoundError:
+                pass
+            return self._acquire()
+        os.close(fd)
+        return True
+
+    def compact(self) -> int:
+        """Fold every current part into one; returns the parts merged (0 if another process is compacting)."""
+        if not self._acquire():
+            return 0
+        try:
+            parts = self._parts()
+            if len(parts) < 2:
+                return 0
+            ids, matrix = self._read_parts(parts)
+            # Sort the merged part where its newest input sat, so parts appended since still win.
+            newest = parts[-1].name.split("-")[1]
+            self._write_part(ids, matrix, stamp=newest)
+            for part in parts:
+                part.unlink(missing_ok=True)
+            (self.root / "meta.json").write_text(
+                json.dumps({"columns": FEATURE_COLUMNS, "rows": int(len(ids))}), encoding="utf-8"
+            )
+            return len(parts)
+        finally:
+            self._lock_path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------
+    # Rescoring
+    # ------------------------------------------------------------
+    def raw_scores(self, cfg: Mapping[str, Any], matrix: Optional[np.ndarray] = None) -> np.ndarray:
+        """Linear score_raw for every stored listing as one matrix-vector product."""
+        if matrix is None:
+            _, matrix = self.load()
+        design = np.asarray(matrix[:, :4], dtype=np.float64).copy()
+        design[:, 2] += 0.5  # brand term is (0.5 + brand_adj), see compute_base_score
+        weights = np.array([float(cfg.get(k, 0.0)) for k in LINEAR_WEIGHTS])
+        return design @ weights
+
+    def rescore(self, cfg: Mapping[str, Any]) -> tuple[np.ndarray, np.ndarray]:
+        """Return (ids, flip scores) under ``cfg`` without touching raw listings."""
+        ids, matrix = self.load()
+        if not len(ids):
+            return ids, np.zeros(0)
+        columns = self.columns(matrix)
+        inputs = {**scalar_params(cfg), **columns, "score_raw": self.raw_scores(cfg, matrix)}
+        # score_raw comes from the matrix product unless the config overrides it.
+        base = None
+        if "formula.score_raw" not in cfg:
+            base = {k: v for k, v in DEFAULT_FORMULAS.items() if k != "score_raw"}
+        formulas = compile_formulas(cfg, base)
+        scores = np.clip(np.nan_to_num(np.broadcast_to(formulas(inputs), (len(ids),))), 0.0, 1.0)
+        return ids, np.round(scores, 4)
+
+
+# ============================================================
+# CLI entrypoint
+# ============================================================
+
+def main() -> int:
+    from app.pipeline.profitability_scorer import get_profile_registry
+
+    parser = argparse.ArgumentParser(description="Rescore stored feature vectors under the current profile.")
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    store = FeatureStore(args.store)
+    profile = get_profile_registry().current()
+    ids, scores = store.rescore(profile.cfg)
+    if not len(ids):
+        print(f"[features] No features stored in {args.store}")
+        return 2
+    order = np.argsort(-scores)[: args.top]
+    log.info(f"[features] Rescored {len(ids)} listings under profile {profile.version}")
+    print(json.dumps([{"id": str(ids[i]), "flipScore": float(scores[i])} for i in order], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
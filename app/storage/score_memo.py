@@ -0,0 +1,94 @@
+"""
+Score memo table: last scoring fingerprint and result per listing.
+
+Lets the scorer skip listings whose inputs (and scoring profile) have not
+changed since the previous polling cycle. Callers that store results after
+scoring ``stage`` the entries and ``commit`` only the stored ones, so a
+listing whose store failed is rescored (and stored) next time.
+"""
+
+from __future__ import annotations
+import json
+import sqlite3
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+DB_PATH = Path("data/listings.db")
+# SQLite's default limit on bound parameters is 999.
+_LOOKUP_CHUNK = 900
+
+
+class ScoreMemo:
+    """Fingerprint-keyed cache of scored listings with hit/miss counters."""
+
+    def __init__(self, db_path: str | Path = DB_PATH) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._staged: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS score_memo (
+                    listing_key TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits on success and is always closed."""
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            yield conn
+
+    def lookup(self, keys: Iterable[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Return {listing_key: (fingerprint, result)} for known keys."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        with self._conn() as conn:
+            for i in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[i:i + _LOOKUP_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT listing_key, fingerprint, result FROM score_memo WHERE listing_key IN ({marks})",
+                    chunk,
+                )
+                for key, fp, result in rows:
+                    found[key] = (fp, json.loads(result))
+        return found
+
+    def update(self, entries: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """Upsert (listing_key, fingerprint, result) rows."""
+        if not entries:
+            return
+        with self._conn() as conn:
+            conn.executemany(
+                """
+                INSERT INTO score_memo (listing_key, fingerprint, result) VALUES (?, ?, ?)
+                ON CONFLICT(listing_key) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    result = excluded.result,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                [(k, fp, json.dumps(r, default=str)) for k, fp, r in entries],
+            )
+
+    def stage(self, entries: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """Hold (listing_key, fingerprint, result) rows until ``commit``."""
+        for key, fp, result in entries:
+            self._staged[key] = (fp, result)
+
+    def commit(self, keys: Iterable[str]) -> int:
+        """Write the staged rows for ``keys`` and drop the rest; returns how many were written."""
+        staged, self._staged = self._staged, {}
+        entries = [(k, *staged[k]) for k in dict.fromkeys(keys) if k in staged]
+        self.update(entries)
+        return len(entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,251 @@
+"""
+Persistent cross-run index of listings already processed.
+
+A listing is identified by two keys: its canonical URL and a content
+fingerprint (source, normalized title, price, category), so relisted items
+with a new URL are still recognized. An on-disk Bloom filter answers "never
+seen" without touching the database; only keys the filter reports as
+possibly present are confirmed against the exact ``seen_listings`` table.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.utils.hashing import fingerprint
+from app.utils.logger import log
+
+DB_PATH = Path("data/listings.db")
+BLOOM_PATH = Path("data/seen/bloom.bin")
+DEFAULT_CAPACITY = 2_000_000
+DEFAULT_ERROR_RATE = 0.001
+# SQLite's default limit on bound parameters is 999.
+_LOOKUP_CHUNK = 900
+
+_TRACKING_PARAMS = re.compile(r"^(utm_.*|fbclid|gclid|ref|refid|referral_code|tracking_id|_trksid|hash|mkevt|mkcid)$")
+
+
+# ============================================================
+# Keys
+# ============================================================
+
+def canonical_url(url: str) -> str:
+    """Lowercase scheme/host, drop fragments, tracking params and trailing slashes."""
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k.lower()))
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(((parts.scheme or "https").lower(), host, path, urlencode(query), ""))
+
+
+def content_fingerprint(listing: Dict[str, Any]) -> Optional[str]:
+    """Fingerprint of what the listing says, independent of its URL (None if unattributed)."""
+    title = " ".join(str(listing.get("title") or listing.get("model") or "").lower().split())
+    if not title or not listing.get("source"):
+        return None
+    try:
+        price = round(float(listing.get("price")))
+    except (TypeError, ValueError):
+        price = None
+    return fingerprint([listing.get("source"), listing.get("category"), title, price])
+
+
+def listing_keys(listing: Dict[str, Any]) -> List[str]:
+    keys = []
+    url = listing.get("url") or listing.get("link")
+    if url:
+        keys.append(f"url:{canonical_url(url)}")
+    fp = content_fingerprint(listing)
+    if fp:
+        keys.append(f"fp:{fp}")
+    return keys
+
+
+# ============================================================
+# Bloom filter
+# ============================================================
+
+class BloomFilter:
+    """Fixed-size Bloom filter over a bytearray, persisted to a single file."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE) -> None:
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.m = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / self.capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+        # Rows of the backing table covered by the filter when it was saved.
+        self.rows = 0
+
+    def _positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, key: str) -> None:
+        new = False
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        self.count += new
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def full(self) -> bool:
+        return self.count > self.capacity
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(bytes(self.bits))
+        os.replace(tmp, path)
+        path.with_suffix(".json").write_text(json.dumps({
+            "capacity": self.capacity, "error_rate": self.error_rate,
+            "m": self.m, "k": self.k, "count": self.count, "rows": self.rows,
+        }), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str | Path) -> Optional["BloomFilter"]:
+        path = Path(path)
+        meta_path = path.with_suffix(".json")
+        if not path.exists() or not meta_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            bloom = cls(meta["capacity"], meta["error_rate"])
+            bits = path.read_bytes()
+        except (OSError, ValueError, KeyError):
+            return None
+        if (bloom.m, bloom.k) != (meta["m"], meta["k"]) or len(bits) != len(bloom.bits):
+            return None
+        bloom.bits = bytearray(bits)
+        bloom.count = meta.get("count", 0)
+        bloom.rows = meta.get("rows", 0)
+        return bloom
+
+
+# ============================================================
+# Seen index
+# ============================================================
+
+class SeenIndex:
+    """Bloom-fronted, SQLite-backed set of listing keys seen in earlier runs."""
+
+    def __init__(self, db_path: str | Path = DB_PATH, bloom_path: str | Path = BLOOM_PATH,
+                 capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE) -> None:
+        self.db_path = Path(db_path)
+        self.bloom_path = Path(bloom_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS seen_listings (
+                    key TEXT PRIMARY KEY,
+                    first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+        self.bloom_negatives = 0
+        self.db_lookups = 0
+        # A filter saved before the last rows were written would give false
+        # negatives, so it is only trusted if it covers the whole table.
+        self.bloom = BloomFilter.load(self.bloom_path)
+        if self.bloom is None or self.bloom.rows != len(self):
+            self._rebuild(capacity, error_rate)
+
+    def _conn(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _rebuild(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE) -> None:
+        """Recreate the filter from the exact table (first use, corruption or growth)."""
+        with self._conn() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM seen_listings").fetchone()[0]
+            self.bloom = BloomFilter(max(capacity, total * 2), error_rate)
+            for (key,) in conn.execute("SELECT key FROM seen_listings"):
+                self.bloom.add(key)
+        self.save()
+        log.info(f"[seen] Bloom filter rebuilt: {total} keys, capacity {self.bloom.capacity}")
+
+    def _existing(self, keys: List[str]) -> Set[str]:
+        found: Set[str] = set()
+        with self._conn() as conn:
+            for i in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[i:i + _LOOKUP_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                found.update(r[0] for r in conn.execute(
+                    f"SELECT key FROM seen_listings WHERE key IN ({marks})", chunk
+                ))
+        return found
+
+    def filter_new(self, listings: Iterable[Dict[str, Any]], mark: bool = True,
+                   pending: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Return listings never seen before (also de-duplicated within the batch).
+
+        With ``mark`` the returned listings are recorded, so later calls and
+        later runs skip them; call ``save()`` once the batch work is done.
+        Callers that only mark listings once they are safely stored pass
+        ``mark=False`` and a ``pending`` set: it collects the keys handed out
+        so far, so later batches skip them until ``mark()`` records them.
+        """
+        listings = list(listings)
+        batch_keys = [listing_keys(it) for it in listings]
+        maybe = sorted({k for keys in batch_keys for k in keys if k in self.bloom})
+        self.bloom_negatives += sum(len(keys) for keys in batch_keys) - len(maybe)
+        self.db_lookups += len(maybe)
+        existing = self._existing(maybe) if maybe else set()
+
+        fresh: List[Dict[str, Any]] = []
+        added: List[str] = []
+        claimed: Set[str] = pending if pending is not None else set()
+        for item, keys in zip(listings, batch_keys):
+            if any(k in existing or k in claimed for k in keys):
+                continue
+            fresh.append(item)
+            claimed.update(keys)
+            added.extend(keys)
+
+        if mark and added:
+            self.add_keys(added)
+        return fresh
+
+    def mark(self, listings: Iterable[Dict[str, Any]]) -> None:
+        """Record listings as seen (after the caller has stored them)."""
+        keys = [k for it in listings for k in listing_keys(it)]
+        if keys:
+            self.add_keys(keys)
+
+    def add_keys(self, keys: List[str]) -> None:
+        with self._conn() as conn:
+            conn.executemany("INSERT OR IGNORE INTO seen_listings (key) VALUES (?)", [(k,) for k in keys])
+        for key in keys:
+            self.bloom.add(key)
+        if self.bloom.full:
+            self._rebuild(self.bloom.capacity * 2, self.bloom.error_rate)
+
+    def save(self) -> None:
+        """Persist the Bloom filter (cheap to skip between batches; rebuilt if stale)."""
+        self.bloom.rows = len(self)
+        self.bloom.save(self.bloom_path)
+        log.info(
+            f"[seen] {self.bloom.rows} keys indexed; bloom negatives {self.bloom_negatives}, "
+            f"exact lookups {self.db_lookups}"
+        )
+
+    def __len__(self) -> int:
+        with self._conn() as conn:
+            return conn.execute("SELECT COUNT(*) FROM seen_listings").fetchone()[0]
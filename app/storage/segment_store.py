@@ -0,0 +1,322 @@
+"""
+Append-only, compressed segment store for pipeline artifacts.
+
+Records are appended in batches: each batch is one gzip member (JSON lines)
+written to the end of the store's active segment file, and a row in a small
+SQLite index records its run id, stage, source, segment, byte offset and
+length. Reading a run or a source seeks straight to its batches; nothing is
+globbed and no per-file JSON is parsed.
+
+Each store instance appends to its own segment and rolls to a new one once
+``max_segment_bytes`` is reached, so concurrent pipeline runs never write the
+same file. ``retain`` drops old runs from the index and ``compact`` rewrites
+sealed segments with dead or small content, copying live members byte for
+byte (no recompression).
+"""
+
+from __future__ import annotations
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.utils.logger import log
+
+ARTIFACTS_DIR = Path("data/artifacts")
+MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+# Unsealed segments untouched for this long belong to a crashed writer.
+STALE_SEGMENT_SECS = 6 * 3600
+# Sealed segments whose live share falls below this are rewritten by compact().
+MIN_LIVE_RATIO = 0.5
+
+
+@dataclass(frozen=True)
+class Batch:
+    """Index entry for one appended batch."""
+
+    id: int
+    run_id: str
+    stage: str
+    source: str
+    segment: str
+    offset: int
+    length: int
+    records: int
+
+
+class SegmentStore:
+    """Batches of JSON records in size-capped gzip segments, indexed by run, stage and source."""
+
+    def __init__(self, root: str | Path = ARTIFACTS_DIR, max_segment_bytes: int = MAX_SEGMENT_BYTES) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / "index.db"
+        self.max_segment_bytes = max_segment_bytes
+        self._lock = threading.Lock()
+        self._active: Optional[str] = None
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS segments (
+                    name TEXT PRIMARY KEY,
+                    bytes INTEGER NOT NULL DEFAULT 0,
+                    sealed INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS batches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    segment TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    records INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS batches_run ON batches (run_id, stage)")
+            conn.execute("CREATE INDEX IF NOT EXISTS batches_source ON batches (source)")
+            conn.execute("CREATE INDEX IF NOT EXISTS batches_segment ON batches (segment)")
+
+    def _conn(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def __enter__(self) -> "SegmentStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.seal()
+
+    # ------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------
+    def _new_segment(self, conn: sqlite3.Connection) -> str:
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:6]}.jsonl.gz"
+        conn.execute("INSERT INTO segments (name, created_at) VALUES (?, ?)", (name, time.time()))
+        return name
+
+    def _seal(self, conn: sqlite3.Connection) -> None:
+        if self._active is not None:
+            conn.execute("UPDATE segments SET sealed = 1 WHERE name = ?", (self._active,))
+            self._active = None
+
+    def append(self, run_id: str, stage: str, source: str, records: Iterable[Dict[str, Any]]) -> Optional[Batch]:
+        """Append ``records`` as one batch; returns its index entry (None if there were no records)."""
+        records = list(records)
+        if not records:
+            return None
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+        member = gzip.compress(lines.encode("utf-8"), compresslevel=6)
+        with self._lock, self._conn() as conn:
+            if self._active is None:
+                self._active = self._new_segment(conn)
+            path = self.root / self._active
+            offset = path.stat().st_size if path.exists() else 0
+            if offset and offset + len(member) > self.max_segment_bytes:
+                self._seal(conn)
+                self._active = self._new_segment(conn)
+                path, offset = self.root / self._active, 0
+            with open(path, "ab") as f:
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+            cur = conn.execute(
+                "INSERT INTO batches (run_id, stage, source, segment, offset, length, records, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, stage, source, self._active, offset, len(member), len(records), time.time()),
+            )
+            conn.execute("UPDATE segments SET bytes = ? WHERE name = ?", (offset + len(member), self._active))
+            return Batch(cur.lastrowid, run_id, stage, source, self._active, offset, len(member), len(records))
+
+    def seal(self) -> None:
+        """Close the active segment; the next append starts a new one."""
+        with self._lock, self._conn() as conn:
+            self._seal(conn)
+
+    # ------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------
+    def batches(self, run_id: Optional[str] = None, stage: Optional[str] = None,
+                source: Optional[str] = None) -> List[Batch]:
+        """Index entries matching every given filter, in append order."""
+        where, args = [], []
+        for column, value in (("run_id", run_id), ("stage", stage), ("source", source)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+        sql = "SELECT id, run_id, stage, source, segment, offset, length, records FROM batches"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self._conn() as conn:
+            return [Batch(*row) for row in conn.execute(sql + " ORDER BY id", args)]
+
+    def read(self, run_id: Optional[str] = None, stage: Optional[str] = None,
+             source: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Records of the matching batches, in append order."""
+        handles: Dict[str, Any] = {}
+        try:
+            for batch in self.batches(run_id, stage, source):
+                f = handles.get(batch.segment)
+                if f is None:
+                    f = handles[batch.segment] = open(self.root / batch.segment, "rb")
+                f.seek(batch.offset)
+                for line in gzip.decompress(f.read(batch.length)).decode("utf-8").splitlines():
+                    yield json.loads(line)
+        finally:
+            for f in handles.values():
+                f.close()
+
+    def runs(self) -> List[str]:
+        """Run ids in the store, oldest first."""
+        with self._conn() as conn:
+            rows = conn.execute("SELECT run_id FROM batches GROUP BY run_id ORDER BY MIN(id)")
+            return [r[0] for r in rows]
+
+    def sources(self, run_id: Optional[str] = None) -> List[str]:
+        sql, args = "SELECT DISTINCT source FROM batches", []
+        if run_id is not None:
+            sql, args = sql + " WHERE run_id = ?", [run_id]
+        with self._conn() as conn:
+            return sorted(r[0] for r in conn.execute(sql, args))
+
+    # ------------------------------------------------------------
+    # Retention and compaction
+    # ------------------------------------------------------------
+    def delete_runs(self, run_ids: Iterable[str]) -> int:
+        """Drop runs from the index; their bytes are reclaimed by ``compact``."""
+        run_ids = list(run_ids)
+        if not run_ids:
+            return 0
+        with self._conn() as conn:
+            marks = ",".join("?" * len(run_ids))
+            return conn.execute(f"DELETE FROM batches WHERE run_id IN ({marks})", run_ids).rowcount
+
+    def retain(self, keep_runs: Optional[int] = None, max_age_days: Optional[float] = None) -> List[str]:
+        """Delete all but the newest ``keep_runs`` runs and runs older than ``max_age_days``."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT run_id, MAX(created_at) FROM batches GROUP BY run_id ORDER BY MIN(id)"
+            ).fetchall()
+        expired = set()
+        if keep_runs is not None:
+            expired.update(run_id for run_id, _ in rows[:max(0, len(rows) - keep_runs)])
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            expired.update(run_id for run_id, last in rows if last < cutoff)
+        expired_runs = [run_id for run_id, _ in rows if run_id in expired]
+        self.delete_runs(expired_runs)
+        if expired_runs:
+            log.info(f"[artifacts] Retention dropped {len(expired_runs)} runs")
+        return expired_runs
+
+    def _compactable(self, conn: sqlite3.Connection, min_live_ratio: float) -> List[str]:
+        stale = time.time() - STALE_SEGMENT_SECS
+        rows = conn.execute("""
+            SELECT s.name, s.bytes, s.sealed, COALESCE(SUM(b.length), 0)
+            FROM segments s LEFT JOIN batches b ON b.segment = s.name
+            GROUP BY s.name ORDER BY s.created_at
+        """).fetchall()
+        picked, small = [], []
+        for name, size, sealed, live in rows:
+            path = self.root / name
+            if name == self._active:
+                continue
+            if not sealed and path.exists() and path.stat().st_mtime > stale:
+                continue  # another writer's active segment
+            if live == 0 or live < size * min_live_ratio:
+                picked.append(name)
+            elif size < self.max_segment_bytes // 4:
+                small.append(name)
+        # Small segments are only worth merging when there is more than one.
+        return picked + small if len(picked) + len(small) > 1 else picked
+
+    def compact(self, min_live_ratio: float = MIN_LIVE_RATIO) -> Dict[str, int]:
+        """Rewrite sealed segments with dead batches (or that are too small) into fresh segments."""
+        with self._lock, self._conn() as conn:
+            # Hold the index write lock throughout so concurrent compactions cannot overlap.
+            conn.execute("BEGIN IMMEDIATE")
+            names = self._compactable(conn, min_live_ratio)
+            if not names:
+                return {"segments": 0, "bytes_before": 0, "bytes_after": 0}
+            before = sum((self.root / n).stat().st_size for n in names if (self.root / n).exists())
+            target, dst, written, after = None, None, 0, 0
+
+            def finish_target() -> None:
+                if dst is not None:
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                    dst.close()
+                    conn.execute("UPDATE segments SET bytes = ?, sealed = 1 WHERE name = ?", (written, target))
+
+            for name in names:
+                batches = conn.execute(
+                    "SELECT id, offset, length FROM batches WHERE segment = ? ORDER BY id", (name,),
+                ).fetchall()
+                if batches:
+                    with open(self.root / name, "rb") as src:
+                        for batch_id, offset, length in batches:
+                            if dst is None or written + length > self.max_segment_bytes:
+                                finish_target()
+                                target = self._new_segment(conn)
+                                dst, written = open(self.root / target, "ab"), 0
+                            src.seek(offset)
+                            dst.write(src.read(length))
+                            conn.execute("UPDATE batches SET segment = ?, offset = ? WHERE id = ?",
+                                         (target, written, batch_id))
+                            written += length
+                            after += length
+                conn.execute("DELETE FROM segments WHERE name = ?", (name,))
+            finish_target()
+            conn.commit()
+            for name in names:
+                (self.root / name).unlink(missing_ok=True)
+        log.info(f"[artifacts] Compacted {len(names)} segments: {before} → {after} bytes")
+        return {"segments": len(names), "bytes_before": before, "bytes_after": after}
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect and maintain the pipeline artifact store.")
+    parser.add_argument("--root", default=str(ARTIFACTS_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("runs", help="List run ids with their sources")
+    cat = sub.add_parser("cat", help="Print records as JSON lines")
+    cat.add_argument("--run")
+    cat.add_argument("--stage")
+    cat.add_argument("--source")
+    retain = sub.add_parser("retain", help="Drop old runs, then compact")
+    retain.add_argument("--keep", type=int, default=None, help="Newest runs to keep")
+    retain.add_argument("--max-age-days", type=float, default=None)
+    sub.add_parser("compact", help="Rewrite segments with dead or small content")
+    args = parser.parse_args(argv)
+
+    store = SegmentStore(args.root)
+    if args.command == "runs":
+        for run_id in store.runs():
+            print(f"{run_id}\t{', '.join(store.sources(run_id))}")
+    elif args.command == "cat":
+        for record in store.read(args.run, args.stage, args.source):
+            print(json.dumps(record, ensure_ascii=False))
+    else:
+        if args.command == "retain":
+            store.retain(args.keep, args.max_age_days)
+        print(json.dumps(store.compact()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,8 +2,13 @@
 import sqlite3
 from pathlib import Path
 from typing import List, Dict, Any
+from app.storage.supply_index import init_supply_tables, record_listings, refresh_last_seen
 
 DB_PATH = Path("data/listings.db")
+_RECORD_KEYS = (
+    "source", "title", "brand", "model", "category", "price",
+    "flipScore", "profitMargin", "marginPct", "url", "profileVersion",
+)
 
 def _init_db(conn: sqlite3.Connection):
     conn.execute("""
@@ -19,9 +24,15 @@ def _init_db(conn: sqlite3.Connection):
             profit_margin REAL,
             margin_pct REAL,
             url TEXT,
+            profile_version TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    # Databases created before scores were versioned lack this column.
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(listings)")}
+    if "profile_version" not in columns:
+        conn.execute("ALTER TABLE listings ADD COLUMN profile_version TEXT")
+    init_supply_tables(conn)
     conn.commit()
 
 def save_listing_batch(records: List[Dict[str, Any]], db_path: str | Path = DB_PATH):
@@ -36,9 +47,26 @@ def save_listing_batch(records: List[Dict[str, Any]], db_path: str | Path = DB_P
     with conn:
         conn.executemany("""
             INSERT INTO listings
-                (source, title, brand, model, category, price, flip_score, profit_margin, margin_pct, url)
+                (source, title, brand, model, category, price, flip_score, profit_margin, margin_pct, url,
+                 profile_version)
             VALUES
-                (:source, :title, :brand, :model, :category, :price, :flipScore, :profitMargin, :marginPct, :url)
-        """, records)
+                (:source, :title, :brand, :model, :category, :price, :flipScore, :profitMargin, :marginPct, :url,
+                 :profileVersion)
+        """, [{k: r.get(k) for k in _RECORD_KEYS} for r in records])
+        record_listings(conn, records)
     conn.close()
     print(f"[db] Inserted {len(records)} records into {db_path}")
+
+
+def touch_listings(records: List[Dict[str, Any]], db_path: str | Path = DB_PATH):
+    """Keep listings seen again but not re-stored (seen-filtered, memo hits) in the active supply."""
+    if not records or not Path(db_path).exists():
+        return
+
+    conn = sqlite3.connect(db_path)
+    try:
+        _init_db(conn)
+        with conn:
+            refresh_last_seen(conn, records)
+    finally:
+        conn.close()
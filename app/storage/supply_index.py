@@ -0,0 +1,254 @@
+"""
+Incrementally maintained supply counts for rarity scoring.
+
+Per-model and per-category counts of *active* listings are adjusted in the
+same transaction that stores a batch of listings, so no GROUP BY pass over
+the listings table is ever needed. A listing is counted once per identity
+(canonical URL, else content fingerprint) however often it is re-stored,
+and drops out of the counts once it has not been seen for
+``ACTIVE_TTL_SECS``. Listings a poll sees but does not store again (skipped
+as already seen, or memo hits) refresh their ``last_seen`` through
+``refresh_last_seen``, so a live listing never ages out. Scorers read an in-memory snapshot that a background
+timer (``SupplyIndex``) refreshes.
+"""
+
+from __future__ import annotations
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.storage.seen_index import listing_keys
+from app.utils.hashing import fingerprint
+from app.utils.logger import log
+
+DB_PATH = Path("data/listings.db")
+# Weight of the newest per-model average in the rolling category average.
+ROLLING_ALPHA = 0.2
+REFRESH_INTERVAL_SECS = 60.0
+# Listings not re-seen for this long no longer count as active supply.
+ACTIVE_TTL_SECS = 14 * 86400
+
+
+def _key(value: Optional[str]) -> str:
+    return (value or "unknown").strip().lower() or "unknown"
+
+
+def _identity(record: Dict[str, Any]) -> str:
+    keys = listing_keys(record)
+    if keys:
+        return keys[0]
+    return "rec:" + fingerprint([record.get(k) for k in ("source", "category", "model", "title", "price")])
+
+
+def init_supply_tables(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS supply_models (
+            category TEXT NOT NULL,
+            model TEXT NOT NULL,
+            active_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (category, model)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS supply_categories (
+            category TEXT PRIMARY KEY,
+            listing_count INTEGER NOT NULL DEFAULT 0,
+            model_count INTEGER NOT NULL DEFAULT 0,
+            rolling_avg REAL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS supply_listings (
+            listing_key TEXT PRIMARY KEY,
+            category TEXT NOT NULL,
+            model TEXT NOT NULL,
+            last_seen REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS supply_listings_last_seen ON supply_listings (last_seen)")
+
+
+def _apply_deltas(conn: sqlite3.Connection, deltas: Counter) -> None:
+    """Add per-(category, model) count changes to both supply tables."""
+    per_category: Counter = Counter()
+    model_changes: Counter = Counter()
+    for (category, model), n in deltas.items():
+        if n == 0:
+            continue
+        row = conn.execute(
+            "SELECT active_count FROM supply_models WHERE category = ? AND model = ?", (category, model),
+        ).fetchone()
+        before = row[0] if row else 0
+        after = max(0, before + n)
+        if after == 0:
+            conn.execute("DELETE FROM supply_models WHERE category = ? AND model = ?", (category, model))
+            model_changes[category] -= 1 if row else 0
+        elif row:
+            conn.execute("UPDATE supply_models SET active_count = ? WHERE category = ? AND model = ?",
+                         (after, category, model))
+        else:
+            conn.execute("INSERT INTO supply_models (category, model, active_count) VALUES (?, ?, ?)",
+                         (category, model, after))
+            model_changes[category] += 1
+        per_category[category] += after - before
+
+    for category in set(per_category) | set(model_changes):
+        row = conn.execute(
+            "SELECT listing_count, model_count, rolling_avg FROM supply_categories WHERE category = ?",
+            (category,),
+        ).fetchone()
+        listing_count = max(0, (row[0] if row else 0) + per_category[category])
+        model_count = max(0, (row[1] if row else 0) + model_changes[category])
+        current_avg = listing_count / max(1, model_count)
+        prev_avg = row[2] if row and row[2] is not None else current_avg
+        rolling_avg = ROLLING_ALPHA * current_avg + (1 - ROLLING_ALPHA) * prev_avg
+        conn.execute(
+            """
+            INSERT INTO supply_categories (category, listing_count, model_count, rolling_avg)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(category) DO UPDATE SET
+                listing_count = excluded.listing_count,
+                model_count = excluded.model_count,
+                rolling_avg = excluded.rolling_avg
+            """,
+            (category, listing_count, model_count, rolling_avg),
+        )
+
+
+def record_listings(conn: sqlite3.Connection, records: Iterable[Dict[str, Any]],
+                    now: Optional[float] = None, ttl: float = ACTIVE_TTL_SECS) -> None:
+    """
+    Add a batch of stored listings to the supply counters and age out stale ones.
+
+    Listings already counted only have their ``last_seen`` refreshed (or move
+    between models if their model changed). Must be called inside the
+    caller's transaction so counts never drift from the listings table.
+    """
+    now = time.time() if now is None else now
+    batch = {_identity(r): (_key(r.get("category")), _key(r.get("model"))) for r in records}
+    deltas: Counter = Counter()
+    for identity, model_key in batch.items():
+        row = conn.execute(
+            "SELECT category, model FROM supply_listings WHERE listing_key = ?", (identity,),
+        ).fetchone()
+        if row is None:
+            deltas[model_key] += 1
+        elif tuple(row) != model_key:
+            deltas[tuple(row)] -= 1
+            deltas[model_key] += 1
+    conn.executemany(
+        """
+        INSERT INTO supply_listings (listing_key, category, model, last_seen) VALUES (?, ?, ?, ?)
+        ON CONFLICT(listing_key) DO UPDATE SET
+            category = excluded.category, model = excluded.model, last_seen = excluded.last_seen
+        """,
+        [(identity, c, m, now) for identity, (c, m) in batch.items()],
+    )
+
+    cutoff = now - ttl
+    for category, model, n in conn.execute(
+        "SELECT category, model, COUNT(*) FROM supply_listings WHERE last_seen < ? GROUP BY category, model",
+        (cutoff,),
+    ).fetchall():
+        deltas[(category, model)] -= n
+    conn.execute("DELETE FROM supply_listings WHERE last_seen < ?", (cutoff,))
+    _apply_deltas(conn, deltas)
+
+
+def refresh_last_seen(conn: sqlite3.Connection, records: Iterable[Dict[str, Any]],
+                      now: Optional[float] = None) -> None:
+    """
+    Refresh ``last_seen`` for counted listings seen again without being re-stored.
+
+    Counts are unchanged; listings not counted yet are left to
+    ``record_listings``, which adds them when they are stored.
+    """
+    now = time.time() if now is None else now
+    keys = {_identity(r) for r in records}
+    conn.executemany(
+        "UPDATE supply_listings SET last_seen = ? WHERE listing_key = ? AND last_seen < ?",
+        [(now, key, now) for key in keys],
+    )
+
+
+class SupplySnapshot:
+    """Immutable in-memory view of the supply tables with O(1) lookups."""
+
+    def __init__(
+        self,
+        models: Optional[Dict[Tuple[str, str], int]] = None,
+        category_avgs: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self._models = models or {}
+        self._category_avgs = category_avgs or {}
+
+    @classmethod
+    def load(cls, db_path: str | Path = DB_PATH) -> "SupplySnapshot":
+        if not Path(db_path).exists():
+            return cls()
+        conn = sqlite3.connect(db_path)
+        try:
+            init_supply_tables(conn)
+            models = {
+                (c, m): n
+                for c, m, n in conn.execute("SELECT category, model, active_count FROM supply_models")
+            }
+            avgs = {
+                c: avg
+                for c, avg in conn.execute("SELECT category, rolling_avg FROM supply_categories")
+                if avg is not None
+            }
+        finally:
+            conn.close()
+        return cls(models, avgs)
+
+    def lookup(self, category: Optional[str], model: Optional[str]) -> Tuple[Optional[int], Optional[float]]:
+        """Return (listing_count, category_avg) for rarity_boost."""
+        cat = _key(category)
+        return self._models.get((cat, _key(model))), self._category_avgs.get(cat)
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+class SupplyIndex:
+    """Holds the current SupplySnapshot and refreshes it on a timer thread."""
+
+    def __init__(self, db_path: str | Path = DB_PATH, interval: float = REFRESH_INTERVAL_SECS) -> None:
+        self.db_path = Path(db_path)
+        self.interval = interval
+        self._snapshot = SupplySnapshot.load(self.db_path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def snapshot(self) -> SupplySnapshot:
+        return self._snapshot
+
+    def refresh(self) -> SupplySnapshot:
+        # Reference assignment is atomic, so readers never see a partial snapshot.
+        self._snapshot = SupplySnapshot.load(self.db_path)
+        return self._snapshot
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                log.warning(f"[supply] Snapshot refresh failed: {e}")
+
+    def start(self) -> "SupplyIndex":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="supply-index", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
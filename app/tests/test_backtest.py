@@ -0,0 +1,82 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from app.scoring import backtest
+from app.storage import scoring_logger
+
+
+def _seed_history(rows):
+    for price, margin, demand, liquidity in rows:
+        scoring_logger.log_score(
+            {
+                "price": price,
+                "flipScore": 0.5,
+                "profitMargin": margin,
+                "metrics": {"demand": demand, "liquidity": liquidity},
+            }
+        )
+
+
+def test_evaluate_ranks_configs_by_agreement_with_logged_margins(tmp_path, monkeypatch):
+    db = tmp_path / "history.db"
+    monkeypatch.setattr(scoring_logger, "DB_PATH", db)
+    # Demand predicts a positive margin, liquidity does not.
+    _seed_history([(100, 50, 0.9, 0.1), (100, 40, 0.8, 0.2), (100, -20, 0.1, 0.9), (100, -10, 0.2, 0.8)])
+
+    history = backtest.load_history(db)
+    assert len(history) == 4
+
+    configs = [
+        {"w_demand": 1.0, "alert_threshold": 0.5},
+        {"w_liquidity": 1.0, "alert_threshold": 0.5},
+    ]
+    by_demand, by_liquidity = backtest.run_backtest(history, configs, top_k=2)
+    assert by_demand["agreement@2"] == 1.0
+    assert by_liquidity["agreement@2"] == 0.0
+    assert by_demand["alerts"] == 2
+    assert by_demand["alert_agreement"] == 1.0
+
+
+def test_missing_signals_are_neutral(tmp_path):
+    db = tmp_path / "history.db"
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE TABLE scoring_history (id INTEGER PRIMARY KEY, price REAL, profitMargin REAL, "
+        "flipScore REAL, demand REAL, liquidity REAL, resale_anchor REAL, retail_anchor REAL)"
+    )
+    conn.execute("INSERT INTO scoring_history (price) VALUES (10)")
+    conn.commit()
+    conn.close()
+
+    history = backtest.load_history(db)
+    assert (history.signals == backtest.NEUTRAL_SIGNAL).all()
+
+
+def test_ranking_metrics_per_config_column():
+    realized = np.array([30.0, -5.0, np.nan, 10.0])
+    # Column 0 ranks the winners first; column 1 ranks them last.
+    scores = np.array([
+        [0.9, 0.1],
+        [0.2, 0.8],
+        [0.3, 0.9],
+        [0.8, 0.2],
+    ])
+    m = backtest.ranking_metrics(scores, realized, np.array([0.5, 0.5]), top_k=2)
+
+    assert m["k"] == 2
+    assert m["precision_at_k"].tolist() == [1.0, 0.0]
+    assert m["margin_at_k"].tolist() == [20.0, -2.5]
+    assert m["alerts"].tolist() == [2, 2]
+    assert m["alert_precision"].tolist() == [1.0, 0.0]
+
+
+def test_ranking_metrics_clamps_k_and_handles_no_alerts():
+    m = backtest.ranking_metrics(
+        np.array([[0.1], [0.2]]), np.array([5.0, 1.0]), np.array([0.9]), top_k=10, min_margin=2.0
+    )
+    assert m["k"] == 2
+    assert m["precision_at_k"][0] == pytest.approx(0.5)
+    assert m["alerts"][0] == 0
+    assert m["alert_precision"][0] == 0.0
@@ -0,0 +1,54 @@
+from app.scrapers.browser import BrowserProvider
+
+
+class FakeContext:
+    def __init__(self, options):
+        self.options = options
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    def new_context(self, **options):
+        ctx = FakeContext(options)
+        self.contexts.append(ctx)
+        return ctx
+
+    def close(self):
+        pass
+
+
+def test_contexts_share_one_browser_and_are_closed():
+    provider = BrowserProvider()
+    browser = provider._browser = FakeBrowser()
+    provider.launch_secs = 1.5
+
+    for site in ("ebay", "craigslist", "facebook"):
+        with provider.context(site, locale="en-US") as ctx:
+            assert ctx.options == {"locale": "en-US"}
+
+    assert len(browser.contexts) == 3
+    assert all(c.closed for c in browser.contexts)
+    assert provider.metrics.get_count("browser_contexts") == 3
+    assert provider.estimated_launch_time_saved() == 3.0
+
+
+def test_providers_sharing_metrics_add_up_their_savings():
+    from app.utils.metrics import Metrics
+
+    metrics = Metrics()
+    for launch, sites in ((1.0, 3), (2.0, 2)):
+        provider = BrowserProvider(metrics=metrics)
+        provider._browser = FakeBrowser()
+        provider.launch_secs = launch
+        for _ in range(sites):
+            with provider.context():
+                pass
+        provider.close()
+
+    assert metrics.get_duration("browser_launch_saved_estimate") == 1.0 * 2 + 2.0 * 1
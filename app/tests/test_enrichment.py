@@ -0,0 +1,72 @@
+from app.adapters import CacheLayer
+from app.pipeline.enrichment import CALLS_PER_LISTING, LazyEnricher
+from app.pipeline.profitability_scorer import DEFAULT_SCORING, score_records
+from app.storage.score_memo import ScoreMemo
+from app.utils.metrics import Metrics
+
+
+class _Ebay:
+    def __init__(self):
+        self.keywords = []
+
+    def compute_metrics(self, keyword):
+        self.keywords.append(keyword)
+        return {"sell_through_rate": 1.0, "resale_anchor": 200.0}
+
+
+class _Trends:
+    def trend_score(self, keyword):
+        return 1.0
+
+
+class _Reddit:
+    def mention_score(self, keyword):
+        return 1.0
+
+
+def _enricher(tmp_path):
+    return LazyEnricher(CacheLayer(str(tmp_path / "cache.sqlite")), _Ebay(), _Trends(), _Reddit())
+
+
+def test_listings_below_the_bound_never_reach_the_adapters(tmp_path):
+    enricher = _enricher(tmp_path)
+    metrics = Metrics()
+    cfg = {"alert_threshold": 0.7}
+    items = [
+        {"brand": "Nike", "model": "Dunk", "flipScore": 0.6},   # bound 0.864: enriched
+        {"brand": "Sony", "model": "A7", "flipScore": 0.4},     # bound 0.576: skipped
+        {"brand": "Dell", "flipScore": 0.9, "valid": False},    # invalid: skipped
+    ]
+
+    enricher.enrich(items, cfg, metrics)
+
+    assert enricher.ebay.keywords == ["Nike Dunk"]
+    assert [it["scoreUpperBound"] for it in items] == [0.864, 0.576, 0.0]
+    assert items[0]["localScore"] == 0.6 and items[0]["flipScore"] == 0.864
+    assert "localScore" not in items[1] and items[1]["flipScore"] == 0.4
+    assert metrics.get_count("enrich_called") == 1
+    assert metrics.get_count("enrich_skipped") == 2
+    assert metrics.get_count("api_calls") == CALLS_PER_LISTING
+    assert metrics.get_count("api_calls_avoided") == 2 * CALLS_PER_LISTING
+
+
+def test_memo_hits_reuse_the_enriched_score(tmp_path):
+    enricher = _enricher(tmp_path)
+    memo = ScoreMemo(tmp_path / "memo.db")
+    cfg = {**DEFAULT_SCORING, "alert_threshold": 0.0}
+    listings = [{"url": "https://example.com/1", "brand": "Nike", "category": "sneakers", "price": 100,
+                 "market_avg": 180}]
+
+    first, fresh = score_records(listings, cfg, memo=memo, enricher=enricher)
+    assert len(fresh) == 1 and enricher.ebay.keywords == ["Nike"]
+
+    second, fresh = score_records(listings, cfg, memo=memo, enricher=enricher)
+    assert fresh == []
+    assert enricher.ebay.keywords == ["Nike"]
+    assert second[0]["flipScore"] == first[0]["flipScore"]
+    assert second[0]["localScore"] == first[0]["localScore"]
+    assert second[0]["metrics"]["liquidity"] == 1.0
+
+    # A local-only run does not reuse the enriched result.
+    _, fresh = score_records(listings, cfg, memo=memo)
+    assert len(fresh) == 1 and "localScore" not in fresh[0]
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.pipeline.profitability_scorer import DEFAULT_SCORING, score_records
+from app.storage.feature_store import FEATURE_COLUMNS, FeatureStore
+
+
+def _listings():
+    return [
+        {"url": "https://example.com/a", "brand": "Nike", "category": "sneakers", "price": 80, "market_avg": 200},
+        {"url": "https://example.com/b", "brand": None, "category": "bike", "price": 300, "confidence": 0.4},
+        {"url": "https://example.com/c", "brand": "Dell", "category": "electronics", "price": 450},
+    ]
+
+
+def test_rescore_matches_scorer_output(tmp_path):
+    store = FeatureStore(tmp_path / "features")
+    scored, _ = score_records(_listings(), DEFAULT_SCORING, store=store)
+
+    ids, scores = store.rescore(DEFAULT_SCORING)
+    by_id = dict(zip(ids.tolist(), scores.tolist()))
+    for row in scored:
+        assert by_id[row["url"]] == pytest.approx(row["flipScore"], abs=1e-3)
+
+
+def test_upsert_overwrites_and_new_weights_change_ranking(tmp_path):
+    store = FeatureStore(tmp_path / "features")
+    score_records(_listings(), DEFAULT_SCORING, store=store)
+    changed = _listings()
+    changed[1]["price"] = 100
+    score_records(changed[1:2], DEFAULT_SCORING, store=store)
+    assert len(store) == 3
+
+    gap_only = {**DEFAULT_SCORING, "w_confidence": 0, "w_brand_signal": 0, "w_category": 0, "w_price_gap": 1}
+    raw = store.raw_scores(gap_only)
+    _, matrix = store.load()
+    assert np.allclose(raw, matrix[:, 1])
+
+
+def _features(n, value):
+    return {c: np.full(n, value, dtype=np.float32) for c in FEATURE_COLUMNS}
+
+
+def test_concurrent_upserts_keep_every_batch_and_compaction_keeps_latest(tmp_path):
+    store = FeatureStore(tmp_path / "features", compact_parts=1000)
+
+    def write(batch):
+        store.upsert([f"id-{batch}-{i}" for i in range(5)], _features(5, batch))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, range(16)))
+    store.upsert(["id-3-0"], _features(1, 99.0))
+
+    ids, matrix = store.load()
+    assert len(ids) == 80
+    assert matrix[ids.tolist().index("id-3-0"), 0] == 99.0
+
+    assert store.compact() == 17
+    assert len(list((tmp_path / "features").glob("part-*.npz"))) == 1
+    ids, matrix = store.load()
+    assert len(ids) == 80
+    assert matrix[ids.tolist().index("id-3-0"), 0] == 99.0
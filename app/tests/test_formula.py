@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from app.pipeline.profitability_scorer import DEFAULT_SCORING, Listing, score_batch, score_listing
+from app.scoring.formula import FormulaError, FormulaSet, compile_formulas
+
+
+def test_formula_set_resolves_dependencies():
+    formulas = FormulaSet({
+        "flip_score": "sigmoid(margin_ratio * liquidity)",
+        "margin_ratio": "(resale_anchor - price) / resale_anchor",
+    })
+    out = formulas({
+        "resale_anchor": np.array([200.0, 100.0]),
+        "price": np.array([100.0, 100.0]),
+        "liquidity": 1.0,
+    })
+    assert out[0] == pytest.approx(1 / (1 + np.exp(-0.5)))
+    assert out[1] == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("expr", ["__import__('os')", "price.real", "[price]", "lambda: 1", "open(price)"])
+def test_rejects_unsafe_syntax(expr):
+    with pytest.raises(FormulaError):
+        FormulaSet({"flip_score": expr})
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(FormulaError):
+        FormulaSet({"flip_score": "a", "a": "flip_score + 1"})
+
+
+def test_default_formulas_match_score_listing():
+    items = [
+        Listing("Nike", "AF1", "sneakers", 120.0, 0.85, 200.0, {}),
+        Listing(None, None, None, 100.0, None, None, {}),
+        Listing("Sony", "XM5", "electronics", None, 0.9, 250.0, {}),
+    ]
+    batch = score_batch(items, DEFAULT_SCORING)
+    for item, vec in zip(items, batch):
+        ref = score_listing(item, DEFAULT_SCORING)
+        assert vec["flipScore"] == pytest.approx(ref["flipScore"], abs=1e-4)
+        assert vec["profitMargin"] == ref["profitMargin"]
+        assert vec["valid"] == ref["valid"]
+
+
+def test_config_overrides_formula():
+    cfg = {**DEFAULT_SCORING, "formula.flip_score": "where(price_gap > 0.5, 1, 0)"}
+    assert compile_formulas(cfg).output == "flip_score"
+    cheap = Listing("Nike", "AF1", "sneakers", 50.0, 0.8, 200.0, {})
+    pricey = Listing("Nike", "AF1", "sneakers", 190.0, 0.8, 200.0, {})
+    assert [r["flipScore"] for r in score_batch([cheap, pricey], cfg)] == [1.0, 0.0]
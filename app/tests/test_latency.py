@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+
+from app.metrics.collector import get_daily_metrics
+from app.metrics.latency import LatencyHistogram, LatencyRecorder, latest_report, parse_posted_at
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    hist = LatencyHistogram()
+    for secs in (0.2, 0.2, 0.2, 3, 40):
+        hist.observe(secs)
+    out = hist.to_dict()
+    assert out["count"] == 5
+    assert out["p50"] == 0.25
+    assert out["p99"] == 60
+    assert out["buckets"]["0.25"] == 3
+    assert out["buckets"]["+Inf"] == 5
+
+
+def test_stamps_record_stage_and_total_latency():
+    rec = LatencyRecorder()
+    listing = {"url": "u", "posted_at": "2026-01-01T00:00:00+00:00"}
+    posted = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+    for offset, stage in enumerate(("scraped", "normalized", "scored", "stored", "notified")):
+        rec.stamp(listing, stage, at=posted + 60 + offset)
+
+    assert listing["stamps"]["posted"] == posted
+    snap = rec.snapshot()
+    assert set(snap) == {"normalized", "scored", "stored", "notified", "total", "pipeline"}
+    assert snap["scored"]["sum"] == 1
+    assert snap["pipeline"]["sum"] == 4
+    assert snap["total"]["sum"] == 64
+
+
+def test_unparseable_or_future_posted_at_falls_back_to_scraped():
+    assert parse_posted_at("yesterday-ish") is None
+    assert parse_posted_at(1700000000) == 1700000000.0
+    rec = LatencyRecorder()
+    listing = {"posted_at": "2999-01-01 10:00"}
+    rec.stamp(listing, "scraped", at=1000.0)
+    rec.stamp(listing, "notified", at=1002.0)
+    assert "posted" not in listing["stamps"]
+    assert rec.snapshot()["total"]["sum"] == 2
+
+
+def test_write_report_and_metrics_endpoint(tmp_path):
+    rec = LatencyRecorder(tmp_path)
+    rec.stamp({}, "notified", at=1.0)
+    path = rec.write_report("run-1", extra={"stats": {"alerted": 1}})
+    assert path.name == "run-1.json"
+    report = latest_report(tmp_path)
+    assert report["run_id"] == "run-1" and report["stats"] == {"alerted": 1}
+
+    metrics = get_daily_metrics()
+    assert metrics["status"] == "healthy"
+    assert "latency" in metrics
+
+
+def test_each_run_reports_only_its_own_listings(tmp_path):
+    total = LatencyRecorder(tmp_path)
+    for run in ("bikes", "laptop"):
+        rec = total.child()
+        listing = {}
+        rec.stamp(listing, "scraped", at=0.0)
+        rec.stamp(listing, "notified", at=2.0)
+        assert rec.snapshot()["pipeline"]["count"] == 1
+        rec.write_report(f"stream-{run}")
+
+    assert latest_report(tmp_path)["latency"]["pipeline"]["count"] == 1
+    assert total.snapshot()["pipeline"]["count"] == 2
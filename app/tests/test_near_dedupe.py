@@ -0,0 +1,47 @@
+import json
+
+from app.pipeline import run_all_markets as ram
+from app.utils.dedupe import cluster_near_duplicates, near_dedupe_listings, normalize_title
+
+
+def test_normalize_title_drops_punctuation_and_filler():
+    assert normalize_title("Trek FX-2 Hybrid Bike (OBO) - Great Condition!") == "trek fx 2 hybrid bike"
+
+
+def test_cross_posts_cluster_but_different_models_and_prices_do_not():
+    listings = [
+        {"url": "cl/1", "title": "Trek FX 2 Hybrid Bike - great condition", "price": 300, "source": "craigslist"},
+        {"url": "fb/1", "title": "trek fx2 hybrid bike", "price": 290, "source": "facebook"},
+        {"url": "eb/1", "title": "Trek FX 2 hybrid bike OBO", "price": 320, "source": "ebay"},
+        {"url": "eb/2", "title": "Trek FX 3 hybrid bike", "price": 300, "source": "ebay"},
+        {"url": "eb/3", "title": "Trek FX 2 hybrid bike", "price": 900, "source": "ebay"},
+        {"url": "eb/4", "title": "Giant Escape 2", "price": 300, "source": "ebay"},
+    ]
+    assert cluster_near_duplicates(listings) == [[0, 1, 2], [3], [4], [5]]
+
+
+def test_best_representative_is_kept_with_duplicate_urls():
+    listings = [
+        {"url": "cl/1", "title": "iPhone 13 Pro 128GB", "price": 610},
+        {"url": "fb/1", "title": "iphone 13 pro 128 gb", "price": 600, "image": "a.jpg"},
+        {"url": "eb/1", "title": "Nintendo Switch OLED", "price": 250},
+    ]
+    kept = near_dedupe_listings(listings)
+    assert [it["url"] for it in kept] == ["fb/1", "eb/1"]
+    assert kept[0]["duplicate_urls"] == ["cl/1"]
+
+
+def test_dedupe_files_collapses_cross_posts_across_sites(monkeypatch, tmp_path):
+    monkeypatch.setattr(ram, "metrics", ram.Metrics())
+    cl, fb = tmp_path / "craigslist.json", tmp_path / "facebook.json"
+    cl.write_text(json.dumps([{"url": "cl/1", "title": "Dyson V8 vacuum", "price": 150}]))
+    fb.write_text(json.dumps([
+        {"url": "fb/1", "title": "Dyson V8 Vacuum - like new", "price": 140, "location": "Austin"},
+        {"url": "fb/2", "title": "KitchenAid mixer", "price": 120},
+    ]))
+
+    out = ram.dedupe_files([cl, fb], out_dir=tmp_path / "deduped")
+
+    assert json.loads(out[0].read_text()) == []
+    assert [it["url"] for it in json.loads(out[1].read_text())] == ["fb/1", "fb/2"]
+    assert ram.metrics.get_count("near_dupes_dropped") == 1
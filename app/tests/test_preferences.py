@@ -0,0 +1,55 @@
+import json
+from urllib.parse import parse_qs, urlsplit
+
+from app.pipeline import run_all_markets as ram
+from app.scrapers.preferences import ListingFilter, Prefilter, to_price
+
+PREFS = {
+    "price_min": 50, "price_max": 800,
+    "brands": {"road bike": ["schwinn", "specialized"]},
+}
+
+
+def test_price_range_is_pushed_into_search_urls():
+    lf = ListingFilter.from_preferences(PREFS)
+    assert lf.url_params("ebay") == {"_udlo": "50", "_udhi": "800"}
+    assert lf.url_params("nextdoor") == {}
+    url = lf.apply_to_url("craigslist", "https://houston.craigslist.org/search/sss?query=bike&sort=date")
+    assert parse_qs(urlsplit(url).query) == {
+        "query": ["bike"], "sort": ["date"], "min_price": ["50"], "max_price": ["800"],
+    }
+
+
+def test_prefilter_counts_drops_by_reason():
+    prefilter = Prefilter("ebay", "road bike", ListingFilter.from_preferences(PREFS))
+    cards = [
+        {"title": "Specialized Allez 56cm", "price": "$450"},
+        {"title": "Schwinn road bike", "price": 20},
+        {"title": "Trek Domane", "price": 900},
+        {"title": "Trek Domane", "price": 500},
+        {"title": "Specialized Tarmac", "price": None},
+    ]
+    kept = [c["title"] for c in cards if prefilter(c)]
+    assert kept == ["Specialized Allez 56cm", "Specialized Tarmac"]
+    assert prefilter.dropped == {"price_below_min": 1, "price_above_max": 1, "brand_mismatch": 1}
+
+
+def test_categories_without_brands_are_not_brand_filtered():
+    lf = ListingFilter.from_preferences(PREFS)
+    assert lf.reject_reason({"title": "ThinkPad X1", "price": 400}, "laptop") is None
+    assert to_price("$1,200.50") == 1200.5
+
+
+def test_dedupe_stage_applies_preferences_and_reports_funnel(monkeypatch, tmp_path):
+    monkeypatch.setattr(ram, "metrics", ram.Metrics())
+    raw = tmp_path / "ebay_laptop_results.json"
+    raw.write_text(json.dumps([
+        {"url": "a", "title": "ThinkPad X1", "price": 400, "category": "laptop"},
+        {"url": "b", "title": "Broken laptop", "price": 10, "category": "laptop"},
+        {"url": "a", "title": "ThinkPad X1", "price": 400, "category": "laptop"},
+    ]))
+    (out,) = ram.dedupe_files([raw], tmp_path / "deduped", listing_filter=ListingFilter.from_preferences(PREFS))
+    assert [it["url"] for it in json.loads(out.read_text())] == ["a"]
+    assert ram.metrics.get_count("prefilter_price_below_min") == 1
+    assert ram.metrics.get_count("dedupe_dropped") == 1
+    assert ram.metrics.get_count("listings_out") == 1
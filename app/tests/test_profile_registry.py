@@ -0,0 +1,29 @@
+import os
+
+from app.scoring.profile_registry import ProfileRegistry
+
+
+def _write(path, text, mtime):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_reload_only_when_file_changes(tmp_path, monkeypatch):
+    cfg_path = tmp_path / "scoring.yaml"
+    _write(cfg_path, "w_price_gap: 0.55\n", 1_000)
+    monkeypatch.setenv("SNIPER_SCORING_CFG", str(cfg_path))
+
+    registry = ProfileRegistry(defaults={"w_confidence": 0.2}, poll_interval=0)
+    first = registry.current()
+    assert first.cfg["w_price_gap"] == 0.55
+    assert first.cfg["w_confidence"] == 0.2
+    assert registry.current() is first
+
+    _write(cfg_path, "w_price_gap: 0.60\n", 2_000)
+    second = registry.current()
+    assert second is not first
+    assert second.cfg["w_price_gap"] == 0.60
+    assert second.version != first.version
+    assert second.generation == first.generation + 1
+    # The old snapshot held by an in-flight scorer is untouched.
+    assert first.cfg["w_price_gap"] == 0.55
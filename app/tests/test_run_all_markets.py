@@ -0,0 +1,125 @@
+import time
+from pathlib import Path
+
+from app.pipeline import run_all_markets as ram
+
+
+def test_scrapers_run_concurrently_and_failures_are_isolated(monkeypatch, tmp_path):
+    def fake_run_scraper(site, category, limit=30, timeout=None, out_dir=None):
+        time.sleep(0.2)
+        if site == "craigslist":
+            raise TimeoutError("craigslist scraper timed out")
+        return tmp_path / f"{site}.json"
+
+    monkeypatch.setattr(ram, "run_scraper", fake_run_scraper)
+    monkeypatch.setattr(ram, "refine_facebook", lambda p: Path(str(p).replace(".json", "_refined.json")))
+    monkeypatch.setattr(ram, "metrics", ram.Metrics())
+
+    start = time.perf_counter()
+    paths = ram.run_scrapers("bikes", parallel=3)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert [p.name for p in paths] == [
+        "ebay_bikes_results.json", "facebook_refined_facebook_bikes_results.json",
+    ]
+    assert ram.metrics.get_count("scrapers_failed") == 1
+    assert all(ram.metrics.get_duration(f"scrape_{s}:bikes") >= 0.2 for s in ram.SCRAPERS)
+
+
+def test_shared_mode_reuses_one_browser_per_site_across_categories(monkeypatch, tmp_path):
+    from app.scrapers import browser
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ram, "metrics", ram.Metrics())
+    monkeypatch.setattr(ram, "refine_facebook", lambda p: p)
+    launched, scraped = [], []
+
+    class FakeProvider:
+        def __init__(self, headless=True, metrics=None):
+            launched.append(self)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+    def fake_scrape(site, category, limit, provider, manifest=None, out_dir=None):
+        assert out_dir == run_dir  # in-process scrapers write into the run, not data/output
+        scraped.append((site, category, provider))
+        return [{"url": f"{site}/{category}", "title": category}]
+
+    monkeypatch.setattr(browser, "BrowserProvider", FakeProvider)
+    monkeypatch.setattr(ram, "_scrape_in_context", fake_scrape)
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+
+    paths = ram.run_scrapers_shared(["bikes", "laptop"], limit=5, out_dir=run_dir)
+
+    assert len(launched) == len(ram.SCRAPERS)
+    assert not (tmp_path / ram.OUTPUT_DIR).exists()
+    raw = [ram.raw_output_path(s, c, run_dir) for c in ("bikes", "laptop") for s in ram.SCRAPERS]
+    assert [p.name for p in paths] == [
+        (ram.refined_output_path(r) if r.name.startswith("facebook") else r).name for r in raw
+    ]
+    for site in ram.SCRAPERS:
+        assert len({id(p) for s, _, p in scraped if s == site}) == 1
+
+
+def test_shared_mode_isolates_a_scraper_that_exits(monkeypatch, tmp_path):
+    import contextlib
+    import sys
+    import types
+    from app.scrapers import browser
+
+    monkeypatch.setattr(ram, "metrics", ram.Metrics())
+    monkeypatch.setattr(ram, "refine_facebook", lambda p: p)
+
+    class FakeProvider:
+        headless = True
+
+        def __init__(self, headless=True, metrics=None):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        @contextlib.contextmanager
+        def context(self, site, **opts):
+            yield None
+
+    def fake_module(site):
+        mod = types.ModuleType(ram.SCRAPERS[site])
+        mod.context_options = lambda: {}
+        mod.scrape = lambda category, limit, headless, context: [{"url": f"{site}/{category}"}]
+        return mod
+
+    facebook = fake_module("facebook")
+
+    def exit_main(*args, **kwargs):
+        raise SystemExit("Create urls.txt with one Facebook URL per line.")
+
+    facebook.main = exit_main
+    for site in ram.SCRAPERS:
+        monkeypatch.setitem(sys.modules, ram.SCRAPERS[site], facebook if site == "facebook" else fake_module(site))
+    monkeypatch.setattr(browser, "BrowserProvider", FakeProvider)
+    manifest = ram.RunManifest.create({}, root=tmp_path / "runs")
+
+    paths = ram.run_scrapers_shared(["bikes", "laptop"], limit=5, manifest=manifest, out_dir=tmp_path)
+
+    assert sorted(p.name for p in paths) == sorted(
+        ram.raw_output_path(s, c, tmp_path).name for c in ("bikes", "laptop") for s in ("ebay", "craigslist")
+    )
+    assert ram.metrics.get_count("scrapers_failed") == 2
+    assert manifest.data["sites"]["facebook:bikes"]["status"] == "failed"
+    assert "urls.txt" in manifest.data["sites"]["facebook:bikes"]["error"]
+
+
+def test_categories_default_to_preferences(tmp_path):
+    prefs = tmp_path / "preferences.json"
+    prefs.write_text('{"categories": ["road bike", "sneakers"]}')
+    assert ram.load_categories(prefs) == ["road bike", "sneakers"]
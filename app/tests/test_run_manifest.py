@@ -0,0 +1,155 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.pipeline import run_all_markets as ram
+from app.pipeline.run_manifest import RunManifest, latest_run
+from app.storage.segment_store import SegmentStore
+
+
+def test_manifest_commits_sites_pages_and_chunks(tmp_path):
+    out = tmp_path / "ebay.json"
+    out.write_text("[]")
+    manifest = RunManifest.create({"category": "bikes", "limit": 5}, root=tmp_path, run_id="r1")
+    manifest.mark_site("ebay", "done", output=out)
+    manifest.mark_site("craigslist", "failed", error="timeout")
+    manifest.mark_page("facebook", "https://fb/1", out)
+    manifest.mark_chunk("score", "c1", [out])
+
+    loaded = RunManifest.load("r1", root=tmp_path)
+    assert loaded.site_output("ebay") == out
+    assert loaded.site_output("craigslist") is None
+    assert loaded.completed_pages("facebook") == {"https://fb/1": str(out)}
+    assert loaded.chunk_done("score", "c1")
+    assert not loaded.chunk_done("score", "c2")
+
+
+def test_resume_skips_completed_sites(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    scraped = []
+
+    def fake_run_scraper(site, category, limit=30, timeout=None, out_dir=None):
+        scraped.append(site)
+        out = ram.raw_output_path(site, category, out_dir)
+        out.write_text(json.dumps([{"url": f"{site}-1", "title": f"{site} bike", "price": 120}]))
+        return out
+
+    monkeypatch.setattr(ram, "run_scraper", fake_run_scraper)
+    monkeypatch.setattr("app.pipeline.profitability_scorer.save_listing_batch", lambda rows: None)
+    monkeypatch.setattr(ram, "metrics", ram.Metrics())
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("OOM")
+
+    monkeypatch.setattr(ram, "score_to_files", crash)
+    with pytest.raises(RuntimeError):
+        ram.main("bikes", 5, use_cache=False)
+    (run_id,) = [p.name for p in (tmp_path / "data/runs").iterdir()]
+    assert json.loads((tmp_path / "data/runs" / run_id / "manifest.json").read_text())["status"] == "failed"
+
+    monkeypatch.undo()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ram, "run_scraper", fake_run_scraper)
+    monkeypatch.setattr("app.pipeline.profitability_scorer.save_listing_batch", lambda rows: None)
+    scraped.clear()
+    assert ram.main(resume=run_id, use_cache=False) == run_id
+
+    assert scraped == []
+    merged = json.loads((tmp_path / "data/runs" / run_id / "output/all_scored_listings.json").read_text())
+    assert {r["url"] for r in merged} == {"ebay-1", "craigslist-1", "facebook-1"}
+    assert latest_run(tmp_path / "data/runs").run_id == run_id
+
+
+def test_concurrent_runs_write_separate_outputs(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("app.pipeline.profitability_scorer.save_listing_batch", lambda rows: None)
+    monkeypatch.setattr(ram, "metrics", ram.Metrics())
+    monkeypatch.setattr(ram, "SeenIndex", lambda: None)
+
+    def fake_run_scraper(site, category, limit=30, timeout=None, out_dir=None):
+        out = ram.raw_output_path(site, category, out_dir)
+        out.write_text(json.dumps([{"url": f"{site}-{category}", "title": f"{site} {category}", "price": 120}]))
+        return out
+
+    monkeypatch.setattr(ram, "run_scraper", fake_run_scraper)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        run_ids = list(pool.map(lambda c: ram.main(c, 5, use_cache=False), ["bikes", "laptop"]))
+
+    assert len(set(run_ids)) == 2
+    for run_id, category in zip(run_ids, ["bikes", "laptop"]):
+        out_dir = tmp_path / "data/runs" / run_id / "output"
+        merged = json.loads((out_dir / "all_scored_listings.json").read_text())
+        assert {r["url"] for r in merged} == {f"{s}-{category}" for s in ram.SCRAPERS}
+        assert not list(out_dir.glob("*.tmp"))
+        assert [p.name for p in out_dir.rglob("*.json")] == ["all_scored_listings.json"]
+        store = SegmentStore(tmp_path / "data/artifacts")
+        assert {r["url"] for r in store.read(run_id, "score", f"ebay:{category}")} == {f"ebay-{category}"}
+    assert latest_run(tmp_path / "data/runs").run_id in run_ids
+    assert not (tmp_path / "data/output/all_scored_listings.json").exists()
+
+
+def test_listings_are_marked_seen_only_after_the_run_commits(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("app.pipeline.profitability_scorer.save_listing_batch", lambda rows: None)
+    monkeypatch.setattr(ram, "metrics", ram.Metrics())
+
+    def fake_run_scraper(site, category, limit=30, timeout=None, out_dir=None):
+        out = ram.raw_output_path(site, category, out_dir)
+        out.write_text(json.dumps([{"url": f"{site}-1", "title": f"{site} bike", "price": 120, "source": site}]))
+        return out
+
+    def merged(run_id):
+        path = tmp_path / "data/runs" / run_id / "output/all_scored_listings.json"
+        return {r["url"] for r in json.loads(path.read_text())}
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("OOM")
+
+    monkeypatch.setattr(ram, "run_scraper", fake_run_scraper)
+    real_score = ram.score_to_files
+    monkeypatch.setattr(ram, "score_to_files", crash)
+    with pytest.raises(RuntimeError):
+        ram.main("bikes", 5, archive=False)
+
+    # The crashed run marked nothing, so a fresh run still scores every listing.
+    monkeypatch.setattr(ram, "score_to_files", real_score)
+    first = ram.main("bikes", 5, archive=False)
+    assert merged(first) == {"ebay-1", "craigslist-1", "facebook-1"}
+
+    # Batch runs stamp every stage and write a latency report like the stream does.
+    path = tmp_path / "data/runs" / first / "output/all_scored_listings.json"
+    stamps = json.loads(path.read_text())[0]["stamps"]
+    assert list(stamps) == ["scraped", "normalized", "scored", "stored", "merged"]
+    report = json.loads((tmp_path / "data/reports/latency" / f"batch-{first}.json").read_text())
+    assert report["latency"]["pipeline"]["count"] >= 3
+
+    # Same scrape again: the cached dedupe output must not bring seen listings back.
+    second = ram.main("bikes", 5, archive=False)
+    assert merged(second) == set()
+
+
+def test_a_failed_store_fails_the_run_and_marks_nothing_seen(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ram, "metrics", ram.Metrics())
+    saved = []
+
+    def fake_run_scraper(site, category, limit=30, timeout=None, out_dir=None):
+        out = ram.raw_output_path(site, category, out_dir)
+        out.write_text(json.dumps([{"url": f"{site}-1", "title": f"{site} bike", "price": 120, "source": site}]))
+        return out
+
+    def locked(rows):
+        raise OSError("database is locked")
+
+    monkeypatch.setattr(ram, "run_scraper", fake_run_scraper)
+    monkeypatch.setattr("app.pipeline.profitability_scorer.save_listing_batch", locked)
+    with pytest.raises(OSError):
+        ram.main("bikes", 5, archive=False)
+    (run_id,) = [p.name for p in (tmp_path / "data/runs").iterdir()]
+    assert json.loads((tmp_path / "data/runs" / run_id / "manifest.json").read_text())["status"] == "failed"
+
+    # Nothing was marked seen (or memoized), so resuming stores every listing.
+    monkeypatch.setattr("app.pipeline.profitability_scorer.save_listing_batch", saved.extend)
+    assert ram.main(resume=run_id, archive=False) == run_id
+    assert {r["url"] for r in saved} == {"ebay-1", "craigslist-1", "facebook-1"}
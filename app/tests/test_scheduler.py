@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+
+import pytest
+
+from app.pipeline import scheduler
+from app.pipeline.scheduler import JobResult, JobScheduler, ListingJobRunner, ScrapeJob, load_jobs
+from app.storage.score_memo import ScoreMemo
+from app.storage.seen_index import SeenIndex
+
+
+def test_interval_shrinks_on_hits_and_grows_when_empty():
+    job = ScrapeJob("ebay", "bikes", interval=600, min_interval=100, max_interval=1000)
+    job.reschedule(now=0, hits=3)
+    assert job.interval == 300 and job.next_run == 300
+    job.reschedule(now=300, hits=0)
+    assert job.interval == 450
+    job.reschedule(now=750, failed=True)
+    job.reschedule(now=1650, failed=True)
+    assert job.interval == 1000 and job.failures == 2
+
+
+def test_load_jobs_expands_grids(tmp_path):
+    path = tmp_path / "scheduler.json"
+    path.write_text(json.dumps({"workers": 2, "jobs": [
+        {"site": "craigslist", "categories": ["bikes", "laptop"], "regions": ["houston", "austin"], "priority": 2},
+        {"site": "ebay", "categories": ["bikes", "laptop"], "priority": 2},
+    ]}))
+    cfg = load_jobs(path)
+    assert cfg["workers"] == 2
+    assert sorted(j.key for j in cfg["jobs"]) == [
+        "craigslist:bikes:austin", "craigslist:bikes:houston", "craigslist:laptop:austin",
+        "craigslist:laptop:houston", "ebay:bikes", "ebay:laptop",
+    ]
+    assert all(j.priority == 2 for j in cfg["jobs"])
+
+
+def test_region_is_rejected_for_sites_without_regions(tmp_path):
+    path = tmp_path / "scheduler.json"
+    path.write_text(json.dumps({"jobs": [{"sites": ["ebay", "craigslist"], "category": "bikes", "region": "houston"}]}))
+    with pytest.raises(ValueError, match="ebay"):
+        load_jobs(path)
+
+
+def test_due_respects_priority_and_site_limits():
+    jobs = [ScrapeJob("facebook", c, priority=p) for c, p in (("a", 0), ("b", 5))] + [ScrapeJob("ebay", "c")]
+    scheduler = JobScheduler(jobs, runner=lambda job: JobResult(), workers=4, site_limits={"facebook": 1})
+    assert [j.key for j in scheduler.due(now=0)] == ["facebook:b", "ebay:c"]
+
+
+def test_run_uses_pool_within_site_limits():
+    active, peak, lock = {}, {}, threading.Lock()
+
+    def runner(job):
+        with lock:
+            active[job.site] = active.get(job.site, 0) + 1
+            peak[job.site] = max(peak.get(job.site, 0), active[job.site])
+        time.sleep(0.02)
+        with lock:
+            active[job.site] -= 1
+        return JobResult(hits=1 if job.category == "hot" else 0)
+
+    jobs = [ScrapeJob("ebay", c, interval=0.2, min_interval=0.01) for c in ("hot", "cold", "x", "y")]
+    jobs.append(ScrapeJob("facebook", "z", interval=0.2, min_interval=0.01))
+    scheduler = JobScheduler(jobs, runner, workers=3, site_limits={"ebay": 2, "facebook": 1})
+    scheduler.run(max_runs=12)
+
+    assert peak["ebay"] <= 2 and peak["facebook"] == 1
+    by_key = {s["key"]: s for s in scheduler.status()}
+    assert by_key["ebay:hot"]["interval"] < by_key["ebay:cold"]["interval"]
+    assert by_key["ebay:hot"]["runs"] > by_key["ebay:cold"]["runs"]
+
+
+def test_scraper_exit_fails_the_job_without_killing_its_worker():
+    def runner(job):
+        if job.site == "facebook":
+            raise SystemExit("Create urls.txt with one Facebook URL per line.")
+        return JobResult()
+
+    jobs = [ScrapeJob("facebook", "bikes", interval=0.05, min_interval=0.01, max_interval=0.05),
+            ScrapeJob("ebay", "bikes", interval=0.05, min_interval=0.01)]
+    sched = JobScheduler(jobs, runner, workers=1, site_limits={"facebook": 1})
+    t = threading.Thread(target=sched.run, kwargs={"max_runs": 6}, daemon=True)
+    t.start()
+    t.join(timeout=5)
+
+    assert not t.is_alive()
+    by_key = {s["key"]: s for s in sched.status()}
+    assert by_key["facebook:bikes"]["failures"] >= 2
+    assert "urls.txt" in by_key["facebook:bikes"]["last_error"]
+    assert sched.running["facebook"] == 0 and not any(s["running"] for s in by_key.values())
+
+
+def test_job_marks_listings_seen_only_after_storing(monkeypatch, tmp_path):
+    monkeypatch.setattr(scheduler, "ScoreMemo", lambda: ScoreMemo(tmp_path / "memo.db"))
+    seen = SeenIndex(tmp_path / "seen.db", tmp_path / "bloom.bin", capacity=1000)
+    runner = ListingJobRunner(notify=lambda record: None, seen=seen)
+    monkeypatch.setattr(runner, "supply", lambda: None)
+    monkeypatch.setattr(runner, "scrape", lambda job: [
+        {"url": f"https://ebay.com/itm/{i}", "title": f"Trek bike {i}", "price": 100} for i in range(3)
+    ])
+    job = ScrapeJob("ebay", "bikes")
+
+    def crash(rows):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(scheduler, "save_listing_batch", crash)
+    with pytest.raises(OSError):
+        runner(job)
+    assert len(seen) == 0 and not runner._pending
+
+    saved = []
+    monkeypatch.setattr(scheduler, "save_listing_batch", saved.extend)
+    assert runner(job).new == 3
+    assert runner(job).new == 0
+    assert len(saved) == 3
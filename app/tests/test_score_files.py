@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from app.pipeline import profitability_scorer as ps
+
+
+def test_score_files_scores_all_inputs_in_one_pass(monkeypatch, tmp_path):
+    calls, saved = [], []
+    real = ps.score_records
+
+    def counting_score_records(records, *args, **kwargs):
+        calls.append(len(records))
+        return real(records, *args, **kwargs)
+
+    monkeypatch.setattr(ps, "score_records", counting_score_records)
+    monkeypatch.setattr(ps, "save_listing_batch", lambda records: saved.extend(records))
+    monkeypatch.setattr(ps.SupplySnapshot, "load", classmethod(lambda cls, *a, **k: None))
+
+    ebay = tmp_path / "ebay_bikes_results.json"
+    ebay.write_text(json.dumps([{"url": "e1", "price": 100, "source": "ebay"},
+                                {"url": "e2", "price": 300, "source": "ebay"}]))
+    fb = tmp_path / "facebook_refined.json"
+    fb.write_text(json.dumps({"listings": [{"url": "f1", "price": 50, "source": "facebook"}]}))
+    broken = tmp_path / "broken.json"
+    broken.write_text("{not json")
+
+    merged = ps.score_files([ebay, fb, broken], str(tmp_path), use_memo=False, persist_features=False)
+
+    assert calls == [3]
+    assert len(saved) == 3
+    assert [r["url"] for r in json.loads((tmp_path / "scored_ebay_bikes_results.json").read_text())] == ["e1", "e2"]
+    assert len(json.loads((tmp_path / "scored_facebook_refined.json").read_text())) == 1
+    assert not (tmp_path / "scored_broken.json").exists()
+    rows = json.loads(merged.read_text())
+    assert len(rows) == 3
+    assert [r["flipScore"] for r in rows] == sorted((r["flipScore"] for r in rows), reverse=True)
+
+
+def test_only_stored_listings_are_memoized(monkeypatch, tmp_path):
+    from app.storage.score_memo import ScoreMemo
+
+    monkeypatch.setattr(ps, "ScoreMemo", lambda: ScoreMemo(tmp_path / "memo.db"))
+    monkeypatch.setattr(ps.SupplySnapshot, "load", classmethod(lambda cls, *a, **k: None))
+    src = tmp_path / "ebay_bikes_results.json"
+    src.write_text(json.dumps([{"url": "e1", "price": 100, "market_avg": 300, "source": "ebay"},
+                               {"url": "e2", "price": 280, "market_avg": 300, "source": "ebay"}]))
+    out = tmp_path / "out"
+
+    def crash(records):
+        raise OSError("database is locked")
+
+    monkeypatch.setattr(ps, "save_listing_batch", crash)
+    with pytest.raises(OSError):
+        ps.score_to_files([src], str(out), persist_features=False)
+    assert not ps.scored_path(src, str(out)).exists()
+
+    saved = []
+    monkeypatch.setattr(ps, "save_listing_batch", lambda records: saved.extend(records))
+    ps.score_to_files([src], str(out), top_k=1, persist_features=False)
+    assert [r["url"] for r in saved] == ["e1"]  # the failed save left nothing memoized
+
+    saved.clear()
+    ps.score_to_files([src], str(out), persist_features=False)
+    assert [r["url"] for r in saved] == ["e2"]  # dropped by top-k, so never memoized
+    saved.clear()
+    ps.score_to_files([src], str(out), persist_features=False)
+    assert saved == []
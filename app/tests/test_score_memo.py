@@ -0,0 +1,82 @@
+from app.pipeline.profitability_scorer import DEFAULT_SCORING, score_records
+from app.storage.score_memo import ScoreMemo
+
+
+def _listings():
+    return [
+        {"url": "https://example.com/1", "brand": "Nike", "category": "sneakers", "price": 100, "market_avg": 180},
+        {"url": "https://example.com/2", "brand": "Sony", "category": "electronics", "price": 250},
+    ]
+
+
+def test_unchanged_listings_are_skipped(tmp_path):
+    memo = ScoreMemo(tmp_path / "memo.db")
+
+    first, fresh = score_records(_listings(), DEFAULT_SCORING, memo=memo)
+    assert len(fresh) == 2
+
+    second, fresh = score_records(_listings(), DEFAULT_SCORING, memo=memo)
+    assert fresh == []
+    assert [r["flipScore"] for r in second] == [r["flipScore"] for r in first]
+    assert memo.hit_rate == 0.5
+
+
+def test_changed_price_or_profile_is_rescored(tmp_path):
+    memo = ScoreMemo(tmp_path / "memo.db")
+    score_records(_listings(), DEFAULT_SCORING, memo=memo)
+
+    changed = _listings()
+    changed[0]["price"] = 90
+    _, fresh = score_records(changed, DEFAULT_SCORING, memo=memo)
+    assert [r["url"] for r in fresh] == ["https://example.com/1"]
+
+    _, fresh = score_records(changed, {**DEFAULT_SCORING, "w_price_gap": 0.6}, memo=memo)
+    assert len(fresh) == 2
+
+
+def test_storing_listings_does_not_invalidate_the_memo(tmp_path):
+    from app.storage.storage import save_listing_batch
+    from app.storage.supply_index import SupplySnapshot
+
+    db = tmp_path / "listings.db"
+    memo = ScoreMemo(tmp_path / "memo.db")
+    listings = [{**r, "model": r["brand"]} for r in _listings()]
+
+    _, fresh = score_records(listings, DEFAULT_SCORING, SupplySnapshot.load(db), memo)
+    assert len(fresh) == 2
+    save_listing_batch(fresh, db_path=db)
+
+    for _ in range(2):  # each run re-stores what it scored
+        scored, fresh = score_records(listings, DEFAULT_SCORING, SupplySnapshot.load(db), memo)
+        assert fresh == []
+        save_listing_batch(scored, db_path=db)
+
+
+def test_memo_hits_stay_in_active_supply_past_the_ttl(monkeypatch, tmp_path):
+    import json
+    import types
+
+    from app.pipeline import profitability_scorer as ps
+    from app.storage import supply_index
+    from app.storage.supply_index import ACTIVE_TTL_SECS, SupplySnapshot
+
+    monkeypatch.chdir(tmp_path)
+    clock = types.SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(supply_index, "time", types.SimpleNamespace(time=lambda: clock.now))
+    src = tmp_path / "ebay_sneakers_results.json"
+
+    def poll(listings, at):
+        clock.now = at
+        src.write_text(json.dumps(listings))
+        ps.score_to_files([src], str(tmp_path / "out"), persist_features=False)
+
+    live = {"url": "https://ebay.com/itm/1", "model": "af1", "category": "sneakers", "price": 100, "source": "ebay"}
+    poll([live], 0.0)  # stored; its supply count changes its rarity input...
+    poll([live], 1.0)  # ...so it is rescored and stored once more
+    poll([live], ACTIVE_TTL_SECS * 0.75)  # memo hit: not stored, only seen
+    new = {**live, "url": "https://ebay.com/itm/2", "model": "dunk"}
+    poll([live, new], ACTIVE_TTL_SECS * 1.5)  # storing `new` ages out listings unseen for the TTL
+
+    snap = SupplySnapshot.load()
+    assert snap.lookup("sneakers", "af1")[0] == 1
+    assert snap.lookup("sneakers", "dunk")[0] == 1
@@ -0,0 +1,74 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import score_router
+from app.api.score_router import MicroBatcher, router
+
+
+def test_concurrent_requests_share_a_batch():
+    batcher = MicroBatcher(window=0.05)
+
+    async def run():
+        return await asyncio.gather(*(
+            batcher.submit([{"url": f"https://example.com/{i}", "price": 100 + i}]) for i in range(20)
+        ))
+
+    results = asyncio.run(run())
+    assert [r[0]["price"] for r in results] == [100 + i for i in range(20)]
+    assert all("flipScore" in r[0] for r in results)
+    assert batcher.batches < 20
+    assert batcher.stats()["listings"] == 20
+
+
+def test_score_endpoint_accepts_single_and_many():
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    one = client.post("/score", json={"brand": "Nike", "price": 120, "market_avg": 200})
+    assert one.status_code == 200
+    assert one.json()["profitMargin"] == 80.0
+
+    many = client.post("/score", json={"listings": [{"price": 50}, {"price": 5}]})
+    assert [r["valid"] for r in many.json()["results"]] == [True, False]
+    assert client.get("/score/stats").json()["batches"] >= 2
+
+
+def test_malformed_listing_is_rejected_and_numbers_are_coerced():
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    bad = client.post("/score", json={"listings": [{"price": 50}, {"brand": {"name": "Nike"}, "price": 50}]})
+    assert bad.status_code == 422
+    assert "listing 1" in bad.json()["detail"] and "'brand'" in bad.json()["detail"]
+    assert client.post("/score", json=[{"price": 50}, "oops"]).status_code == 422
+
+    coerced = client.post("/score", json={"brand": 7, "model": 3080, "price": 120})
+    assert coerced.status_code == 200
+    assert coerced.json()["brand"] == "7" and coerced.json()["valid"] is True
+
+
+def test_failed_batch_is_rescored_per_request(monkeypatch):
+    real = score_router.score_records
+
+    def flaky(records, *args, **kwargs):
+        if any(r.get("boom") for r in records):
+            raise RuntimeError("boom")
+        return real(records, *args, **kwargs)
+
+    monkeypatch.setattr(score_router, "score_records", flaky)
+    batcher = MicroBatcher(window=0.05)
+
+    async def run():
+        return await asyncio.gather(
+            *(batcher.submit([{"url": f"https://example.com/{i}", "price": 100}]) for i in range(5)),
+            batcher.submit([{"url": "https://example.com/bad", "price": 100, "boom": True}]),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(r[0]["valid"] for r in results[:5])
+    assert isinstance(results[5], RuntimeError)
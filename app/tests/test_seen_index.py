@@ -0,0 +1,65 @@
+from app.storage.seen_index import BloomFilter, SeenIndex, canonical_url
+
+
+def _index(tmp_path, **kwargs):
+    return SeenIndex(tmp_path / "seen.db", tmp_path / "bloom.bin", **kwargs)
+
+
+def test_canonical_url_drops_tracking_and_noise():
+    assert canonical_url("https://WWW.eBay.com/itm/123/?utm_source=x&_trksid=p1#reviews") == \
+        canonical_url("https://ebay.com/itm/123")
+    assert canonical_url("https://x.com/a?b=2&a=1") == canonical_url("https://x.com/a?a=1&b=2")
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"url:{i}" for i in range(1000)]
+    for k in keys:
+        bloom.add(k)
+    assert all(k in bloom for k in keys)
+    false_positives = sum(f"other:{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_only_new_listings_pass_across_runs(tmp_path):
+    first = [
+        {"url": "https://ebay.com/itm/1?utm_source=a", "title": "Trek FX 2", "price": 300, "source": "ebay"},
+        {"url": "https://ebay.com/itm/1", "title": "Trek FX 2", "price": 300, "source": "ebay"},
+        {"url": "https://ebay.com/itm/2", "title": "Nike Dunk", "price": 90, "source": "ebay"},
+    ]
+    index = _index(tmp_path)
+    assert [it["url"] for it in index.filter_new(first)] == [first[0]["url"], first[2]["url"]]
+    index.save()
+
+    second = [
+        {"url": "https://ebay.com/itm/2", "title": "Nike Dunk", "price": 90, "source": "ebay"},
+        {"url": "https://ebay.com/itm/99", "title": "trek  fx 2", "price": 300.2, "source": "ebay"},  # relisted
+        {"url": "https://ebay.com/itm/3", "title": "Giant Escape", "price": 250, "source": "ebay"},
+    ]
+    reopened = _index(tmp_path)
+    assert [it["url"] for it in reopened.filter_new(second)] == ["https://ebay.com/itm/3"]
+
+
+def test_stale_filter_is_rebuilt_from_the_table(tmp_path):
+    index = _index(tmp_path)
+    index.save()
+    index.filter_new([{"url": "https://a.com/1", "title": "x", "price": 1}])  # not saved
+
+    reopened = _index(tmp_path)
+    assert reopened.filter_new([{"url": "https://a.com/1", "title": "x", "price": 1}]) == []
+
+
+def test_pending_keys_hold_listings_until_marked(tmp_path):
+    index = _index(tmp_path, capacity=1000)
+    listings = [{"url": f"https://ebay.com/itm/{i}", "title": f"Item {i}", "price": 10, "source": "ebay"}
+                for i in range(2)]
+    pending = set()
+
+    assert index.filter_new(listings, mark=False, pending=pending) == listings
+    assert index.filter_new(listings, mark=False, pending=pending) == []
+    assert len(index) == 0
+    # Nothing was marked, so a fresh run sees them again.
+    assert _index(tmp_path, capacity=1000).filter_new(listings, mark=False) == listings
+
+    index.mark(listings[:1])
+    assert _index(tmp_path, capacity=1000).filter_new(listings, mark=False) == listings[1:]
@@ -0,0 +1,53 @@
+from app.storage.segment_store import SegmentStore
+
+
+def _records(run, n):
+    return [{"url": f"https://x/{run}/{i}", "title": f"listing {i}", "price": i} for i in range(n)]
+
+
+def test_reads_by_run_stage_and_source(tmp_path):
+    with SegmentStore(tmp_path) as store:
+        store.append("r1", "scrape", "ebay:bikes", _records("r1-ebay", 3))
+        store.append("r1", "scrape", "craigslist:bikes", _records("r1-cl", 2))
+        store.append("r2", "score", "ebay:bikes", _records("r2-ebay", 4))
+        assert store.append("r2", "score", "ebay:bikes", []) is None
+
+    assert store.runs() == ["r1", "r2"]
+    assert store.sources("r1") == ["craigslist:bikes", "ebay:bikes"]
+    assert [r["url"] for r in store.read("r1", source="craigslist:bikes")] == [
+        "https://x/r1-cl/0", "https://x/r1-cl/1",
+    ]
+    assert len(list(store.read(source="ebay:bikes"))) == 7
+    assert len(list(store.read(stage="score"))) == 4
+    assert len(list(tmp_path.glob("*.jsonl.gz"))) == 1
+
+
+def test_segments_roll_over_at_size_cap(tmp_path):
+    store = SegmentStore(tmp_path, max_segment_bytes=400)
+    for i in range(6):
+        store.append(f"r{i}", "scrape", "ebay:bikes", _records(f"r{i}", 5))
+    store.seal()
+
+    segments = list(tmp_path.glob("*.jsonl.gz"))
+    assert len(segments) > 1
+    for p in segments:  # only a single oversized batch may exceed the cap
+        assert p.stat().st_size <= 400 or [b.segment for b in store.batches()].count(p.name) == 1
+    assert len(list(store.read())) == 30
+
+
+def test_retention_and_compaction_reclaim_space(tmp_path):
+    store = SegmentStore(tmp_path, max_segment_bytes=10_000)
+    for i in range(5):
+        store.append(f"r{i}", "scrape", "ebay:bikes", _records(f"r{i}", 20))
+        store.seal()  # one segment per run
+    assert len(list(tmp_path.glob("*.jsonl.gz"))) == 5
+
+    assert store.retain(keep_runs=2) == ["r0", "r1", "r2"]
+    stats = store.compact()
+
+    assert stats["segments"] == 5
+    assert stats["bytes_after"] < stats["bytes_before"]
+    assert len(list(tmp_path.glob("*.jsonl.gz"))) == 1
+    assert store.runs() == ["r3", "r4"]
+    assert [r["url"] for r in store.read("r4")] == [r["url"] for r in _records("r4", 20)]
+    assert store.compact()["segments"] == 0
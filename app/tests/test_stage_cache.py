@@ -0,0 +1,106 @@
+import json
+import os
+import time
+
+from app.pipeline.stage_cache import StageCache
+
+
+def _stage(calls, src, dst):
+    def run():
+        calls.append(1)
+        dst.write_text(json.dumps({"n": len(json.loads(src.read_text()))}))
+    return run
+
+
+def test_unchanged_inputs_skip_the_stage(tmp_path):
+    src, dst = tmp_path / "in.json", tmp_path / "out.json"
+    src.write_text("[1, 2]")
+    cache = StageCache(tmp_path / "cache")
+    calls = []
+
+    cache.run("score", _stage(calls, src, dst), [dst], inputs=[src], modules=["app.utils.hashing"])
+    dst.unlink()
+    cache.run("score", _stage(calls, src, dst), [dst], inputs=[src], modules=["app.utils.hashing"])
+
+    assert len(calls) == 1
+    assert json.loads(dst.read_text()) == {"n": 2}
+    assert cache.metrics.get_count("stage_score_cached") == 1
+
+
+def test_changed_input_params_or_force_rerun(tmp_path):
+    src, dst = tmp_path / "in.json", tmp_path / "out.json"
+    src.write_text("[1]")
+    calls = []
+    cache = StageCache(tmp_path / "cache")
+
+    cache.run("score", _stage(calls, src, dst), [dst], inputs=[src])
+    src.write_text("[1, 2, 3]")
+    cache.run("score", _stage(calls, src, dst), [dst], inputs=[src])
+    cache.run("score", _stage(calls, src, dst), [dst], params={"profile": "v2"}, inputs=[src])
+    StageCache(tmp_path / "cache", force=["score"]).run("score", _stage(calls, src, dst), [dst], inputs=[src])
+
+    assert len(calls) == 4
+    assert json.loads(dst.read_text()) == {"n": 3}
+
+
+def test_expired_entries_are_not_reused(tmp_path):
+    dst = tmp_path / "raw.json"
+    calls = []
+    cache = StageCache(tmp_path / "cache")
+
+    def scrape():
+        calls.append(1)
+        dst.write_text("[]")
+
+    cache.run("scrape", scrape, [dst], params={"site": "ebay"}, ttl=3600)
+    cache.run("scrape", scrape, [dst], params={"site": "ebay"}, ttl=3600)
+    cache.run("scrape", scrape, [dst], params={"site": "ebay"}, ttl=-1)
+    assert len(calls) == 2
+
+
+def test_restored_outputs_get_a_fresh_mtime(tmp_path):
+    dst = tmp_path / "raw.json"
+    cache = StageCache(tmp_path / "cache")
+    cache.run("scrape", lambda: dst.write_text("[]"), [dst], params={"site": "ebay"}, ttl=3600)
+    for f in (tmp_path / "cache").rglob("*raw.json"):
+        os.utime(f, (0, 0))  # an old cached copy
+    dst.unlink()
+
+    cache.run("scrape", lambda: None, [dst], params={"site": "ebay"}, ttl=3600)
+
+    assert cache.metrics.get_count("stage_scrape_cached") == 1
+    assert time.time() - dst.stat().st_mtime < 60
+
+
+def test_skipped_stages_always_run_and_are_not_stored(tmp_path):
+    dst = tmp_path / "raw.json"
+    calls = []
+    cache = StageCache(tmp_path / "cache", skip=["scrape"])
+
+    def scrape():
+        calls.append(1)
+        dst.write_text("[]")
+
+    cache.run("scrape", scrape, [dst], params={"site": "ebay"}, ttl=3600)
+    cache.run("scrape", scrape, [dst], params={"site": "ebay"}, ttl=3600)
+    assert len(calls) == 2
+    assert not (tmp_path / "cache" / "scrape").exists()
+
+
+def test_prune_drops_stale_then_least_recently_used_entries(tmp_path):
+    cache = StageCache(tmp_path / "cache")
+    for name in ("old", "used", "new"):
+        dst = tmp_path / f"{name}.json"
+        cache.run("score", lambda dst=dst: dst.write_text("x" * 1000), [dst], params={"n": name})
+    entries = {json.loads((e / "manifest.json").read_text())["params"]["n"]: e
+               for e in (tmp_path / "cache" / "score").iterdir()}
+    now = time.time()
+    os.utime(entries["old"] / "manifest.json", (now - 30 * 86400,) * 2)
+    os.utime(entries["used"] / "manifest.json", (now - 60,) * 2)
+
+    assert cache.prune(now=now) == 1
+    assert not entries["old"].exists()
+
+    # Only one entry fits: the most recently used one is kept.
+    assert cache.prune(max_bytes=1500, now=now) == 1
+    assert entries["new"].exists() and not entries["used"].exists()
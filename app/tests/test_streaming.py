@@ -0,0 +1,165 @@
+import threading
+import time
+
+from app.metrics.latency import LatencyRecorder
+from app.pipeline import streaming
+from app.pipeline.streaming import MarketplaceStream, Stage, StreamConfig, StreamingPipeline
+from app.pipeline.profitability_scorer import score_records
+from app.storage.score_memo import ScoreMemo
+from app.storage.seen_index import SeenIndex
+from app.storage.supply_index import SupplySnapshot
+
+
+def test_bounded_queues_apply_backpressure():
+    produced, lock = [], threading.Lock()
+
+    def source(batch, emit):
+        for n in batch:
+            for i in range(n):
+                with lock:
+                    produced.append(i)
+                emit(i)
+
+    def slow_sink(batch, emit):
+        time.sleep(0.01)
+
+    pipeline = StreamingPipeline([Stage("source", source), Stage("sink", slow_sink)], queue_size=2)
+    stats = pipeline.run([20])
+
+    assert stats["processed"] == {"source": 1, "sink": 20}
+    assert stats["blocked_secs"]["source"] > 0
+
+
+def test_listings_alert_before_slow_site_finishes(monkeypatch, tmp_path):
+    saved, alerts = [], []
+    monkeypatch.setattr(streaming, "save_listing_batch", lambda rows: saved.extend(rows))
+    memo_cls = streaming.ScoreMemo
+    monkeypatch.setattr(streaming, "ScoreMemo", lambda: memo_cls(tmp_path / "memo.db"))
+    monkeypatch.setattr(SupplySnapshot, "load", classmethod(lambda cls, *a, **k: None))
+
+    def scraper(site, category, limit, emit):
+        if site == "slow":
+            time.sleep(0.5)
+        for i in range(3):
+            emit({"url": f"https://x/{i}", "title": f"Trek bike {i}", "price": 100, "source": site})
+
+    stream = MarketplaceStream(
+        "bikes", cfg=StreamConfig(score_wait=0.01, alert_threshold=0.0),
+        scraper=scraper, notify=lambda record: alerts.append(record),
+        seen=SeenIndex(tmp_path / "seen.db", tmp_path / "bloom.bin", capacity=1000),
+        latency=LatencyRecorder(tmp_path / "latency"),
+    )
+    start = time.perf_counter()
+    stats = stream.run(["fast", "slow"])
+
+    assert len(saved) == 3  # the slow site's URLs were deduped
+    assert len(alerts) == 3
+    assert stats["first_alert_secs"] < 0.4 < time.perf_counter() - start
+    assert stream.metrics.get_count("dedupe_dropped") == 3
+    stamps = alerts[0]["stamps"]
+    assert list(stamps) == ["scraped", "normalized", "scored", "stored", "notified"]
+    assert stream.latency.snapshot()["pipeline"]["count"] == 3
+    assert len(list((tmp_path / "latency").glob("stream-bikes-*.json"))) == 1
+
+
+def _time_to_deal_alert(monkeypatch, tmp_path, prioritize):
+    monkeypatch.setattr(streaming, "save_listing_batch", lambda rows: None)
+    monkeypatch.setattr(streaming, "ScoreMemo", lambda: ScoreMemo(tmp_path / f"memo_{prioritize}.db"))
+    monkeypatch.setattr(SupplySnapshot, "load", classmethod(lambda cls, *a, **k: None))
+    monkeypatch.setattr(streaming.PriceAnchors, "load", classmethod(lambda cls, *a, **k: cls()))
+
+    def slow_score(records, *args, **kwargs):
+        time.sleep(0.02)  # stands in for enrichment and the full scorer
+        return score_records(records, *args, **kwargs)
+
+    monkeypatch.setattr(streaming, "score_records", slow_score)
+
+    def scraper(site, category, limit, emit):
+        for i in range(150):
+            emit({"url": f"https://x/junk/{i}", "title": f"junk lot {i}", "price": 1, "source": site})
+        emit({"url": "https://x/deal", "title": "Nike Dunk Low", "brand": "nike",
+              "price": 120, "market_avg": 400, "source": site})
+
+    alerts = []
+    stream = MarketplaceStream(
+        "sneakers", cfg=StreamConfig(score_batch=4, score_wait=0.0, alert_threshold=0.3, prioritize=prioritize),
+        scraper=scraper, notify=lambda record: alerts.append(time.perf_counter()),
+        seen=SeenIndex(tmp_path / f"seen_{prioritize}.db", tmp_path / f"bloom_{prioritize}.bin", capacity=1000),
+        latency=LatencyRecorder(tmp_path / "latency"),
+    )
+    stats = stream.run(["ebay"])
+    assert len(alerts) == 1
+    return stats["first_alert_secs"]
+
+
+def test_priority_order_alerts_before_fifo(monkeypatch, tmp_path):
+    fifo = _time_to_deal_alert(monkeypatch, tmp_path, prioritize=False)
+    prioritized = _time_to_deal_alert(monkeypatch, tmp_path, prioritize=True)
+    assert prioritized < fifo / 3
+
+
+def test_listings_are_marked_seen_only_once_stored(monkeypatch, tmp_path):
+    monkeypatch.setattr(streaming, "ScoreMemo", lambda: ScoreMemo(tmp_path / "memo.db"))
+    monkeypatch.setattr(SupplySnapshot, "load", classmethod(lambda cls, *a, **k: None))
+    listings = [{"url": f"https://x/{i}", "title": f"Trek bike {i}", "price": 100, "source": "ebay"}
+                for i in range(3)]
+
+    def run(save):
+        monkeypatch.setattr(streaming, "save_listing_batch", save)
+        seen = SeenIndex(tmp_path / "seen.db", tmp_path / "bloom.bin", capacity=1000)
+        stream = MarketplaceStream(
+            "bikes", cfg=StreamConfig(score_wait=0.01, alert_threshold=1.1),
+            scraper=lambda site, category, limit, emit: [emit(dict(it)) for it in listings],
+            notify=lambda record: None, seen=seen, latency=LatencyRecorder(tmp_path / "latency"),
+        )
+        stream.run(["ebay"])
+        return seen
+
+    def crash(rows):
+        raise OSError("disk full")
+
+    assert run(crash).filter_new(listings, mark=False) == listings
+
+    saved = []
+    assert run(saved.extend).filter_new(listings, mark=False) == []
+    assert len(saved) == 3
+
+
+def test_a_scraper_that_exits_fails_only_its_site(monkeypatch, tmp_path):
+    saved = []
+    monkeypatch.setattr(streaming, "save_listing_batch", lambda rows: saved.extend(rows))
+    monkeypatch.setattr(streaming, "ScoreMemo", lambda: ScoreMemo(tmp_path / "memo.db"))
+    monkeypatch.setattr(SupplySnapshot, "load", classmethod(lambda cls, *a, **k: None))
+
+    def scraper(site, category, limit, emit):
+        if site == "facebook":
+            raise SystemExit("Create urls.txt with one Facebook URL per line.")
+        emit({"url": f"https://x/{site}", "title": "Trek bike", "price": 100, "source": site})
+
+    stream = MarketplaceStream(
+        "bikes", cfg=StreamConfig(score_wait=0.01, alert_threshold=1.1), scraper=scraper,
+        notify=lambda record: None, seen=SeenIndex(tmp_path / "seen.db", tmp_path / "bloom.bin", capacity=1000),
+        latency=LatencyRecorder(tmp_path / "latency"),
+    )
+    stats = stream.run(["facebook", "ebay"])
+
+    assert [r["source"] for r in saved] == ["ebay"]
+    assert stats["scrapers_failed"] == 1
+
+
+def test_facebook_page_files_stay_out_of_the_shared_output_dir(monkeypatch):
+    dirs = []
+
+    class FakeSniper:
+        @staticmethod
+        def main(category, limit, headless=True, out_dir=None):
+            dirs.append(out_dir)
+            (out_dir / "page.json").write_text("[]")
+            return [{"url": "https://fb/1", "title": "Trek bike"}]
+
+    monkeypatch.setattr(streaming.importlib, "import_module", lambda name: FakeSniper)
+    emitted = []
+    streaming.scrape_site("facebook", "bikes", 5, emitted.append)
+
+    assert emitted == [{"url": "https://fb/1", "title": "Trek bike", "source": "facebook"}]
+    assert dirs[0] is not None and not dirs[0].exists()
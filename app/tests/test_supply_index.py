@@ -0,0 +1,53 @@
+from app.scoring.rarity_utils import rarity_boost
+from app.storage.storage import save_listing_batch
+import sqlite3
+from itertools import count
+
+from app.storage.supply_index import SupplyIndex, SupplySnapshot, record_listings
+
+_ids = count()
+
+
+def _record(model, category="sneakers", url=None):
+    return {
+        "source": "ebay", "title": model, "brand": None, "model": model, "category": category,
+        "price": 100.0, "flipScore": 0.5, "profitMargin": None, "marginPct": None,
+        "url": url or f"https://ebay.com/itm/{next(_ids)}",
+    }
+
+
+def test_counts_are_updated_incrementally(tmp_path):
+    db = tmp_path / "listings.db"
+    save_listing_batch([_record("Jordan 1")] + [_record("AF1") for _ in range(3)], db_path=db)
+    save_listing_batch([_record("AF1") for _ in range(4)], db_path=db)
+
+    snap = SupplySnapshot.load(db)
+    count, avg = snap.lookup("Sneakers", "af1")
+    assert count == 7
+    assert avg is not None and 2.0 <= avg <= 4.0
+
+
+def test_rare_model_gets_boost(tmp_path):
+    db = tmp_path / "listings.db"
+    save_listing_batch([_record("Rare")] + [_record("Common") for _ in range(20)], db_path=db)
+
+    index = SupplyIndex(db, interval=3600)
+    assert rarity_boost(*index.snapshot.lookup("sneakers", "rare")) > 1.0
+    assert rarity_boost(*index.snapshot.lookup("sneakers", "common")) < 1.0
+    assert index.snapshot.lookup("bike", "unknown") == (None, None)
+
+
+def test_restored_listings_count_once_and_age_out(tmp_path):
+    db = tmp_path / "listings.db"
+    listing = _record("AF1", url="https://ebay.com/itm/1?utm_source=x")
+    for _ in range(3):  # the same listing re-stored on every poll
+        save_listing_batch([listing], db_path=db)
+    assert SupplySnapshot.load(db).lookup("sneakers", "af1")[0] == 1
+
+    conn = sqlite3.connect(db)
+    with conn:
+        record_listings(conn, [_record("Jordan 1")], now=10**10)
+    conn.close()
+    snap = SupplySnapshot.load(db)
+    assert snap.lookup("sneakers", "af1")[0] is None
+    assert snap.lookup("sneakers", "jordan 1")[0] == 1
@@ -0,0 +1,26 @@
+from app.scoring.topk import TopKCollector
+
+
+def _item(score, category="sneakers", source="ebay", valid=True):
+    return {"flipScore": score, "category": category, "source": source, "valid": valid}
+
+
+def test_keeps_best_k_per_group():
+    collector = TopKCollector(2)
+    collector.extend(_item(s) for s in (0.1, 0.9, 0.5, 0.7))
+    collector.push(_item(0.3, source="craigslist"))
+
+    scores = [r["flipScore"] for r in collector.results()]
+    assert scores == [0.9, 0.7, 0.3]
+
+
+def test_totals_cover_dropped_and_invalid():
+    collector = TopKCollector(1)
+    collector.extend([_item(0.4), _item(0.8), _item(0.95, valid=False)])
+
+    totals = collector.summary()["sneakers/ebay"]
+    assert totals["seen"] == 3
+    assert totals["invalid"] == 1
+    assert totals["kept"] == 1
+    assert totals["dropped"] == 1
+    assert totals["mean_score"] == 0.6
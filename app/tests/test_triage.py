@@ -0,0 +1,29 @@
+import sqlite3
+
+from app.pipeline.profitability_scorer import DEFAULT_SCORING
+from app.scoring.triage import PriceAnchors, estimate_alert
+
+
+def test_anchors_fall_back_from_model_to_category(tmp_path):
+    db = tmp_path / "listings.db"
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE listings (category TEXT, model TEXT, price REAL)")
+    conn.executemany("INSERT INTO listings VALUES (?, ?, ?)",
+                     [("Sneakers", "Dunk Low", p) for p in (100, 120, 140)] + [("sneakers", "Rare", 900)])
+    conn.commit()
+    conn.close()
+
+    anchors = PriceAnchors.load(db)
+    assert anchors.anchor("sneakers", "dunk low") == 120
+    assert anchors.anchor("sneakers", "rare") == (360 + 900) / 4  # too few samples → category average
+    assert anchors.anchor("bikes", "x") is None
+
+
+def test_estimate_ranks_underpriced_known_brands_first():
+    cfg = dict(DEFAULT_SCORING)
+    anchors = PriceAnchors(by_model={("sneakers", "dunk low"): 200.0})
+    deal = {"title": "Nike Dunk Low", "model": "Dunk Low", "category": "sneakers", "price": 80}
+    fair = {"title": "Nike Dunk Low", "model": "Dunk Low", "category": "sneakers", "price": 210}
+    junk = {"title": "box of cables", "price": 2}
+    assert estimate_alert(deal, cfg, anchors) > estimate_alert(fair, cfg, anchors) > estimate_alert(junk, cfg, anchors)
+    assert estimate_alert(junk, cfg, anchors) == 0.0
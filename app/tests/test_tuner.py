@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from app.config_loader import load_config, save_config
+from app.scoring.tuner import load_outcomes, tune
+from app.storage.feature_store import FEATURE_COLUMNS, LINEAR_WEIGHTS, FeatureStore
+
+
+def _store(tmp_path, n=40, seed=1):
+    """Half the rows are winners; only price_gap tells them apart."""
+    rng = np.random.default_rng(seed)
+    winners = np.arange(n) % 2 == 0
+    features = {col: np.zeros(n) for col in FEATURE_COLUMNS}
+    features["price_gap"] = np.where(winners, 0.8, 0.1) + rng.uniform(0, 0.05, n)
+    # Confidence is anti-correlated with the outcome, so the base config ranks losers first.
+    features["confidence"] = np.where(winners, 0.2, 0.9)
+    features["brand_adj"] = rng.uniform(-0.1, 0.1, n)
+    features["category_weight"] = rng.uniform(0, 0.2, n)
+    features["rarity"] = np.ones(n)
+    features["price"] = np.full(n, 100.0)
+    ids = [f"https://example.com/{i}" for i in range(n)]
+    store = FeatureStore(tmp_path / "features")
+    store.upsert(ids, features)
+    outcomes = {i: (50.0 if w else -20.0) for i, w in zip(ids, winners)}
+    return store, outcomes
+
+
+def test_tune_finds_the_predictive_weight(tmp_path):
+    store, outcomes = _store(tmp_path)
+    ids, _ = store.load()
+    realized = np.array([outcomes[i] for i in ids.tolist()])
+    base = {"w_confidence": 1.0, "w_price_gap": 0.0, "w_brand_signal": 0.0, "w_category": 0.0,
+            "alert_threshold": 0.7, "name": "base"}
+
+    best, metrics = tune(store, base, realized, candidates=200, rounds=2, top_k=10)
+
+    assert metrics["baseline_precision_at_k"] == 0.0
+    assert metrics["precision_at_k"] == 1.0
+    assert metrics["mean_margin_at_k"] == 50.0
+    assert metrics["evaluated"] == 401
+    assert best["w_price_gap"] > best["w_confidence"]
+    assert best["name"] == "base" and best["alert_threshold"] == 0.7
+    assert set(LINEAR_WEIGHTS) <= set(best)
+
+
+def test_tune_scores_candidates_with_the_profiles_formula_overrides(tmp_path):
+    store, outcomes = _store(tmp_path)
+    ids, _ = store.load()
+    realized = np.array([outcomes[i] for i in ids.tolist()])
+    # The override swaps which weight applies to price_gap.
+    base = {"w_confidence": 0.0, "w_price_gap": 1.0, "w_brand_signal": 0.0, "w_category": 0.0,
+            "formula.score_raw": "w_confidence * price_gap + w_price_gap * confidence"}
+
+    best, metrics = tune(store, base, realized, candidates=200, rounds=2, top_k=10)
+
+    assert metrics["baseline_precision_at_k"] == 0.0 and metrics["precision_at_k"] == 1.0
+    assert best["w_confidence"] > best["w_price_gap"]
+
+    with pytest.raises(ValueError, match="no weights to tune"):
+        tune(store, {**base, "formula.flip_score": "clamp(price_gap)"}, realized, candidates=10)
+
+
+def test_load_outcomes_reads_json_and_leaves_unknown_ids_nan(tmp_path):
+    path = tmp_path / "outcomes.json"
+    path.write_text('[{"url": "a", "margin": 12.5}, {"id": "b", "margin": null}]', encoding="utf-8")
+    realized = load_outcomes(["a", "b", "c"], str(path))
+    assert realized[0] == 12.5
+    assert np.isnan(realized[1:]).all()
+
+
+def test_save_config_round_trips_through_load_config(tmp_path):
+    path = str(tmp_path / "scoring.candidate.yaml")
+    cfg = {
+        "name": "tuned v2",
+        "enabled": True,
+        "debug": False,
+        "top_k": 20,
+        "w_price_gap": 0.4215,
+        "tiny": 1e-05,
+        "tinier": 3.5e-12,
+        "huge": 2.5e20,
+        "negative": -7.25e-08,
+        "whole": 3.0,
+    }
+    save_config(path, cfg, header="Tuned by test\nsecond line")
+
+    loaded = load_config(path)
+    assert loaded == cfg
+    assert all(type(loaded[k]) is type(v) for k, v in cfg.items())
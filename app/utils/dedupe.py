@@ -1,6 +1,33 @@
-﻿from typing import Dict, Iterable
+﻿"""
+Listing de-duplication.
+
+``dedupe_listings`` drops exact URL repeats. ``near_dedupe_listings`` finds
+the same item cross-posted with a different URL and a slightly different
+title: each listing gets a MinHash signature over character shingles of its
+normalized title, an LSH index keyed by signature band and price bucket
+yields candidate matches in roughly linear time, and confirmed matches are
+clustered so only the best listing of each cluster is kept.
+"""
+
+from __future__ import annotations
+import hashlib
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
 from app.utils.hashing import calc_hash
 
+# Words that vary between cross-posts of the same item without describing it.
+_FILLER_WORDS = {
+    "a", "an", "the", "for", "sale", "obo", "firm", "new", "used", "like",
+    "great", "good", "excellent", "condition", "must", "go", "pickup", "only",
+}
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_DIGITS = re.compile(r"\d+")
+_MERSENNE_PRIME = (1 << 31) - 1
+
 def dedupe_listings(listings: Iterable[Dict]) -> list[Dict]:
     """Return listings with duplicate URLs removed."""
     seen = set()
@@ -11,3 +38,195 @@ def dedupe_listings(listings: Iterable[Dict]) -> list[Dict]:
             seen.add(key)
             result.append(entry)
     return result
+
+
+# ============================================================
+# Near-duplicates
+# ============================================================
+
+def normalize_title(title: Any) -> str:
+    """Lowercase, strip punctuation and filler words: ``"Trek FX-2 (OBO)"`` → ``"trek fx 2"``."""
+    words = _NON_ALNUM.sub(" ", str(title or "").lower()).split()
+    return " ".join(w for w in words if w not in _FILLER_WORDS)
+
+
+def title_shingles(title: Any, k: int = 3) -> Set[str]:
+    """Character k-grams of the normalized title with spaces removed, so ``fx 2`` matches ``fx2``."""
+    text = normalize_title(title).replace(" ", "")
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def title_numbers(title: Any) -> Set[str]:
+    """Digit runs in the title (model numbers, sizes, capacities)."""
+    return set(_DIGITS.findall(normalize_title(title).replace(" ", "")))
+
+
+def _shingle_hashes(shingles: Set[str]) -> np.ndarray:
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles],
+        dtype=np.int64,
+    )
+
+
+class MinHasher:
+    """MinHash signatures from ``num_perm`` universal hash functions ``(a*x + b) mod p``."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1) -> None:
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+
+    def signature(self, shingles: Set[str]) -> np.ndarray:
+        if not shingles:
+            return np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.int64)
+        # Shingle hashes are < 2**32 and a < 2**31, so the product fits in int64.
+        x = _shingle_hashes(shingles) % _MERSENNE_PRIME
+        return ((self.a * x + self.b) % _MERSENNE_PRIME).min(axis=1)
+
+
+def _price(listing: Dict[str, Any]) -> Optional[float]:
+    try:
+        price = float(listing.get("price"))
+    except (TypeError, ValueError):
+        return None
+    return price if price > 0 else None
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    """
+    Incremental LSH index over listing titles and prices.
+
+    Signatures are split into ``bands`` bands; two listings become candidates
+    when any band matches and their prices fall in the same or an adjacent
+    log-scale bucket. Candidates are confirmed by exact shingle Jaccard
+    similarity, a relative price check and compatible numbers (one title's
+    numbers a subset of the other's, so "iPhone 13" never matches
+    "iPhone 14"), so LSH only has to be cheap, not exact. With the defaults (64 permutations, 16 bands of 4) titles with
+    Jaccard similarity 0.5 become candidates ~64% of the time and at 0.7 ~99%.
+    """
+
+    def __init__(self, threshold: float = 0.6, price_tolerance: float = 0.15,
+                 num_perm: int = 64, bands: int = 16) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.price_tolerance = price_tolerance
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self.buckets: Dict[Tuple[int, Optional[int], bytes], List[int]] = {}
+        self.shingles: List[Set[str]] = []
+        self.prices: List[Optional[float]] = []
+        self.numbers: List[Set[str]] = []
+        self.candidate_checks = 0
+
+    def _price_bucket(self, price: Optional[float]) -> Optional[int]:
+        if price is None:
+            return None
+        return int(math.log(price) // math.log1p(self.price_tolerance))
+
+    def _band_keys(self, sig: np.ndarray) -> List[bytes]:
+        return [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _prices_match(self, a: Optional[float], b: Optional[float]) -> bool:
+        if a is None or b is None:
+            return a is None and b is None
+        return abs(a - b) <= self.price_tolerance * max(a, b)
+
+    def matches(self, listing: Dict[str, Any]) -> List[int]:
+        """Ids of indexed listings that are near-duplicates of ``listing``."""
+        title = listing.get("title") or listing.get("model")
+        shingles = title_shingles(title)
+        if not shingles:
+            return []
+        sig = self.hasher.signature(shingles)
+        return self._matches(shingles, title_numbers(title), _price(listing), self._band_keys(sig))
+
+    def _matches(self, shingles: Set[str], numbers: Set[str], price: Optional[float],
+                 band_keys: List[bytes]) -> List[int]:
+        bucket = self._price_bucket(price)
+        near = [None] if bucket is None else [bucket - 1, bucket, bucket + 1]
+        candidates: Set[int] = set()
+        for band, key in enumerate(band_keys):
+            for b in near:
+                candidates.update(self.buckets.get((band, b, key), ()))
+        self.candidate_checks += len(candidates)
+        return sorted(
+            i for i in candidates
+            if self._prices_match(price, self.prices[i])
+            and (numbers <= self.numbers[i] or self.numbers[i] <= numbers)
+            and jaccard(shingles, self.shingles[i]) >= self.threshold
+        )
+
+    def add(self, listing: Dict[str, Any]) -> Tuple[int, List[int]]:
+        """Index ``listing``; returns its id and the ids it near-duplicates."""
+        title = listing.get("title") or listing.get("model")
+        shingles, numbers, price = title_shingles(title), title_numbers(title), _price(listing)
+        idx = len(self.shingles)
+        self.shingles.append(shingles)
+        self.numbers.append(numbers)
+        self.prices.append(price)
+        if not shingles:
+            return idx, []
+        band_keys = self._band_keys(self.hasher.signature(shingles))
+        found = self._matches(shingles, numbers, price, band_keys)
+        bucket = self._price_bucket(price)
+        for band, key in enumerate(band_keys):
+            self.buckets.setdefault((band, bucket, key), []).append(idx)
+        return idx, found
+
+
+def cluster_near_duplicates(listings: List[Dict[str, Any]], **index_kwargs: Any) -> List[List[int]]:
+    """Group indexes of ``listings`` into near-duplicate clusters (union-find over LSH matches)."""
+    parent = list(range(len(listings)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index = NearDuplicateIndex(**index_kwargs)
+    for item in listings:
+        idx, found = index.add(item)
+        for j in found:
+            parent[find(j)] = find(idx)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(listings)):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted(clusters.values(), key=lambda c: c[0])
+
+
+def _representative_rank(listing: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Prefer a priced, more complete listing; among those, the cheapest (best buy)."""
+    price = _price(listing)
+    filled = sum(1 for v in listing.values() if v not in (None, "", [], {}))
+    return (price is not None, filled, -(price or 0.0))
+
+
+def near_dedupe_listings(listings: Iterable[Dict[str, Any]], **index_kwargs: Any) -> List[Dict[str, Any]]:
+    """
+    Keep the best listing of each near-duplicate cluster, in input order.
+
+    The kept listing gets ``duplicate_urls`` naming the cross-posts it stands for.
+    """
+    listings = list(listings)
+    kept: List[Tuple[int, Dict[str, Any]]] = []
+    for cluster in cluster_near_duplicates(listings, **index_kwargs):
+        best = max(cluster, key=lambda i: (_representative_rank(listings[i]), -i))
+        rep = listings[best]
+        if len(cluster) > 1:
+            others = [listings[i].get("url") or listings[i].get("link") for i in cluster if i != best]
+            rep = {**rep, "duplicate_urls": [u for u in others if u]}
+        kept.append((best, rep))
+    return [rep for _, rep in sorted(kept, key=lambda t: t[0])]
@@ -0,0 +1,66 @@
+"""
+Atomic file writes and the per-run output directory.
+
+Pipeline runs write into their own ``data/runs/<run_id>/output`` directory;
+scrapers started by a run learn it from ``MARKET_OUTPUT_DIR`` and fall back
+to ``data/output`` when run by hand. Every write goes to a uniquely named
+temp file in the target directory and is renamed into place, so readers
+(and concurrent runs) never see a partially written file.
+"""
+
+from __future__ import annotations
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any
+
+OUTPUT_DIR_ENV = "MARKET_OUTPUT_DIR"
+DEFAULT_OUTPUT_DIR = Path("data/output")
+
+
+def output_dir() -> Path:
+    """The current run's output directory (``$MARKET_OUTPUT_DIR`` or ``data/output``)."""
+    path = Path(os.environ.get(OUTPUT_DIR_ENV) or DEFAULT_OUTPUT_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _temp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+
+
+def atomic_write_text(path: str | Path, text: str) -> Path:
+    """Write ``text`` to ``path`` via temp file + rename."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _temp_path(path)
+    try:
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return path
+
+
+def atomic_write_json(path: str | Path, obj: Any, **dump_kwargs: Any) -> Path:
+    """JSON-encode ``obj`` (indent 2 unless overridden) and write it atomically."""
+    dump_kwargs.setdefault("indent", 2)
+    return atomic_write_text(path, json.dumps(obj, **dump_kwargs))
+
+
+def atomic_copy(src: str | Path, dst: str | Path, metadata: bool = True) -> Path:
+    """Copy ``src`` to ``dst`` (with metadata unless ``metadata`` is False) via temp file + rename."""
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _temp_path(dst)
+    try:
+        if metadata:
+            shutil.copy2(src, tmp)
+        else:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return dst
@@ -7,3 +7,9 @@ def calc_hash(data: Any) -> str:
     """Return a stable hash for JSON-serializable data structures."""
     normalized = json.dumps(data, sort_keys=True, separators=(",", ":"))
     return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def fingerprint(data: Any) -> str:
+    """Return a short, fast content fingerprint (BLAKE2b, 128-bit) for cache keys."""
+    normalized = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
@@ -1,4 +1,5 @@
 ﻿from __future__ import annotations
+import threading
 import time
 from typing import Dict
 
@@ -9,6 +10,7 @@ class Metrics:
         self.timers: Dict[str, float] = {}
         self.durations: Dict[str, float] = {}
         self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
 
     # ------------------------------------------------------------
     # Timing
@@ -20,6 +22,11 @@ class Metrics:
         if name in self.timers:
             self.durations[name] = time.perf_counter() - self.timers.pop(name)
 
+    def add_duration(self, name: str, secs: float) -> None:
+        """Accumulate ``secs`` under ``name`` (thread-safe, for sources sharing one Metrics)."""
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + secs
+
     def get_duration(self, name: str) -> float:
         return self.durations.get(name, 0.0)
 
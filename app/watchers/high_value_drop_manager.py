@@ -6,7 +6,8 @@ from app.config_loader import get as load_cfg
 from app.utils.logger import log
 from app.utils.metrics import Metrics
 from app.notifiers.webhook_dispatcher import dispatch_webhook
-from app.pipelines.profitability_scorer import score_one, DEFAULT_SCORING
+from app.pipeline.profitability_scorer import score_records, DEFAULT_SCORING
+from app.scoring.profile_registry import ProfileRegistry
 
 
 class HighValueDropManager:
@@ -15,10 +16,8 @@ class HighValueDropManager:
     def __init__(self, settings: Dict[str, Any]) -> None:
         self.settings = settings
         self.metrics = Metrics()
-        self.scoring_cfg = {
-            **DEFAULT_SCORING,
-            **load_cfg("SNIPER_SCORING_CFG", "config/scoring.yaml"),
-        }
+        # Re-read only when config/scoring.yaml changes; see ProfileRegistry.
+        self.profiles = ProfileRegistry(defaults=DEFAULT_SCORING)
         self.alert_threshold = float(settings.get("alert_threshold", 0.7))
         self.webhook_cfg: Dict[str, Any] = settings.get("webhook", {})
         self.drop_sites: List[str] = settings.get("drop_sites", [])
@@ -47,14 +46,14 @@ class HighValueDropManager:
             return 0
 
         alerts = 0
-        scored = [
-            await asyncio.to_thread(score_one, listing, self.scoring_cfg)
-            for listing in listings
-        ]
+        profile = self.profiles.current()
+        scored, _ = await asyncio.to_thread(
+            score_records, listings, dict(profile.cfg), version=profile.version
+        )
 
         for item in scored:
             flip_score = float(item.get("flipScore", 0.0))
-            self.metrics.incr("listings_seen")
+            self.metrics.inc("listings_seen")
 
             # --- DB insert ---
             row = {
@@ -69,7 +68,7 @@ class HighValueDropManager:
 
             if flip_score >= self.alert_threshold:
                 if dispatch_webhook("drop.alert", item, self.webhook_cfg):
-                    self.metrics.incr("alerts_sent")
+                    self.metrics.inc("alerts_sent")
                     alerts += 1
 
         log.info(